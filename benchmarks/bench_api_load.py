@@ -0,0 +1,425 @@
+"""
+Drives the FastAPI app in-process and reports throughput and latency percentiles
+for /generate, /customize, /batch/create and /auth/permission/check.
+
+Requests are sent straight to the ASGI app, without sockets or an HTTP client,
+and the database is replaced by an in-memory stand-in that implements the few
+Prisma operations these endpoints use, so the numbers cover routing,
+validation, authentication, rate limiting, the render executor and the render
+cache. Rate limits are raised out of the way and rendered files go to a
+temporary directory, or with --storage s3 to an in-memory stand-in for S3.
+
+Run from the repository root (the Prisma client must have been generated):
+
+    python -m benchmarks.bench_api_load [--requests 500] [--concurrency 16]
+        [--endpoints generate customize] [--repeat-payloads] [--storage s3]
+        [--json results.json]
+
+By default every request carries a distinct payload or color, so the render
+cache never answers and each request renders; --repeat-payloads measures the
+cached path instead.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+from io import BytesIO
+from itertools import count
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+os.environ.setdefault("RENDER_CACHE_DIR", tempfile.mkdtemp(prefix="qr-bench-"))
+for _role in ("ANONYMOUS", "GENERALUSER", "PREMIUMUSER", "ADMINISTRATOR"):
+    os.environ.setdefault(f"RATE_LIMIT_{_role}_RATE", "1e9")
+    os.environ.setdefault(f"RATE_LIMIT_{_role}_BURST", "1e9")
+
+import prisma  # noqa: E402
+import prisma.enums  # noqa: E402
+import prisma.models  # noqa: E402
+from benchmarks.bench_rasterizer import PAYLOAD  # noqa: E402
+from benchmarks.bench_render_stages import run_metadata  # noqa: E402
+
+ENDPOINTS = ["generate", "customize", "batch_create", "permission_check"]
+API_KEY = "bench-api-key"
+USER_ID = "bench-user"
+
+
+def matches(row: SimpleNamespace, where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Checks the equality conditions of a Prisma `where`; operators and relations are ignored.
+    """
+    return all(
+        getattr(row, field, None) == value
+        for field, value in (where or {}).items()
+        if not isinstance(value, (dict, list))
+    )
+
+
+class InMemoryTable:
+    """
+    Stand-in for a model's Prisma actions, holding rows as namespaces in a list.
+    """
+
+    def __init__(self, relations: Optional[Dict[str, "InMemoryTable"]] = None) -> None:
+        self.rows: List[SimpleNamespace] = []
+        self.relations = relations or {}
+
+    def insert(self, data: Dict[str, Any]) -> SimpleNamespace:
+        fields = {
+            key: value for key, value in data.items() if not isinstance(value, dict)
+        }
+        row = SimpleNamespace(id=uuid.uuid4().hex, **fields)
+        self.rows.append(row)
+        return row
+
+    def find(self, where: Optional[Dict[str, Any]]) -> Optional[SimpleNamespace]:
+        return next((row for row in self.rows if matches(row, where)), None)
+
+    def with_relations(
+        self, row: Optional[SimpleNamespace], include: Optional[Dict[str, Any]]
+    ) -> Optional[SimpleNamespace]:
+        if row is None or not include:
+            return row
+        related = {
+            name: self.relations[name].find({"id": getattr(row, f"{name.lower()}Id")})
+            for name in include
+            if name in self.relations
+        }
+        return SimpleNamespace(**vars(row), **related)
+
+    async def create(self, data: Dict[str, Any], **kwargs) -> SimpleNamespace:
+        return self.insert(data)
+
+    async def create_many(self, data: List[Dict[str, Any]], **kwargs) -> int:
+        for item in data:
+            self.insert(item)
+        return len(data)
+
+    async def find_unique(self, where: Dict[str, Any], include=None, **kwargs):
+        return self.with_relations(self.find(where), include)
+
+    async def find_first(self, where=None, include=None, **kwargs):
+        return self.with_relations(self.find(where), include)
+
+    async def find_many(self, where=None, take: Optional[int] = None, **kwargs):
+        rows = [row for row in self.rows if matches(row, where)]
+        return rows if take is None else rows[:take]
+
+    async def update(self, where: Dict[str, Any], data: Dict[str, Any], **kwargs):
+        row = self.find(where)
+        if row is not None:
+            for key, value in data.items():
+                if not isinstance(value, dict):
+                    setattr(row, key, value)
+        return row
+
+
+class NoSuchKey(Exception):
+    """
+    The error an S3 client raises for a missing object.
+    """
+
+    response = {"Error": {"Code": "NoSuchKey"}}
+
+
+class InMemoryS3Client:
+    """
+    Stand-in for a boto3 S3 client, holding objects in a dict.
+    """
+
+    def __init__(self) -> None:
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> dict:
+        self.objects[(Bucket, Key)] = bytes(Body)
+        return {}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        if (Bucket, Key) not in self.objects:
+            raise NoSuchKey(Key)
+        return {"Body": BytesIO(self.objects[(Bucket, Key)])}
+
+    def head_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        if (Bucket, Key) not in self.objects:
+            raise NoSuchKey(Key)
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+
+class InMemoryClient:
+    """
+    Stand-in for the registered Prisma client: transactions and raw statements are no-ops.
+    """
+
+    def tx(self, **kwargs) -> "InMemoryClient":
+        return self
+
+    async def __aenter__(self) -> "InMemoryClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+    async def execute_raw(self, query: str, *args) -> int:
+        return 0
+
+
+def install_in_memory_database() -> Dict[str, InMemoryTable]:
+    """
+    Points the Prisma models used by the benchmarked endpoints at in-memory tables.
+    """
+    users = InMemoryTable()
+    tables = {
+        "User": users,
+        "APIKey": InMemoryTable(relations={"User": users}),
+        "QRCodeRequest": InMemoryTable(),
+        "BatchRequest": InMemoryTable(),
+        "Customization": InMemoryTable(),
+        "UserPreference": InMemoryTable(),
+        "RevokedToken": InMemoryTable(),
+    }
+    for name, table in tables.items():
+        setattr(
+            getattr(prisma.models, name),
+            "prisma",
+            staticmethod(lambda client=None, table=table: table),
+        )
+    client = InMemoryClient()
+    prisma.get_client = lambda: client
+    users.rows.append(SimpleNamespace(id=USER_ID, role=prisma.enums.Role.PREMIUMUSER))
+    tables["APIKey"].rows.append(
+        SimpleNamespace(id="bench-key", key=API_KEY, userId=USER_ID)
+    )
+    return tables
+
+
+async def call(
+    app, method: str, path: str, query: Dict[str, Any], body: Optional[Any] = None
+) -> int:
+    """
+    Sends one request to the ASGI app and returns the response status.
+    """
+    content = b"" if body is None else json.dumps(body).encode("utf8")
+    headers = [(b"host", b"bench")]
+    if body is not None:
+        headers.append((b"content-type", b"application/json"))
+        headers.append((b"content-length", str(len(content)).encode("latin-1")))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("latin-1"),
+        "root_path": "",
+        "query_string": urlencode(query).encode("latin-1"),
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    sent = False
+    status = 0
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": content, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def request_factory(
+    endpoint: str, tables: Dict[str, InMemoryTable], repeat: bool, batch_items: int
+):
+    """
+    Returns a function producing the (method, path, query, body) of the n-th request.
+    """
+    qr_code = tables["QRCodeRequest"].insert(
+        {
+            "userId": USER_ID,
+            "data": PAYLOAD,
+            "dataType": "URL",
+            "size": 250,
+            "color": "#000000",
+            "logo": None,
+            "errorCorrection": "MEDIUM",
+            "format": "PNG",
+        }
+    )
+
+    def variant(n: int) -> int:
+        return 0 if repeat else n
+
+    def generate(n: int):
+        return (
+            "POST",
+            "/generate",
+            {
+                "data": f"{PAYLOAD}&n={variant(n)}",
+                "data_type": "URL",
+                "size": 250,
+                "color": "#1a2b3c",
+                "error_correction": "MEDIUM",
+            },
+            None,
+        )
+
+    def customize(n: int):
+        return (
+            "POST",
+            "/customize",
+            {
+                "qr_code_id": qr_code.id,
+                "color": f"#{variant(n) % 0xFFFFFF:06x}",
+                "size": 250,
+            },
+            None,
+        )
+
+    def batch_create(n: int):
+        items = [
+            {
+                "data": f"{PAYLOAD}&n={n}&i={i}",
+                "dataType": "URL",
+                "size": 250,
+                "color": "#1a2b3c",
+                "errorCorrection": "MEDIUM",
+            }
+            for i in range(batch_items)
+        ]
+        return "POST", "/batch/create", {"userId": USER_ID}, items
+
+    def permission_check(n: int):
+        return (
+            "GET",
+            "/auth/permission/check",
+            {"token": API_KEY, "action": "create_qr_code"},
+            None,
+        )
+
+    return {
+        "generate": generate,
+        "customize": customize,
+        "batch_create": batch_create,
+        "permission_check": permission_check,
+    }[endpoint]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    index = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+async def run_endpoint(
+    app, make_request, requests: int, concurrency: int, warmup: int
+) -> dict:
+    for n in range(warmup):
+        await call(app, *make_request(-1 - n))
+    counter = count()
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+
+    async def client():
+        while (n := next(counter)) < requests:
+            method, path, query, body = make_request(n)
+            start = time.perf_counter()
+            status = await call(app, method, path, query, body)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "requests_per_s": requests / elapsed,
+        "p50_s": percentile(latencies, 0.50),
+        "p95_s": percentile(latencies, 0.95),
+        "p99_s": percentile(latencies, 0.99),
+        "statuses": {str(status): n for status, n in sorted(statuses.items())},
+    }
+
+
+async def run(args) -> List[dict]:
+    tables = install_in_memory_database()
+    import project.render_cache
+    import project.render_executor
+    from project.server import app
+    from project.storage import S3StorageBackend
+
+    if args.storage == "s3":
+        project.render_cache.render_cache.storage = S3StorageBackend(
+            "bench", "qrcodes", client=InMemoryS3Client()
+        )
+
+    project.render_executor.render_executor.start()
+    results = []
+    try:
+        for endpoint in args.endpoints:
+            make_request = request_factory(
+                endpoint, tables, args.repeat_payloads, args.batch_items
+            )
+            result = await run_endpoint(
+                app, make_request, args.requests, args.concurrency, args.warmup
+            )
+            result["endpoint"] = endpoint
+            results.append(result)
+            print(
+                f"{endpoint:>17} {result['requests_per_s']:>9.1f} "
+                f"{result['p50_s'] * 1000:>8.2f} {result['p95_s'] * 1000:>8.2f} "
+                f"{result['p99_s'] * 1000:>8.2f}  {result['statuses']}"
+            )
+    finally:
+        project.render_executor.render_executor.shutdown()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--batch-items", type=int, default=100)
+    parser.add_argument("--repeat-payloads", action="store_true")
+    parser.add_argument("--storage", choices=["local", "s3"], default="local")
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+    print(f"{'endpoint':>17} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "benchmark": "api_load",
+                    "metadata": {**run_metadata(), **vars(args)},
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
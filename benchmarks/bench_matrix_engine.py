@@ -0,0 +1,68 @@
+"""
+Compares building the module matrix with qrcode (per-mask makeImpl + lost_point)
+against the matrix engine, cold and memoized, and checks both agree.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_matrix_engine [--lengths 20 200 1500] [--json results.json]
+"""
+
+import argparse
+import json
+
+import numpy as np
+from benchmarks.bench_rasterizer import PAYLOAD, time_call
+from project.matrix_engine import encode_matrix
+from project.qr_renderer import ERROR_CORRECTION_LEVELS, build_qr
+
+DEFAULT_LENGTHS = [20, 60, 200, 600, 1500]
+
+
+def bench_length(length: int, error_correction: str) -> dict:
+    data = (PAYLOAD * (length // len(PAYLOAD) + 1))[:length]
+    level = ERROR_CORRECTION_LEVELS[error_correction]
+    qr = build_qr(data, "URL", 100, error_correction)
+    matrix = encode_matrix.__wrapped__(data, "URL", level)
+    if not (np.array(qr.modules) == matrix.modules).all():
+        raise AssertionError(f"matrix mismatch for length {length}")
+    encode_matrix(data, "URL", level)
+    return {
+        "length": length,
+        "error_correction": error_correction,
+        "version": matrix.info.version,
+        "mask_pattern": matrix.info.mask_pattern,
+        "qrcode_s": time_call(lambda: build_qr(data, "URL", 100, error_correction)),
+        "engine_cold_s": time_call(
+            lambda: encode_matrix.__wrapped__(data, "URL", level)
+        ),
+        "engine_memoized_s": time_call(lambda: encode_matrix(data, "URL", level)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lengths", type=int, nargs="+", default=DEFAULT_LENGTHS)
+    parser.add_argument("--error-correction", default="MEDIUM")
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+    results = []
+    print(
+        f"{'length':>6} {'version':>7} {'qrcode ms':>10} {'cold ms':>9} "
+        f"{'memo us':>9} {'speedup':>8}"
+    )
+    for length in args.lengths:
+        result = bench_length(length, args.error_correction)
+        results.append(result)
+        print(
+            f"{result['length']:>6} {result['version']:>7} "
+            f"{result['qrcode_s'] * 1000:>10.2f} {result['engine_cold_s'] * 1000:>9.2f} "
+            f"{result['engine_memoized_s'] * 1e6:>9.2f} "
+            f"{result['qrcode_s'] / result['engine_cold_s']:>7.1f}x"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "matrix_engine", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Measures PNG output size and encode time for RGB vs 1-bit palette images across zlib settings.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_png_encoding [--sizes 250 1000] [--json results.json]
+"""
+
+import argparse
+import json
+from io import BytesIO
+
+from benchmarks.bench_rasterizer import PAYLOAD, time_call
+from project.qr_renderer import (
+    ZLIB_STRATEGIES,
+    PngEncoding,
+    build_qr,
+    encode_png,
+    rasterize_modules,
+)
+
+DEFAULT_SIZES = [250, 1000, 2000]
+LEVELS = [1, 6, 9]
+
+
+def encode_rgb(img, level: int) -> bytes:
+    buffer = BytesIO()
+    img.convert("RGB").save(buffer, format="PNG", compress_level=level)
+    return buffer.getvalue()
+
+
+def bench_size(size: int) -> list:
+    qr = build_qr(PAYLOAD, "URL", size, "MEDIUM")
+    img = rasterize_modules(qr.modules, qr.box_size, "#1a2b3c")
+    rgb = img.convert("RGB")
+    results = []
+    for level in LEVELS:
+        results.append(
+            {
+                "size": size,
+                "mode": "RGB",
+                "compress_level": level,
+                "strategy": "default",
+                "bytes": len(encode_rgb(rgb, level)),
+                "encode_s": time_call(lambda: encode_rgb(rgb, level)),
+            }
+        )
+        for strategy in ZLIB_STRATEGIES:
+            encoding = PngEncoding(level, strategy)
+            results.append(
+                {
+                    "size": size,
+                    "mode": "P1",
+                    "compress_level": level,
+                    "strategy": strategy,
+                    "bytes": len(encode_png(img, encoding)),
+                    "encode_s": time_call(lambda: encode_png(img, encoding)),
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+    results = []
+    print(
+        f"{'size':>6} {'mode':>4} {'level':>5} {'strategy':>9} {'bytes':>10} {'ms':>9}"
+    )
+    for size in args.sizes:
+        for result in bench_size(size):
+            results.append(result)
+            print(
+                f"{result['size']:>6} {result['mode']:>4} {result['compress_level']:>5} "
+                f"{result['strategy']:>9} {result['bytes']:>10} "
+                f"{result['encode_s'] * 1000:>9.2f}"
+            )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "png_encoding", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compares the PIL (qrcode image factory) and NumPy rasterizers used by render_png.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rasterizer [--sizes 100 500 4000] [--json results.json]
+"""
+
+import argparse
+import json
+import time
+from io import BytesIO
+
+from project.qr_renderer import build_qr, rasterize_modules
+
+PAYLOAD = "https://example.com/products/12345?utm_source=qr&utm_medium=print"
+DEFAULT_SIZES = [100, 250, 500, 1000, 2000, 4000]
+
+
+def time_call(fn, min_seconds: float = 0.5, max_repeats: int = 50) -> float:
+    """
+    Calls `fn` repeatedly for roughly `min_seconds` and returns the best time per call.
+    """
+    best = float("inf")
+    spent = 0.0
+    for _ in range(max_repeats):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        if spent >= min_seconds:
+            break
+    return best
+
+
+def bench_size(size: int) -> dict:
+    qr = build_qr(PAYLOAD, "URL", size, "MEDIUM")
+
+    def pil_raster():
+        return qr.make_image(fill_color="#1a2b3c", back_color="white")
+
+    def numpy_raster():
+        return rasterize_modules(qr.modules, qr.box_size, "#1a2b3c")
+
+    def encode(img):
+        buffer = BytesIO()
+        img.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    pil_img = pil_raster()
+    numpy_img = numpy_raster()
+    result = {
+        "size": size,
+        "pixels": numpy_img.size[0],
+        "pil_raster_s": time_call(pil_raster),
+        "numpy_raster_s": time_call(numpy_raster),
+        "pil_encode_s": time_call(lambda: encode(pil_img)),
+        "numpy_encode_s": time_call(lambda: encode(numpy_img)),
+    }
+    result["pil_total_s"] = result["pil_raster_s"] + result["pil_encode_s"]
+    result["numpy_total_s"] = result["numpy_raster_s"] + result["numpy_encode_s"]
+    result["speedup"] = result["pil_total_s"] / result["numpy_total_s"]
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+    results = []
+    print(f"{'size':>6} {'pixels':>7} {'pil ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        result = bench_size(size)
+        results.append(result)
+        print(
+            f"{result['size']:>6} {result['pixels']:>7} "
+            f"{result['pil_total_s'] * 1000:>10.2f} {result['numpy_total_s'] * 1000:>10.2f} "
+            f"{result['speedup']:>7.1f}x"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "rasterizer", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
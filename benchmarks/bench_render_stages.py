@@ -0,0 +1,175 @@
+"""
+Times each stage of rendering a QR code on its own, across payload lengths, image
+sizes and error correction levels:
+
+    encode      data segmentation and Reed-Solomon codewords
+    matrix      laying the codewords over the version template for all eight masks
+    mask        scoring the eight candidates and picking the best
+    rasterize   scaling the module matrix up to an image
+    png         encoding the image with the interactive PNG profile
+    svg         rendering the SVG document from the (memoized) matrix
+
+Run from the repository root:
+
+    python -m benchmarks.bench_render_stages [--lengths 20 200] [--sizes 250 1000]
+        [--error-corrections LOW HIGH] [--json results.json]
+
+The JSON output carries the commit and platform it was measured on, so files from
+two commits can be compared entry by entry.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+import qrcode
+from benchmarks.bench_rasterizer import PAYLOAD, time_call
+from project.encoding_planner import plan_encoding
+from project.matrix_engine import encode_matrix, mask_penalties, version_template
+from project.qr_renderer import (
+    ERROR_CORRECTION_LEVELS,
+    PNG_ENCODING_PROFILES,
+    box_size_for,
+    encode_png,
+    rasterize_modules,
+    render_svg,
+)
+
+DEFAULT_LENGTHS = [20, 200, 1000]
+DEFAULT_SIZES = [250, 1000]
+DEFAULT_ERROR_CORRECTIONS = list(ERROR_CORRECTION_LEVELS)
+STAGES = ["encode", "matrix", "mask", "rasterize", "png", "svg"]
+
+
+def run_metadata() -> dict:
+    """
+    Describes where and on which commit the benchmark ran.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def payload_of_length(length: int) -> str:
+    return (PAYLOAD * (length // len(PAYLOAD) + 1))[:length]
+
+
+def bench_case(
+    length: int, size: int, error_correction: str, min_seconds: float
+) -> dict:
+    data = payload_of_length(length)
+    level = ERROR_CORRECTION_LEVELS[error_correction]
+    plan = plan_encoding(data, "URL", level)
+    template = version_template(plan.version)
+
+    def encode():
+        plan = plan_encoding(data, "URL", level)
+        return qrcode.util.create_data(plan.version, level, plan.qr_data())
+
+    codewords = encode()
+    bits = np.unpackbits(np.array(codewords, dtype=np.uint8)).astype(bool)
+    data_bits = np.zeros(len(template.data_rows), dtype=bool)
+    data_bits[: min(len(bits), len(data_bits))] = bits[: len(data_bits)]
+
+    def build_candidates():
+        candidates = np.repeat(template.function_modules[np.newaxis], 8, axis=0)
+        candidates[:, template.data_rows, template.data_cols] = (
+            data_bits ^ template.data_masks
+        )
+        return candidates
+
+    candidates = build_candidates()
+    matrix = encode_matrix(data, "URL", level)
+    img = rasterize_modules(matrix.modules, box_size_for(size), "#1a2b3c")
+    encoding = PNG_ENCODING_PROFILES["interactive"]
+    timings = {
+        "encode": time_call(encode, min_seconds),
+        "matrix": time_call(build_candidates, min_seconds),
+        "mask": time_call(lambda: mask_penalties(candidates), min_seconds),
+        "rasterize": time_call(
+            lambda: rasterize_modules(matrix.modules, box_size_for(size), "#1a2b3c"),
+            min_seconds,
+        ),
+        "png": time_call(lambda: encode_png(img, encoding), min_seconds),
+        "svg": time_call(
+            lambda: render_svg(data, "URL", size, "#1a2b3c", error_correction),
+            min_seconds,
+        ),
+    }
+    return {
+        "length": length,
+        "size": size,
+        "error_correction": error_correction,
+        "version": matrix.info.version,
+        "pixels": img.size[0],
+        "stages_s": timings,
+        "total_png_s": sum(timings[stage] for stage in STAGES[:5]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--lengths", type=int, nargs="+", default=DEFAULT_LENGTHS)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--error-corrections",
+        nargs="+",
+        default=DEFAULT_ERROR_CORRECTIONS,
+        choices=DEFAULT_ERROR_CORRECTIONS,
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=0.2,
+        help="Time spent repeating each stage; the best run is reported",
+    )
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+    results = []
+    print(
+        f"{'length':>6} {'size':>5} {'ec':>8} {'ver':>3} "
+        + " ".join(f"{stage + ' us':>12}" for stage in STAGES)
+    )
+    for length in args.lengths:
+        for size in args.sizes:
+            for error_correction in args.error_corrections:
+                result = bench_case(length, size, error_correction, args.min_seconds)
+                results.append(result)
+                print(
+                    f"{length:>6} {size:>5} {error_correction:>8} "
+                    f"{result['version']:>3} "
+                    + " ".join(
+                        f"{result['stages_s'][stage] * 1e6:>12.1f}" for stage in STAGES
+                    )
+                )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "benchmark": "render_stages",
+                    "metadata": run_metadata(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import logging
+import os
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+import prisma.enums
+import prisma.models
+from fastapi import Depends, Header, HTTPException
+from jose import JWTError
+from project.lazy_import import lazy_import
+from project.token_cache import TokenIdentity, token_cache
+from project.token_revocation import revocation_list
+
+logger = logging.getLogger(__name__)
+
+jwt = lazy_import("jose.jwt")
+
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", 3600))
+
+if not JWT_SECRET_KEY:
+    logger.warning(
+        "JWT_SECRET_KEY is not set; using a random key, tokens will not survive a restart"
+    )
+    JWT_SECRET_KEY = secrets.token_urlsafe(32)
+
+
+class AccessToken(NamedTuple):
+    """
+    A signed JWT together with its id and expiry.
+    """
+
+    token: str
+    jti: str
+    expires_at: datetime
+
+
+class AuthenticatedUser(NamedTuple):
+    """
+    The user behind a request's token. `jti` and `expires_at` are only set for JWTs.
+    """
+
+    user_id: str
+    role: prisma.enums.Role
+    jti: Optional[str] = None
+    expires_at: Optional[datetime] = None
+
+
+def create_access_token(user_id: str, role: prisma.enums.Role) -> AccessToken:
+    """
+    Issues a JWT carrying the user id, role, a unique id and an expiry ACCESS_TOKEN_TTL seconds out.
+    """
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=ACCESS_TOKEN_TTL)
+    jti = uuid.uuid4().hex
+    claims = {
+        "sub": user_id,
+        "role": prisma.enums.Role(role).value,
+        "jti": jti,
+        "iat": int(now.timestamp()),
+        "exp": int(expires_at.timestamp()),
+    }
+    token = jwt.encode(claims, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+    return AccessToken(token, jti, expires_at)
+
+
+def is_jwt(token: str) -> bool:
+    """
+    Tells JWTs (three dot-separated segments) apart from opaque API keys.
+    """
+    return token.count(".") == 2
+
+
+def decode_access_token(token: str) -> Optional[AuthenticatedUser]:
+    """
+    Verifies a JWT's signature and expiry locally, without checking for revocation.
+
+    Returns:
+        Optional[AuthenticatedUser]: The token's user, or None if the token is invalid or expired.
+    """
+    try:
+        claims = jwt.decode(
+            token,
+            JWT_SECRET_KEY,
+            algorithms=[JWT_ALGORITHM],
+            options={"require_exp": True, "require_sub": True, "require_jti": True},
+        )
+        return AuthenticatedUser(
+            user_id=claims["sub"],
+            role=prisma.enums.Role(claims["role"]),
+            jti=claims["jti"],
+            expires_at=datetime.fromtimestamp(claims["exp"], timezone.utc),
+        )
+    except (JWTError, KeyError, ValueError):
+        return None
+
+
+async def authenticate(token: str) -> Optional[AuthenticatedUser]:
+    """
+    Resolves a bearer token, either a JWT from /auth/login or an API key, to its user.
+
+    JWTs are checked locally and against the in-memory revocation list, so the
+    common case needs no database round trip. API keys are looked up through the
+    token cache, which also remembers unknown keys for a short while.
+
+    Args:
+        token (str): The JWT or API key presented by the client.
+
+    Returns:
+        Optional[AuthenticatedUser]: The authenticated user, or None if the token is invalid.
+    """
+    if is_jwt(token):
+        user = decode_access_token(token)
+        if user is None or await revocation_list.is_revoked(user.jti):
+            return None
+        return user
+    identity = token_cache.get(token)
+    if identity is None:
+        if token_cache.is_invalid(token):
+            return None
+        generation = token_cache.generation()
+        api_key = await prisma.models.APIKey.prisma().find_unique(
+            where={"key": token}, include={"User": True}
+        )
+        if api_key is None or api_key.User is None:
+            token_cache.put_invalid(token)
+            return None
+        identity = TokenIdentity(api_key.User.id, api_key.User.role)
+        token_cache.put(token, identity, generation)
+    return AuthenticatedUser(identity.user_id, identity.role)
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """
+    Extracts the token from an `Authorization: Bearer <token>` header.
+    """
+    if authorization is None:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+async def optional_user(
+    authorization: Optional[str] = Header(None),
+) -> Optional[AuthenticatedUser]:
+    """
+    FastAPI dependency that authenticates the request's bearer token if one is sent.
+
+    Returns:
+        Optional[AuthenticatedUser]: The user, or None for anonymous requests and invalid tokens.
+    """
+    token = bearer_token(authorization)
+    return None if token is None else await authenticate(token)
+
+
+async def current_user(
+    authorization: Optional[str] = Header(None),
+) -> AuthenticatedUser:
+    """
+    FastAPI dependency that authenticates the request's bearer token.
+
+    Raises:
+        HTTPException: With status code 401 if the token is missing, invalid, expired or revoked.
+    """
+    token = bearer_token(authorization)
+    user = None if token is None else await authenticate(token)
+    if user is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or missing bearer token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+async def current_administrator(
+    user: AuthenticatedUser = Depends(current_user),
+) -> AuthenticatedUser:
+    """
+    FastAPI dependency that only lets administrators through.
+
+    Raises:
+        HTTPException: With status code 403 if the user is not an administrator.
+    """
+    if user.role != prisma.enums.Role.ADMINISTRATOR:
+        raise HTTPException(status_code=403, detail="Administrator role required")
+    return user
@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import prisma
+import prisma.enums
+import prisma.models
+from project.generate_qr_code_service import (
+    DataType,
+    ErrorCorrection,
+    Format,
+    QRCodeImage,
+    qr_code_url_for,
+    render_qr_code_image,
+)
+from project.render_executor import render_executor
+
+logger = logging.getLogger(__name__)
+
+BATCH_POLL_INTERVAL = float(os.getenv("BATCH_POLL_INTERVAL", 1.0))
+BATCH_CONCURRENCY = int(
+    os.getenv("BATCH_CONCURRENCY", max(render_executor.queue_size // 2, 1))
+)
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", 500))
+# Seconds a claim on a batch lasts without renewal; renewed after every chunk.
+BATCH_LEASE_SECONDS = float(os.getenv("BATCH_LEASE_SECONDS", 300))
+
+
+class BatchWorker:
+    """
+    Background engine that claims queued batch requests and renders their QR codes.
+
+    Batches are claimed with a conditional QUEUED -> PROCESSING update so several
+    server processes can run a worker against the same database. Items are
+    rendered on the shared rendering executor, but never more than
+    `concurrency` at a time, which leaves capacity for interactive requests.
+
+    A claim is a lease: it carries a random `claimId` and expires after
+    `lease_seconds` unless renewed, which happens after every chunk. Batches
+    whose lease expired, because their worker crashed or hung, are returned to
+    the queue, and a worker only writes to a batch while its claim is current.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float,
+        concurrency: int,
+        chunk_size: int,
+        lease_seconds: float,
+    ) -> None:
+        self.poll_interval = poll_interval
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self._task: Optional[asyncio.Task] = None
+        # (batch id, claim id) of the batch being processed.
+        self._current: Optional[tuple[str, str]] = None
+        self._next_requeue = 0.0
+
+    def start(self) -> None:
+        """
+        Starts polling for queued batches on the running event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stops the polling loop and returns the batch in progress (if any) to the queue.
+
+        Items already rendered keep their results, so the next worker to claim
+        the batch only renders the rest.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._current is not None:
+            batch_id, claim_id = self._current
+            self._current = None
+            try:
+                await prisma.models.BatchRequest.prisma().update_many(
+                    where={"id": batch_id, "claimId": claim_id},
+                    data={
+                        "status": prisma.enums.BatchStatus.QUEUED,
+                        "claimId": None,
+                        "leaseExpiresAt": None,
+                    },
+                )
+            except Exception:
+                logger.exception("Could not return batch %s to the queue", batch_id)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if time.monotonic() >= self._next_requeue:
+                    await self.requeue_expired()
+                    self._next_requeue = time.monotonic() + self.lease_seconds
+                batch = await self.claim_next()
+                if batch is None:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                await self.process(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Batch worker iteration failed")
+                await asyncio.sleep(self.poll_interval)
+
+    def _lease_expiry(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+
+    async def requeue_expired(self) -> int:
+        """
+        Returns PROCESSING batches whose lease has expired to the queue.
+
+        Runs when the worker starts and then once per lease period.
+
+        Returns:
+            int: The number of batches requeued.
+        """
+        requeued = await prisma.models.BatchRequest.prisma().update_many(
+            where={
+                "status": prisma.enums.BatchStatus.PROCESSING,
+                "OR": [
+                    {"leaseExpiresAt": None},
+                    {"leaseExpiresAt": {"lt": datetime.now(timezone.utc)}},
+                ],
+            },
+            data={
+                "status": prisma.enums.BatchStatus.QUEUED,
+                "claimId": None,
+                "leaseExpiresAt": None,
+            },
+        )
+        if requeued:
+            logger.warning("Requeued %d batches with an expired lease", requeued)
+        return requeued
+
+    async def claim_next(self) -> Optional[prisma.models.BatchRequest]:
+        """
+        Claims the oldest queued batch by moving it to PROCESSING under a new lease.
+
+        Returns:
+            Optional[prisma.models.BatchRequest]: The claimed batch, or None if no batch
+            is queued or another worker claimed the candidate first.
+        """
+        candidate = await prisma.models.BatchRequest.prisma().find_first(
+            where={"status": prisma.enums.BatchStatus.QUEUED},
+            order={"createdAt": "asc"},
+        )
+        if candidate is None:
+            return None
+        claim_id = str(uuid.uuid4())
+        claimed = await prisma.models.BatchRequest.prisma().update_many(
+            where={"id": candidate.id, "status": prisma.enums.BatchStatus.QUEUED},
+            data={
+                "status": prisma.enums.BatchStatus.PROCESSING,
+                "claimId": claim_id,
+                "leaseExpiresAt": self._lease_expiry(),
+            },
+        )
+        if not claimed:
+            return None
+        candidate.claimId = claim_id
+        return candidate
+
+    async def renew_lease(self, batch: prisma.models.BatchRequest) -> bool:
+        """
+        Extends the lease on a claimed batch.
+
+        Returns:
+            bool: False if the claim is no longer current, e.g. because the lease
+            expired and the batch was requeued.
+        """
+        renewed = await prisma.models.BatchRequest.prisma().update_many(
+            where={"id": batch.id, "claimId": batch.claimId},
+            data={"leaseExpiresAt": self._lease_expiry()},
+        )
+        return bool(renewed)
+
+    async def process(self, batch: prisma.models.BatchRequest) -> None:
+        """
+        Renders every pending item of a claimed batch and stamps its final status.
+
+        Items are fetched and written back in chunks. Each item either gets its
+        stored image (`outputUrl`, `outputImage`, `outputBytes`) or a
+        `renderError`, so a chunk is never fetched twice. The
+        batch ends COMPLETED unless every item failed or processing aborted. If
+        the claim is lost, the batch is left to the worker that holds it now.
+
+        Args:
+            batch (prisma.models.BatchRequest): A batch previously returned by `claim_next`.
+        """
+        # Left set if processing is cancelled, so `stop` can requeue the batch.
+        self._current = (batch.id, batch.claimId)
+        await self._process_items(batch)
+        self._current = None
+
+    async def _process_items(self, batch: prisma.models.BatchRequest) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        rendered = failed = 0
+        try:
+            while True:
+                items = await prisma.models.QRCodeRequest.prisma().find_many(
+                    where={
+                        "batchRequestId": batch.id,
+                        "outputUrl": None,
+                        "renderError": None,
+                    },
+                    take=self.chunk_size,
+                    order={"id": "asc"},
+                )
+                if not items:
+                    break
+                results = await asyncio.gather(
+                    *[self._render_item(item, semaphore) for item in items]
+                )
+                async with prisma.get_client().batch_() as batcher:
+                    for item, (image, error) in zip(items, results):
+                        if error is None:
+                            rendered += 1
+                            data = {
+                                "outputUrl": qr_code_url_for(image.path),
+                                "outputImage": image.image,
+                                "outputBytes": image.image_bytes,
+                            }
+                        else:
+                            failed += 1
+                            data = {"renderError": error}
+                        batcher.qrcoderequest.update(where={"id": item.id}, data=data)
+                if not await self.renew_lease(batch):
+                    logger.warning("Lost the claim on batch %s", batch.id)
+                    return
+            status = (
+                prisma.enums.BatchStatus.FAILED
+                if failed and not rendered
+                else prisma.enums.BatchStatus.COMPLETED
+            )
+        except Exception:
+            logger.exception("Batch %s failed", batch.id)
+            status = prisma.enums.BatchStatus.FAILED
+        await prisma.models.BatchRequest.prisma().update_many(
+            where={"id": batch.id, "claimId": batch.claimId},
+            data={
+                "status": status,
+                "completedAt": datetime.now(timezone.utc),
+                "claimId": None,
+                "leaseExpiresAt": None,
+            },
+        )
+        logger.info(
+            "Batch %s finished as %s (%d rendered, %d failed)",
+            batch.id,
+            status,
+            rendered,
+            failed,
+        )
+
+    async def _render_item(
+        self, item: prisma.models.QRCodeRequest, semaphore: asyncio.Semaphore
+    ) -> tuple[Optional[QRCodeImage], Optional[str]]:
+        async with semaphore:
+            try:
+                image = await render_qr_code_image(
+                    item.data,
+                    DataType(item.dataType),
+                    item.size,
+                    item.color,
+                    ErrorCorrection(item.errorCorrection),
+                    Format(item.format),
+                    background=True,
+                    logo=item.logo,
+                )
+            except Exception as e:
+                return None, str(e) or type(e).__name__
+        return image, None
+
+
+batch_worker = BatchWorker(
+    BATCH_POLL_INTERVAL, BATCH_CONCURRENCY, BATCH_CHUNK_SIZE, BATCH_LEASE_SECONDS
+)
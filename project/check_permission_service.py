@@ -2,7 +2,7 @@ from typing import Optional
 
 import prisma
 import prisma.enums
-import prisma.models
+from project.auth import authenticate
 from pydantic import BaseModel
 
 
@@ -21,6 +21,8 @@ async def check_permission(token: str, action: str) -> CheckPermissionResponse:
 
     This function fetches the user associated with the provided token from the APIKeys table. It checks the user's role and determines if they are authorized to perform the requested action. Restrictions are applied based on predetermined rules for different user roles. An administrator can perform any action, while a general user has restricted access.
 
+    The token may be an API key or a JWT issued by /auth/login. JWTs are verified locally against the in-memory revocation list; API keys are resolved through the token cache, with one joined query on a miss.
+
     Args:
     token (str): The authentication token of the user. This token is used to identify and authenticate the user.
     action (str): The specific action the user is attempting to perform. This will be used to check against the user's permissions.
@@ -37,14 +39,11 @@ async def check_permission(token: str, action: str) -> CheckPermissionResponse:
         else:
             print(f'Unauthorized: {response.message}')
     """
-    api_key = await prisma.models.APIKey.prisma().find_unique(where={"key": token})
-    if api_key is None:
+    user = await authenticate(token)
+    if user is None:
         return CheckPermissionResponse(
             is_authorized=False, message="Invalid API Token."
         )
-    user = await prisma.models.User.prisma().find_unique(where={"id": api_key.userId})
-    if user is None:
-        return CheckPermissionResponse(is_authorized=False, message="User not found.")
     if action == "create_qr_code":
         if user.role in [
             prisma.enums.Role.PREMIUMUSER,
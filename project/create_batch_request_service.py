@@ -1,21 +1,27 @@
+import os
+from datetime import timedelta
 from enum import Enum
 from typing import List, Optional
 
 import prisma
 import prisma.models
+from project.user_preferences import resolve_generation_options
 from pydantic import BaseModel
 
+BATCH_INSERT_CHUNK_SIZE = int(os.getenv("BATCH_INSERT_CHUNK_SIZE", 1000))
+BATCH_INSERT_TIMEOUT = float(os.getenv("BATCH_INSERT_TIMEOUT", 60))
+
 
 class DataType(Enum):
     """
     An enumeration type that specifies the different types of data that can be encoded into a QR code.
     """
 
-    URL: str
-    TEXT: str
-    VCARD: str
-    JSON: str
-    CSV: str
+    URL = "URL"
+    TEXT = "TEXT"
+    VCARD = "VCARD"
+    JSON = "JSON"
+    CSV = "CSV"
 
 
 class ErrorCorrection(Enum):
@@ -23,10 +29,19 @@ class ErrorCorrection(Enum):
     Enumeration type that specifies the allowable error correction levels for QR codes.
     """
 
-    LOW: str
-    MEDIUM: str
-    QUARTILE: str
-    HIGH: str
+    LOW = "LOW"
+    MEDIUM = "MEDIUM"
+    QUARTILE = "QUARTILE"
+    HIGH = "HIGH"
+
+
+class Format(Enum):
+    """
+    Output formats in which a QR code can be rendered.
+    """
+
+    PNG = "PNG"
+    SVG = "SVG"
 
 
 class QRCodeRequestInput(BaseModel):
@@ -36,10 +51,11 @@ class QRCodeRequestInput(BaseModel):
 
     data: str
     dataType: DataType
-    size: int
-    color: str
+    size: Optional[int] = None
+    color: Optional[str] = None
     logo: Optional[str] = None
-    errorCorrection: ErrorCorrection
+    errorCorrection: Optional[ErrorCorrection] = None
+    format: Format = Format.PNG
 
 
 class CreateBatchResponse(BaseModel):
@@ -63,24 +79,53 @@ async def create_batch_request(
 
     Returns:
     CreateBatchResponse: Response model for a submitted batch QR code request. Provides an identifier for the batch request and a message indicating the request has been queued.
+
+    Omitted sizes, colors and error correction levels are filled in from the
+    user's preferences, falling back to the defaults. An invalid color or size
+    in any item rejects the whole batch with InvalidColorError or InvalidSizeError.
+
+    The batch row and all of its items are written in one transaction, with the
+    items inserted in chunks of BATCH_INSERT_CHUNK_SIZE rows per statement, so the
+    batch worker never observes a partially created batch.
     """
-    batch_request = await prisma.models.BatchRequest.prisma().create(
-        data={"userId": userId, "status": "QUEUED"}
-    )
+    items = []
     for qr_request in qrCodeRequests:
-        await prisma.models.QRCodeRequest.prisma().create(
-            data={
-                "userId": userId,
-                "data": qr_request.data,
-                "dataType": qr_request.dataType,
-                "size": qr_request.size,
-                "color": qr_request.color,
-                "logo": qr_request.logo,
-                "errorCorrection": qr_request.errorCorrection,
-                "format": "PNG",
-                "batchRequestId": batch_request.id,
-            }
+        options = await resolve_generation_options(
+            userId,
+            qr_request.size,
+            qr_request.color,
+            (
+                None
+                if qr_request.errorCorrection is None
+                else qr_request.errorCorrection.value
+            ),
+        )
+        items.append((qr_request, options))
+    async with prisma.get_client().tx(
+        timeout=timedelta(seconds=BATCH_INSERT_TIMEOUT)
+    ) as transaction:
+        batch_request = await prisma.models.BatchRequest.prisma(transaction).create(
+            data={"userId": userId, "status": "QUEUED"}
         )
+        for start in range(0, len(items), BATCH_INSERT_CHUNK_SIZE):
+            await prisma.models.QRCodeRequest.prisma(transaction).create_many(
+                data=[
+                    {
+                        "userId": userId,
+                        "data": qr_request.data,
+                        "dataType": qr_request.dataType.value,
+                        "size": options.size,
+                        "color": options.color,
+                        "logo": qr_request.logo,
+                        "errorCorrection": options.error_correction,
+                        "format": qr_request.format.value,
+                        "batchRequestId": batch_request.id,
+                    }
+                    for qr_request, options in items[
+                        start : start + BATCH_INSERT_CHUNK_SIZE
+                    ]
+                ]
+            )
     return CreateBatchResponse(
         batchRequestId=batch_request.id,
         message="Batch request is queued and being processed.",
@@ -1,7 +1,16 @@
 from typing import Optional
 
 import prisma
+import prisma.enums
 import prisma.models
+from project.generate_qr_code_service import (
+    DataType,
+    ErrorCorrection,
+    Format,
+    qr_code_url_for,
+    render_qr_code_image,
+)
+from project.user_preferences import validate_color, validate_size
 from pydantic import BaseModel
 
 
@@ -11,6 +20,8 @@ class CustomizeQRCodeResponse(BaseModel):
     """
 
     qr_code_url: str
+    version: Optional[int] = None
+    mask_pattern: Optional[int] = None
 
 
 async def customize_qr_code(
@@ -19,6 +30,15 @@ async def customize_qr_code(
     """
     Applies customization options to a generated QR code.
 
+    The QR code is rendered with the new style first; only once that succeeded
+    is the style written and recorded as Customization rows in a single
+    `update` query. A render that fails, e.g. on a saturated executor, leaves
+    the QR code unchanged, so retrying does not record the customization twice.
+    Only the style changes: the module matrix is looked up in the render
+    workers' matrix cache by payload and error correction level rather than
+    encoded again, and an identical earlier customization is served straight
+    from the render cache.
+
     Args:
     qr_code_id (str): Identifier of the QR code to customize.
     color (str): The desired color for the QR code. Accepts hexadecimal color codes.
@@ -27,16 +47,47 @@ async def customize_qr_code(
 
     Returns:
     CustomizeQRCodeResponse: The outcome of a QR code customization request, providing the resultant QR code image URL or path.
+
+    Raises:
+    InvalidColorError: If the color is not a hex code or a known color name.
+    InvalidSizeError: If the size is below MIN_QR_SIZE or above MAX_QR_SIZE.
+    RenderQueueFullError: If the rendering executor is saturated.
     """
+    validate_color(color)
+    validate_size(size)
+    customizations = [
+        {"type": prisma.enums.CustomizationType.COLOR, "value": color},
+        {"type": prisma.enums.CustomizationType.SIZE, "value": str(size)},
+    ]
+    if logo is not None:
+        customizations.append(
+            {"type": prisma.enums.CustomizationType.LOGO, "value": logo}
+        )
     qr_code_request = await prisma.models.QRCodeRequest.prisma().find_unique(
         where={"id": qr_code_id}
     )
     if qr_code_request is None:
         raise ValueError("QRCodeRequest not found.")
+    image = await render_qr_code_image(
+        qr_code_request.data,
+        DataType(qr_code_request.dataType),
+        size,
+        color,
+        ErrorCorrection(qr_code_request.errorCorrection),
+        Format(qr_code_request.format),
+        logo=logo,
+    )
     await prisma.models.QRCodeRequest.prisma().update(
-        where={"id": qr_code_id}, data={"color": color, "size": size, "logo": logo}
+        where={"id": qr_code_id},
+        data={
+            "color": color,
+            "size": size,
+            "logo": logo,
+            "Customizations": {"create": customizations},
+        },
     )
-    customized_qr_code_url = (
-        f"https://example.com/path/to/customized/qr_code_id_{qr_code_id}.png"
+    return CustomizeQRCodeResponse(
+        qr_code_url=qr_code_url_for(image.path),
+        version=image.info.version,
+        mask_pattern=image.info.mask_pattern,
     )
-    return CustomizeQRCodeResponse(qr_code_url=customized_qr_code_url)
@@ -0,0 +1,184 @@
+from typing import List, NamedTuple, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import qrcode.exceptions
+import qrcode.util
+
+NUMERIC_CHARS = frozenset("0123456789")
+ALPHANUMERIC_CHARS = frozenset(qrcode.util.ALPHA_NUM.decode("ascii"))
+MODES = (
+    qrcode.util.MODE_8BIT_BYTE,
+    qrcode.util.MODE_ALPHA_NUM,
+    qrcode.util.MODE_NUMBER,
+)
+# Per character cost of each mode in sixths of a bit (8, 5.5 and 3.33 bits).
+SIXTHS_PER_CHAR = {
+    qrcode.util.MODE_ALPHA_NUM: 33,
+    qrcode.util.MODE_NUMBER: 20,
+}
+# Character count indicator widths only change at these version boundaries.
+VERSION_GROUPS = ((1, 9), (10, 26), (27, 40))
+
+
+class Segment(NamedTuple):
+    """
+    A run of characters encoded in a single QR mode.
+    """
+
+    mode: int
+    text: str
+
+
+class EncodingPlan(NamedTuple):
+    """
+    The smallest QR version able to hold the data and the segments to encode it with.
+    """
+
+    version: int
+    segments: List[Segment]
+    bits: int
+
+    def qr_data(self) -> List[qrcode.util.QRData]:
+        """
+        Converts the segments into qrcode data chunks, in order.
+        """
+        return [
+            qrcode.util.QRData(segment.text, mode=segment.mode)
+            for segment in self.segments
+        ]
+
+
+def normalize_data(data: str, data_type: str) -> str:
+    """
+    Rewrites the payload into an equivalent form that encodes more compactly.
+
+    URLs get their scheme and host upper-cased: both are case-insensitive, and
+    upper case letters (together with ':', '/', '.' and '-') fit the
+    alphanumeric mode. Path, query and fragment are case-sensitive and kept as is.
+    Internationalized hosts are left alone, since upper-casing them does not
+    preserve their identity (e.g. 'ß' becomes 'SS'). Other data types are
+    encoded verbatim.
+
+    Args:
+        data (str): The payload to encode.
+        data_type (str): Name of the data type, e.g. 'URL' or 'CSV'.
+
+    Returns:
+        str: The payload to hand to the planner.
+    """
+    if data_type != "URL":
+        return data
+    try:
+        parts = urlsplit(data)
+    except ValueError:
+        return data
+    if not parts.scheme or not parts.netloc or "@" in parts.netloc:
+        return data
+    if not parts.netloc.isascii():
+        return data
+    return urlunsplit(
+        (
+            parts.scheme.upper(),
+            parts.netloc.upper(),
+            parts.path,
+            parts.query,
+            parts.fragment,
+        )
+    )
+
+
+def segment_bits(segment: Segment, version: int) -> int:
+    """
+    Exact number of bits the segment occupies, header included.
+    """
+    header = 4 + qrcode.util.length_in_bits(segment.mode, version)
+    if segment.mode == qrcode.util.MODE_NUMBER:
+        count = len(segment.text)
+        return header + 10 * (count // 3) + (0, 4, 7)[count % 3]
+    if segment.mode == qrcode.util.MODE_ALPHA_NUM:
+        count = len(segment.text)
+        return header + 11 * (count // 2) + 6 * (count % 2)
+    return header + 8 * len(segment.text.encode("utf8"))
+
+
+def optimal_segments(data: str, version: int) -> List[Segment]:
+    """
+    Splits the data into numeric, alphanumeric and byte segments with minimal total length.
+
+    Dynamic programming over the characters, tracking for each mode the cheapest
+    encoding of the prefix that ends in that mode (costs in sixths of a bit).
+    Switching modes costs a segment header, whose size depends on the version.
+
+    Args:
+        data (str): The payload to encode.
+        version (int): QR version whose character count indicator widths apply.
+
+    Returns:
+        List[Segment]: The segments, in order.
+    """
+    if not data:
+        return [Segment(qrcode.util.MODE_8BIT_BYTE, "")]
+    head_costs = [(4 + qrcode.util.length_in_bits(mode, version)) * 6 for mode in MODES]
+    costs: List[Optional[int]] = list(head_costs)
+    # char_modes[i][j]: mode of character i on the cheapest path ending in MODES[j].
+    char_modes: List[List[Optional[int]]] = []
+    for char in data:
+        step: List[Optional[int]] = [None] * len(MODES)
+        modes: List[Optional[int]] = [None] * len(MODES)
+        step[0] = costs[0] + 48 * len(char.encode("utf8"))
+        modes[0] = MODES[0]
+        if char in ALPHANUMERIC_CHARS:
+            step[1] = costs[1] + SIXTHS_PER_CHAR[MODES[1]]
+            modes[1] = MODES[1]
+        if char in NUMERIC_CHARS:
+            step[2] = costs[2] + SIXTHS_PER_CHAR[MODES[2]]
+            modes[2] = MODES[2]
+        encoded = list(step)
+        for to_index in range(len(MODES)):
+            for from_index in range(len(MODES)):
+                if encoded[from_index] is None:
+                    continue
+                switched = -(-encoded[from_index] // 6) * 6 + head_costs[to_index]
+                if step[to_index] is None or switched < step[to_index]:
+                    step[to_index] = switched
+                    modes[to_index] = MODES[from_index]
+        costs = step
+        char_modes.append(modes)
+    current = MODES[min(range(len(MODES)), key=lambda index: -(-costs[index] // 6))]
+    chosen: List[int] = [0] * len(data)
+    for index in range(len(data) - 1, -1, -1):
+        current = char_modes[index][MODES.index(current)]
+        chosen[index] = current
+    segments: List[Segment] = []
+    start = 0
+    for index in range(1, len(data) + 1):
+        if index == len(data) or chosen[index] != chosen[start]:
+            segments.append(Segment(chosen[start], data[start:index]))
+            start = index
+    return segments
+
+
+def plan_encoding(data: str, data_type: str, error_correction: int) -> EncodingPlan:
+    """
+    Picks the smallest QR version, and its optimal segmentation, that fits the data.
+
+    Args:
+        data (str): The payload to encode.
+        data_type (str): Name of the data type, e.g. 'URL' or 'CSV'.
+        error_correction (int): qrcode error correction constant.
+
+    Returns:
+        EncodingPlan: The chosen version, segments and their bit length.
+
+    Raises:
+        qrcode.exceptions.DataOverflowError: If the data does not fit in version 40.
+    """
+    data = normalize_data(data, data_type)
+    limits = qrcode.util.BIT_LIMIT_TABLE[error_correction]
+    for first, last in VERSION_GROUPS:
+        segments = optimal_segments(data, first)
+        bits = sum(segment_bits(segment, first) for segment in segments)
+        for version in range(first, last + 1):
+            if bits <= limits[version]:
+                return EncodingPlan(version, segments, bits)
+    raise qrcode.exceptions.DataOverflowError()
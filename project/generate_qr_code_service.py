@@ -1,19 +1,34 @@
+import os
 from enum import Enum
+from typing import NamedTuple, Optional, Tuple
 
-import qrcode
+from fastapi.responses import Response
+from project.lazy_import import lazy_import
+from project.logo_pipeline import load_logo
+from project.render_cache import RenderInfo, render_cache, render_key
+from project.render_executor import render_executor
+from project.user_preferences import resolve_generation_options
 from pydantic import BaseModel
 
+QR_CODE_BASE_URL = os.getenv("QR_CODE_BASE_URL", "https://example.com")
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Images styled by a user's preferences change when the preferences do.
+PERSONALIZED_IMAGE_CACHE_CONTROL = "private, no-cache"
+
+# Loaded on the first render, so importing the API does not pull in numpy, Pillow and qrcode.
+qr_renderer = lazy_import("project.qr_renderer")
+
 
 class DataType(Enum):
     """
     An enumeration type that specifies the different types of data that can be encoded into a QR code.
     """
 
-    URL: str
-    TEXT: str
-    VCARD: str
-    JSON: str
-    CSV: str
+    URL = "URL"
+    TEXT = "TEXT"
+    VCARD = "VCARD"
+    JSON = "JSON"
+    CSV = "CSV"
 
 
 class ErrorCorrection(Enum):
@@ -21,10 +36,19 @@ class ErrorCorrection(Enum):
     Enumeration type that specifies the allowable error correction levels for QR codes.
     """
 
-    LOW: str
-    MEDIUM: str
-    QUARTILE: str
-    HIGH: str
+    LOW = "LOW"
+    MEDIUM = "MEDIUM"
+    QUARTILE = "QUARTILE"
+    HIGH = "HIGH"
+
+
+class Format(Enum):
+    """
+    Output formats in which a QR code can be rendered.
+    """
+
+    PNG = "PNG"
+    SVG = "SVG"
 
 
 class GenerateQRCodeResponse(BaseModel):
@@ -33,42 +57,100 @@ class GenerateQRCodeResponse(BaseModel):
     """
 
     qr_code_url: str
+    version: Optional[int] = None
+    mask_pattern: Optional[int] = None
 
 
-def map_error_correction_level(
-    error_correction: ErrorCorrection,
-) -> (
-    qrcode.constants.ERROR_CORRECT
-):  # TODO(autogpt): "constants" is not a known member of module "qrcode". reportAttributeAccessIssue
-    #   {'metadata': 'Metadata-Version: 2.1\nName: qrcode\nVersion: 7.4.2\nSummary: QR Code image generator\nHome-page: https://github.com/lincolnloop/python-qrcode\nAuthor: Lincoln Loop\nAuthor-email: info@lincolnloop.com\nLicense: BSD\nKeywords: qr denso-wave IEC18004\nClassifier: Development Status :: 5 - Production/Stable\nClassifier: License :: OSI Approved :: BSD License\nClassifier: Operating System :: OS Independent\nClassifier: Intended Audience :: Developers\nClassifier: Programming Language :: Python\nClassifier: Programming Language :: Python :: 3\nClassifier: Programming Language :: Python :: 3.7\nClassifier: Programming Language :: Python :: 3.8\nClassifier: Programming Language :: Python :: 3.9\nClassifier: Programming Language :: Python :: 3.10\nClassifier: Programming Language :: Python :: 3 :: Only\nClassifier: Topic :: Multimedia :: Graphics\nClassifier: Topic :: Software Development :: Libraries :: Python Modules\nRequires-Python: >=3.7\nLicense-File: LICENSE\nRequires-Dist: typing-extensions\nRequires-Dist: pypng\nRequires-Dist: colorama ; platform_system == "Windows"\nProvides-Extra: all\nRequires-Dist: zest.releaser[recommended] ; extra == \'all\'\nRequires-Dist: tox ; extra == \'all\'\nRequires-Dist: pytest ; extra == \'all\'\nRequires-Dist: pytest-cov ; extra == \'all\'\nRequires-Dist: pillow (>=9.1.0) ; extra == \'all\'\nProvides-Extra: dev\nRequires-Dist: tox ; extra == \'dev\'\nRequires-Dist: pytest ; extra == \'dev\'\nRequires-Dist: pytest-cov ; extra == \'dev\'\nProvides-Extra: maintainer\nRequires-Dist: zest.releaser[recommended] ; extra == \'maintainer\'\nProvides-Extra: pil\nRequires-Dist: pillow (>=9.1.0) ; extra == \'pil\'\nProvides-Extra: test\nRequires-Dist: coverage ; extra == \'test\'\nRequires-Dist: pytest ; extra == \'test\'\n\n=============================\nPure python QR Code generator\n=============================\n\nGenerate QR codes.\n\nA standard install uses pypng_ to generate PNG files and can also render QR\ncodes directly to the console. A standard install is just::\n\n    pip install qrcode\n\nFor more image functionality, install qrcode with the ``pil`` dependency so\nthat pillow_ is installed and can be used for generating images::\n\n    pip install "qrcode[pil]"\n\n.. _pypng: https://pypi.python.org/pypi/pypng\n.. _pillow: https://pypi.python.org/pypi/Pillow\n\n\nWhat is a QR Code?\n==================\n\nA Quick Response code is a two-dimensional pictographic code used for its fast\nreadability and comparatively large storage capacity. The code consists of\nblack modules arranged in a square pattern on a white background. The\ninformation encoded can be made up of any kind of data (e.g., binary,\nalphanumeric, or Kanji symbols)\n\nUsage\n=====\n\nFrom the command line, use the installed ``qr`` script::\n\n    qr "Some text" > test.png\n\nOr in Python, use the ``make`` shortcut function:\n\n.. code:: python\n\n    import qrcode\n    img = qrcode.make(\'Some data here\')\n    type(img)  # qrcode.image.pil.PilImage\n    img.save("some_file.png")\n\nAdvanced Usage\n--------------\n\nFor more control, use the ``QRCode`` class. For example:\n\n.. code:: python\n\n    import qrcode\n    qr = qrcode.QRCode(\n        version=1,\n        error_correction=qrcode.constants.ERROR_CORRECT_L,\n        box_size=10,\n        border=4,\n    )\n    qr.add_data(\'Some data\')\n    qr.make(fit=True)\n\n    img = qr.make_image(fill_color="black", back_color="white")\n\nThe ``version`` parameter is an integer from 1 to 40 that controls the size of\nthe QR Code (the smallest, version 1, is a 21x21 matrix).\nSet to ``None`` and use the ``fit`` parameter when making the code to determine\nthis automatically.\n\n``fill_color`` and ``back_color`` can change the background and the painting\ncolor of the QR, when using the default image factory. Both parameters accept\nRGB color tuples.\n\n.. code:: python\n\n\n    img = qr.make_image(back_color=(255, 195, 235), fill_color=(55, 95, 35))\n\nThe ``error_correction`` parameter controls the error correction used for the\nQR Code. The following four constants are made available on the ``qrcode``\npackage:\n\n``ERROR_CORRECT_L``\n    About 7% or less errors can be corrected.\n``ERROR_CORRECT_M`` (default)\n    About 15% or less errors can be corrected.\n``ERROR_CORRECT_Q``\n    About 25% or less errors can be corrected.\n``ERROR_CORRECT_H``.\n    About 30% or less errors can be corrected.\n\nThe ``box_size`` parameter controls how many pixels each "box" of the QR code\nis.\n\nThe ``border`` parameter controls how many boxes thick the border should be\n(the default is 4, which is the minimum according to the specs).\n\nOther image factories\n=====================\n\nYou can encode as SVG, or use a new pure Python image processor to encode to\nPNG images.\n\nThe Python examples below use the ``make`` shortcut. The same ``image_factory``\nkeyword argument is a valid option for the ``QRCode`` class for more advanced\nusage.\n\nSVG\n---\n\nYou can create the entire SVG or an SVG fragment. When building an entire SVG\nimage, you can use the factory that combines as a path (recommended, and\ndefault for the script) or a factory that creates a simple set of rectangles.\n\nFrom your command line::\n\n    qr --factory=svg-path "Some text" > test.svg\n    qr --factory=svg "Some text" > test.svg\n    qr --factory=svg-fragment "Some text" > test.svg\n\nOr in Python:\n\n.. code:: python\n\n    import qrcode\n    import qrcode.image.svg\n\n    if method == \'basic\':\n        # Simple factory, just a set of rects.\n        factory = qrcode.image.svg.SvgImage\n    elif method == \'fragment\':\n        # Fragment factory (also just a set of rects)\n        factory = qrcode.image.svg.SvgFragmentImage\n    else:\n        # Combined path factory, fixes white space that may occur when zooming\n        factory = qrcode.image.svg.SvgPathImage\n\n    img = qrcode.make(\'Some data here\', image_factory=factory)\n\nTwo other related factories are available that work the same, but also fill the\nbackground of the SVG with white::\n\n    qrcode.image.svg.SvgFillImage\n    qrcode.image.svg.SvgPathFillImage\n\nThe ``QRCode.make_image()`` method forwards additional keyword arguments to the\nunderlying ElementTree XML library. This helps to fine tune the root element of\nthe resulting SVG:\n\n.. code:: python\n\n    import qrcode\n    qr = qrcode.QRCode(image_factory=qrcode.image.svg.SvgPathImage)\n    qr.add_data(\'Some data\')\n    qr.make(fit=True)\n\n    img = qr.make_image(attrib={\'class\': \'some-css-class\'})\n\nYou can convert the SVG image into strings using the ``to_string()`` method.\nAdditional keyword arguments are forwarded to ElementTrees ``tostring()``:\n\n.. code:: python\n\n    img.to_string(encoding=\'unicode\')\n\n\nPure Python PNG\n---------------\n\nIf Pillow is not installed, the default image factory will be a pure Python PNG\nencoder that uses `pypng`.\n\nYou can use the factory explicitly from your command line::\n\n    qr --factory=png "Some text" > test.png\n\nOr in Python:\n\n.. code:: python\n\n    import qrcode\n    from qrcode.image.pure import PyPNGImage\n    img = qrcode.make(\'Some data here\', image_factory=PyPNGImage)\n\n\nStyled Image\n------------\n\nWorks only with versions_ >=7.2 (SVG styled images require 7.4).\n\n.. _versions: https://github.com/lincolnloop/python-qrcode/blob/master/CHANGES.rst#72-19-july-2021\n\nTo apply styles to the QRCode, use the ``StyledPilImage`` or one of the\nstandard SVG_ image factories. These accept an optional ``module_drawer``\nparameter to control the shape of the QR Code.\n\nThese QR Codes are not guaranteed to work with all readers, so do some\nexperimentation and set the error correction to high (especially if embedding\nan image).\n\nOther PIL module drawers:\n\n    .. image:: doc/module_drawers.png\n\nFor SVGs, use ``SvgSquareDrawer``, ``SvgCircleDrawer``,\n``SvgPathSquareDrawer``, or ``SvgPathCircleDrawer``.\n\nThese all accept a ``size_ratio`` argument which allows for "gapped" squares or\ncircles by reducing this less than the default of ``Decimal(1)``.\n\n\nThe ``StyledPilImage`` additionally accepts an optional ``color_mask``\nparameter to change the colors of the QR Code, and an optional\n``embeded_image_path`` to embed an image in the center of the code.\n\nOther color masks:\n\n    .. image:: doc/color_masks.png\n\nHere is a code example to draw a QR code with rounded corners, radial gradient\nand an embedded image:\n\n.. code:: python\n\n    import qrcode\n    from qrcode.image.styledpil import StyledPilImage\n    from qrcode.image.styles.moduledrawers.pil import RoundedModuleDrawer\n    from qrcode.image.styles.colormasks import RadialGradiantColorMask\n\n    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L)\n    qr.add_data(\'Some data\')\n\n    img_1 = qr.make_image(image_factory=StyledPilImage, module_drawer=RoundedModuleDrawer())\n    img_2 = qr.make_image(image_factory=StyledPilImage, color_mask=RadialGradiantColorMask())\n    img_3 = qr.make_image(image_factory=StyledPilImage, embeded_image_path="/path/to/image.png")\n\nExamples\n========\n\nGet the text content from `print_ascii`:\n\n.. code:: python\n\n    import io\n    import qrcode\n    qr = qrcode.QRCode()\n    qr.add_data("Some text")\n    f = io.StringIO()\n    qr.print_ascii(out=f)\n    f.seek(0)\n    print(f.read())\n\nThe `add_data` method will append data to the current QR object. To add new data by replacing previous content in the same object, first use clear method:\n\n.. code:: python\n\n    import qrcode\n    qr = qrcode.QRCode()\n    qr.add_data(\'Some data\')\n    img = qr.make_image()\n    qr.clear()\n    qr.add_data(\'New data\')\n    other_img = qr.make_image()\n\nPipe ascii output to text file in command line::\n\n    qr --ascii "Some data" > "test.txt"\n    cat test.txt\n\nAlternative to piping output to file to avoid PowerShell issues::\n\n    # qr "Some data" > test.png\n    qr --output=test.png "Some data"\n\n==========\nChange log\n==========\n\n7.4.2 (6 February 2023)\n=======================\n\n- Allow ``pypng`` factory to allow for saving to a string (like\n  ``qr.save("some_file.png")``) in addition to file-like objects. \n\n\n7.4.1 (3 February 2023)\n=======================\n\n- Fix bad over-optimization in v7.4 that broke large QR codes. Thanks to\n  mattiasj-axis!\n\n\n7.4 (1 February 2023)\n=====================\n\n- Restructure the factory drawers, allowing different shapes in SVG image\n  factories as well.\n\n- Add a ``--factory-drawer`` option to the ``qr`` console script.\n\n- Optimize the output for the ``SVGPathImage`` factory (more than 30% reduction\n  in file sizes).\n\n- Add a ``pypng`` image factory as a pure Python PNG solution. If ``pillow`` is\n  *not* installed, then this becomes the default factory.\n\n- The ``pymaging`` image factory has been removed, but its factory shortcut and\n  the actual PymagingImage factory class now just link to the PyPNGImage\n  factory.\n\n\n7.3.1 (1 October 2021)\n======================\n\n- Improvements for embedded image.\n\n\n7.3 (19 August 2021)\n====================\n\n- Skip color mask if QR is black and white\n\n\n7.2 (19 July 2021)\n==================\n\n- Add Styled PIL image factory, allowing different color masks and shapes in QR codes\n\n- Small performance inprovement\n\n- Add check for border size parameter\n\n\n7.1 (1 July 2021)\n=================\n\n- Add --ascii parameter to command line interface allowing to output ascii when stdout is piped\n\n- Add --output parameter to command line interface to specify output file\n\n- Accept RGB tuples in fill_color and back_color\n\n- Add to_string method to SVG images\n\n- Replace inline styles with SVG attributes to avoid CSP issues\n\n- Add Python3.10 to supported versions\n\n\n7.0 (29 June 2021)\n==================\n\n- Drop Python < 3.6 support.\n\n\n6.1 (14 January 2019)\n=====================\n\n- Fix short chunks of data not being optimized to the correct mode.\n\n- Tests fixed for Python 3\n\n\n6.0 (23 March 2018)\n===================\n\n- Fix optimize length being ignored in ``QRCode.add_data``.\n\n- Better calculation of the best mask pattern and related optimizations. Big\n  thanks to cryptogun!\n\n\n5.3 (18 May 2016)\n=================\n\n* Fix incomplete block table for QR version 15. Thanks Rodrigo Queiro for the\n  report and Jacob Welsh for the investigation and fix.\n\n* Avoid unnecessary dependency for non MS platforms, thanks to Noah Vesely.\n\n* Make ``BaseImage.get_image()`` actually work.\n\n\n5.2 (25 Jan 2016)\n=================\n\n* Add ``--error-correction`` option to qr script.\n\n* Fix script piping to stdout in Python 3 and reading non-UTF-8 characters in\n  Python 3.\n\n* Fix script piping in Windows.\n\n* Add some useful behind-the-curtain methods for tinkerers.\n\n* Fix terminal output when using Python 2.6\n\n* Fix terminal output to display correctly on MS command line.\n\n5.2.1\n-----\n\n* Small fix to terminal output in Python 3 (and fix tests)\n\n5.2.2\n-----\n\n* Revert some terminal changes from 5.2 that broke Python 3\'s real life tty\n  code generation and introduce a better way from Jacob Welsh.\n\n\n5.1 (22 Oct 2014)\n=================\n\n* Make ``qr`` script work in Windows. Thanks Ionel Cristian Mărieș\n\n* Fixed print_ascii function in Python 3.\n\n* Out-of-bounds code version numbers are handled more consistently with a\n  ValueError.\n\n* Much better test coverage (now only officially supporting Python 2.6+)\n\n\n5.0 (17 Jun 2014)\n=================\n\n* Speed optimizations.\n\n* Change the output when using the ``qr`` script to use ASCII rather than\n  just colors, better using the terminal real estate.\n\n* Fix a bug in passing bytecode data directly when in Python 3.\n\n* Substation speed optimizations to best-fit algorithm (thanks Jacob Welsh!).\n\n* Introduce a ``print_ascii`` method and use it as the default for the ``qr``\n  script rather than ``print_tty``.\n\n5.0.1\n-----\n\n* Update version numbers correctly.\n\n\n4.0 (4 Sep 2013)\n================\n\n* Made qrcode work on Python 2.4 - Thanks tcely.\n  Note: officially, qrcode only supports 2.5+.\n\n* Support pure-python PNG generation (via pymaging) for Python 2.6+ -- thanks\n  Adam Wisniewski!\n\n* SVG image generation now supports alternate sizing (the default box size of\n  10 == 1mm per rectangle).\n\n* SVG path image generation allows cleaner SVG output by combining all QR rects\n  into a single path. Thank you, Viktor Stískala.\n\n* Added some extra simple SVG factories that fill the background white.\n\n4.0.1\n-----\n\n* Fix the pymaging backend not able to save the image to a buffer. Thanks ilj!\n\n4.0.2\n-----\n\n* Fix incorrect regex causing a comma to be considered part of the alphanumeric\n  set.\n\n* Switch to using setuptools for setup.py.\n\n4.0.3\n-----\n\n* Fix bad QR code generation due to the regex comma fix in version 4.0.2.\n\n4.0.4\n-----\n\n* Bad version number for previous hotfix release.\n\n\n3.1 (12 Aug 2013)\n=================\n\n* Important fixes for incorrect matches of the alphanumeric encoding mode.\n  Previously, the pattern would match if a single line was alphanumeric only\n  (even if others wern\'t). Also, the two characters ``{`` and ``}`` had snuck\n  in as valid characters. Thanks to Eran Tromer for the report and fix.\n\n* Optimized chunking -- if the parts of the data stream can be encoded more\n  efficiently, the data will be split into chunks of the most efficient modes.\n\n3.1.1\n-----\n\n* Update change log to contain version 3.1 changes. :P\n\n* Give the ``qr`` script an ``--optimize`` argument to control the chunk\n  optimization setting.\n\n\n3.0 (25 Jun 2013)\n=================\n\n* Python 3 support.\n\n* Add QRCode.get_matrix, an easy way to get the matrix array of a QR code\n  including the border. Thanks Hugh Rawlinson.\n\n* Add in a workaround so that Python 2.6 users can use SVG generation (they\n  must install ``lxml``).\n\n* Some initial tests! And tox support (``pip install tox``) for testing across\n  Python platforms.\n\n\n2.7 (5 Mar 2013)\n================\n\n* Fix incorrect termination padding.\n\n\n2.6 (2 Apr 2013)\n================\n\n* Fix the first four columns incorrectly shifted by one. Thanks to Josep\n  Gómez-Suay for the report and fix.\n\n* Fix strings within 4 bits of the QR version limit being incorrectly\n  terminated. Thanks to zhjie231 for the report.\n\n\n2.5 (12 Mar 2013)\n=================\n\n* The PilImage wrapper is more transparent - you can use any methods or\n  attributes available to the underlying PIL Image instance.\n\n* Fixed the first column of the QR Code coming up empty! Thanks to BecoKo.\n\n2.5.1\n-----\n\n* Fix installation error on Windows.\n\n\n2.4 (23 Apr 2012)\n=================\n\n* Use a pluggable backend system for generating images, thanks to Branko Čibej!\n  Comes with PIL and SVG backends built in.\n\n2.4.1\n-----\n\n* Fix a packaging issue\n\n2.4.2\n-----\n\n* Added a ``show`` method to the PIL image wrapper so the ``run_example``\n  function actually works.\n\n\n2.3 (29 Jan 2012)\n=================\n\n* When adding data, auto-select the more efficient encoding methods for numbers\n  and alphanumeric data (KANJI still not supported).\n\n2.3.1\n-----\n\n* Encode unicode to utf-8 bytestrings when adding data to a QRCode.\n\n\n2.2 (18 Jan 2012)\n=================\n\n* Fixed tty output to work on both white and black backgrounds.\n\n* Added `border` parameter to allow customizing of the number of boxes used to\n  create the border of the QR code\n\n\n2.1 (17 Jan 2012)\n=================\n\n* Added a ``qr`` script which can be used to output a qr code to the tty using\n  background colors, or to a file via a pipe.\n', 'context': None}
+class QRCodeImage(NamedTuple):
     """
-    Maps custom ErrorCorrection enum to qrcode library's error correction constants.
+    A rendered QR code in the storage tier of the render cache and its encoding parameters.
 
-    Args:
-    error_correction (ErrorCorrection): The specified error correction level as custom enum.
+    `path` is relative to QR_CODE_BASE_URL; `image` is the name of the file in
+    the storage backend and `image_bytes` its size.
+    """
 
-    Returns:
-    qrcode.constants.ERROR_CORRECT: Corresponding error correction level in qrcode library.
+    path: str
+    info: RenderInfo
+    image: str
+    image_bytes: int
+
+
+async def resolve_options(
+    user_id: Optional[str],
+    size: Optional[int],
+    color: Optional[str],
+    error_correction: Optional[ErrorCorrection],
+) -> Tuple[int, str, ErrorCorrection]:
+    """
+    Fills in omitted size, color and error correction from the user's preferences or the defaults.
+    """
+    options = await resolve_generation_options(
+        user_id,
+        size,
+        color,
+        None if error_correction is None else error_correction.value,
+    )
+    return options.size, options.color, ErrorCorrection(options.error_correction)
+
+
+def error_correction_for(
+    error_correction: ErrorCorrection, logo: Optional[str]
+) -> ErrorCorrection:
+    """
+    Returns the error correction level to render with: HIGH whenever a logo covers modules.
     """
-    mapping = {
-        ErrorCorrection.LOW: qrcode.constants.ERROR_CORRECT_L,
-        ErrorCorrection.MEDIUM: qrcode.constants.ERROR_CORRECT_M,
-        ErrorCorrection.QUARTILE: qrcode.constants.ERROR_CORRECT_Q,
-        ErrorCorrection.HIGH: qrcode.constants.ERROR_CORRECT_H,
-    }  # TODO(autogpt): "constants" is not a known member of module "qrcode". reportAttributeAccessIssue
-    #   {'metadata': 'Metadata-Version: 2.1\nName: qrcode\nVersion: 7.4.2\nSummary: QR Code image generator\nHome-page: https://github.com/lincolnloop/python-qrcode\nAuthor: Lincoln Loop\nAuthor-email: info@lincolnloop.com\nLicense: BSD\nKeywords: qr denso-wave IEC18004\nClassifier: Development Status :: 5 - Production/Stable\nClassifier: License :: OSI Approved :: BSD License\nClassifier: Operating System :: OS Independent\nClassifier: Intended Audience :: Developers\nClassifier: Programming Language :: Python\nClassifier: Programming Language :: Python :: 3\nClassifier: Programming Language :: Python :: 3.7\nClassifier: Programming Language :: Python :: 3.8\nClassifier: Programming Language :: Python :: 3.9\nClassifier: Programming Language :: Python :: 3.10\nClassifier: Programming Language :: Python :: 3 :: Only\nClassifier: Topic :: Multimedia :: Graphics\nClassifier: Topic :: Software Development :: Libraries :: Python Modules\nRequires-Python: >=3.7\nLicense-File: LICENSE\nRequires-Dist: typing-extensions\nRequires-Dist: pypng\nRequires-Dist: colorama ; platform_system == "Windows"\nProvides-Extra: all\nRequires-Dist: zest.releaser[recommended] ; extra == \'all\'\nRequires-Dist: tox ; extra == \'all\'\nRequires-Dist: pytest ; extra == \'all\'\nRequires-Dist: pytest-cov ; extra == \'all\'\nRequires-Dist: pillow (>=9.1.0) ; extra == \'all\'\nProvides-Extra: dev\nRequires-Dist: tox ; extra == \'dev\'\nRequires-Dist: pytest ; extra == \'dev\'\nRequires-Dist: pytest-cov ; extra == \'dev\'\nProvides-Extra: maintainer\nRequires-Dist: zest.releaser[recommended] ; extra == \'maintainer\'\nProvides-Extra: pil\nRequires-Dist: pillow (>=9.1.0) ; extra == \'pil\'\nProvides-Extra: test\nRequires-Dist: coverage ; extra == \'test\'\nRequires-Dist: pytest ; extra == \'test\'\n\n=============================\nPure python QR Code generator\n=============================\n\nGenerate QR codes.\n\nA standard install uses pypng_ to generate PNG files and can also render QR\ncodes directly to the console. A standard install is just::\n\n    pip install qrcode\n\nFor more image functionality, install qrcode with the ``pil`` dependency so\nthat pillow_ is installed and can be used for generating images::\n\n    pip install "qrcode[pil]"\n\n.. _pypng: https://pypi.python.org/pypi/pypng\n.. _pillow: https://pypi.python.org/pypi/Pillow\n\n\nWhat is a QR Code?\n==================\n\nA Quick Response code is a two-dimensional pictographic code used for its fast\nreadability and comparatively large storage capacity. The code consists of\nblack modules arranged in a square pattern on a white background. The\ninformation encoded can be made up of any kind of data (e.g., binary,\nalphanumeric, or Kanji symbols)\n\nUsage\n=====\n\nFrom the command line, use the installed ``qr`` script::\n\n    qr "Some text" > test.png\n\nOr in Python, use the ``make`` shortcut function:\n\n.. code:: python\n\n    import qrcode\n    img = qrcode.make(\'Some data here\')\n    type(img)  # qrcode.image.pil.PilImage\n    img.save("some_file.png")\n\nAdvanced Usage\n--------------\n\nFor more control, use the ``QRCode`` class. For example:\n\n.. code:: python\n\n    import qrcode\n    qr = qrcode.QRCode(\n        version=1,\n        error_correction=qrcode.constants.ERROR_CORRECT_L,\n        box_size=10,\n        border=4,\n    )\n    qr.add_data(\'Some data\')\n    qr.make(fit=True)\n\n    img = qr.make_image(fill_color="black", back_color="white")\n\nThe ``version`` parameter is an integer from 1 to 40 that controls the size of\nthe QR Code (the smallest, version 1, is a 21x21 matrix).\nSet to ``None`` and use the ``fit`` parameter when making the code to determine\nthis automatically.\n\n``fill_color`` and ``back_color`` can change the background and the painting\ncolor of the QR, when using the default image factory. Both parameters accept\nRGB color tuples.\n\n.. code:: python\n\n\n    img = qr.make_image(back_color=(255, 195, 235), fill_color=(55, 95, 35))\n\nThe ``error_correction`` parameter controls the error correction used for the\nQR Code. The following four constants are made available on the ``qrcode``\npackage:\n\n``ERROR_CORRECT_L``\n    About 7% or less errors can be corrected.\n``ERROR_CORRECT_M`` (default)\n    About 15% or less errors can be corrected.\n``ERROR_CORRECT_Q``\n    About 25% or less errors can be corrected.\n``ERROR_CORRECT_H``.\n    About 30% or less errors can be corrected.\n\nThe ``box_size`` parameter controls how many pixels each "box" of the QR code\nis.\n\nThe ``border`` parameter controls how many boxes thick the border should be\n(the default is 4, which is the minimum according to the specs).\n\nOther image factories\n=====================\n\nYou can encode as SVG, or use a new pure Python image processor to encode to\nPNG images.\n\nThe Python examples below use the ``make`` shortcut. The same ``image_factory``\nkeyword argument is a valid option for the ``QRCode`` class for more advanced\nusage.\n\nSVG\n---\n\nYou can create the entire SVG or an SVG fragment. When building an entire SVG\nimage, you can use the factory that combines as a path (recommended, and\ndefault for the script) or a factory that creates a simple set of rectangles.\n\nFrom your command line::\n\n    qr --factory=svg-path "Some text" > test.svg\n    qr --factory=svg "Some text" > test.svg\n    qr --factory=svg-fragment "Some text" > test.svg\n\nOr in Python:\n\n.. code:: python\n\n    import qrcode\n    import qrcode.image.svg\n\n    if method == \'basic\':\n        # Simple factory, just a set of rects.\n        factory = qrcode.image.svg.SvgImage\n    elif method == \'fragment\':\n        # Fragment factory (also just a set of rects)\n        factory = qrcode.image.svg.SvgFragmentImage\n    else:\n        # Combined path factory, fixes white space that may occur when zooming\n        factory = qrcode.image.svg.SvgPathImage\n\n    img = qrcode.make(\'Some data here\', image_factory=factory)\n\nTwo other related factories are available that work the same, but also fill the\nbackground of the SVG with white::\n\n    qrcode.image.svg.SvgFillImage\n    qrcode.image.svg.SvgPathFillImage\n\nThe ``QRCode.make_image()`` method forwards additional keyword arguments to the\nunderlying ElementTree XML library. This helps to fine tune the root element of\nthe resulting SVG:\n\n.. code:: python\n\n    import qrcode\n    qr = qrcode.QRCode(image_factory=qrcode.image.svg.SvgPathImage)\n    qr.add_data(\'Some data\')\n    qr.make(fit=True)\n\n    img = qr.make_image(attrib={\'class\': \'some-css-class\'})\n\nYou can convert the SVG image into strings using the ``to_string()`` method.\nAdditional keyword arguments are forwarded to ElementTrees ``tostring()``:\n\n.. code:: python\n\n    img.to_string(encoding=\'unicode\')\n\n\nPure Python PNG\n---------------\n\nIf Pillow is not installed, the default image factory will be a pure Python PNG\nencoder that uses `pypng`.\n\nYou can use the factory explicitly from your command line::\n\n    qr --factory=png "Some text" > test.png\n\nOr in Python:\n\n.. code:: python\n\n    import qrcode\n    from qrcode.image.pure import PyPNGImage\n    img = qrcode.make(\'Some data here\', image_factory=PyPNGImage)\n\n\nStyled Image\n------------\n\nWorks only with versions_ >=7.2 (SVG styled images require 7.4).\n\n.. _versions: https://github.com/lincolnloop/python-qrcode/blob/master/CHANGES.rst#72-19-july-2021\n\nTo apply styles to the QRCode, use the ``StyledPilImage`` or one of the\nstandard SVG_ image factories. These accept an optional ``module_drawer``\nparameter to control the shape of the QR Code.\n\nThese QR Codes are not guaranteed to work with all readers, so do some\nexperimentation and set the error correction to high (especially if embedding\nan image).\n\nOther PIL module drawers:\n\n    .. image:: doc/module_drawers.png\n\nFor SVGs, use ``SvgSquareDrawer``, ``SvgCircleDrawer``,\n``SvgPathSquareDrawer``, or ``SvgPathCircleDrawer``.\n\nThese all accept a ``size_ratio`` argument which allows for "gapped" squares or\ncircles by reducing this less than the default of ``Decimal(1)``.\n\n\nThe ``StyledPilImage`` additionally accepts an optional ``color_mask``\nparameter to change the colors of the QR Code, and an optional\n``embeded_image_path`` to embed an image in the center of the code.\n\nOther color masks:\n\n    .. image:: doc/color_masks.png\n\nHere is a code example to draw a QR code with rounded corners, radial gradient\nand an embedded image:\n\n.. code:: python\n\n    import qrcode\n    from qrcode.image.styledpil import StyledPilImage\n    from qrcode.image.styles.moduledrawers.pil import RoundedModuleDrawer\n    from qrcode.image.styles.colormasks import RadialGradiantColorMask\n\n    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L)\n    qr.add_data(\'Some data\')\n\n    img_1 = qr.make_image(image_factory=StyledPilImage, module_drawer=RoundedModuleDrawer())\n    img_2 = qr.make_image(image_factory=StyledPilImage, color_mask=RadialGradiantColorMask())\n    img_3 = qr.make_image(image_factory=StyledPilImage, embeded_image_path="/path/to/image.png")\n\nExamples\n========\n\nGet the text content from `print_ascii`:\n\n.. code:: python\n\n    import io\n    import qrcode\n    qr = qrcode.QRCode()\n    qr.add_data("Some text")\n    f = io.StringIO()\n    qr.print_ascii(out=f)\n    f.seek(0)\n    print(f.read())\n\nThe `add_data` method will append data to the current QR object. To add new data by replacing previous content in the same object, first use clear method:\n\n.. code:: python\n\n    import qrcode\n    qr = qrcode.QRCode()\n    qr.add_data(\'Some data\')\n    img = qr.make_image()\n    qr.clear()\n    qr.add_data(\'New data\')\n    other_img = qr.make_image()\n\nPipe ascii output to text file in command line::\n\n    qr --ascii "Some data" > "test.txt"\n    cat test.txt\n\nAlternative to piping output to file to avoid PowerShell issues::\n\n    # qr "Some data" > test.png\n    qr --output=test.png "Some data"\n\n==========\nChange log\n==========\n\n7.4.2 (6 February 2023)\n=======================\n\n- Allow ``pypng`` factory to allow for saving to a string (like\n  ``qr.save("some_file.png")``) in addition to file-like objects. \n\n\n7.4.1 (3 February 2023)\n=======================\n\n- Fix bad over-optimization in v7.4 that broke large QR codes. Thanks to\n  mattiasj-axis!\n\n\n7.4 (1 February 2023)\n=====================\n\n- Restructure the factory drawers, allowing different shapes in SVG image\n  factories as well.\n\n- Add a ``--factory-drawer`` option to the ``qr`` console script.\n\n- Optimize the output for the ``SVGPathImage`` factory (more than 30% reduction\n  in file sizes).\n\n- Add a ``pypng`` image factory as a pure Python PNG solution. If ``pillow`` is\n  *not* installed, then this becomes the default factory.\n\n- The ``pymaging`` image factory has been removed, but its factory shortcut and\n  the actual PymagingImage factory class now just link to the PyPNGImage\n  factory.\n\n\n7.3.1 (1 October 2021)\n======================\n\n- Improvements for embedded image.\n\n\n7.3 (19 August 2021)\n====================\n\n- Skip color mask if QR is black and white\n\n\n7.2 (19 July 2021)\n==================\n\n- Add Styled PIL image factory, allowing different color masks and shapes in QR codes\n\n- Small performance inprovement\n\n- Add check for border size parameter\n\n\n7.1 (1 July 2021)\n=================\n\n- Add --ascii parameter to command line interface allowing to output ascii when stdout is piped\n\n- Add --output parameter to command line interface to specify output file\n\n- Accept RGB tuples in fill_color and back_color\n\n- Add to_string method to SVG images\n\n- Replace inline styles with SVG attributes to avoid CSP issues\n\n- Add Python3.10 to supported versions\n\n\n7.0 (29 June 2021)\n==================\n\n- Drop Python < 3.6 support.\n\n\n6.1 (14 January 2019)\n=====================\n\n- Fix short chunks of data not being optimized to the correct mode.\n\n- Tests fixed for Python 3\n\n\n6.0 (23 March 2018)\n===================\n\n- Fix optimize length being ignored in ``QRCode.add_data``.\n\n- Better calculation of the best mask pattern and related optimizations. Big\n  thanks to cryptogun!\n\n\n5.3 (18 May 2016)\n=================\n\n* Fix incomplete block table for QR version 15. Thanks Rodrigo Queiro for the\n  report and Jacob Welsh for the investigation and fix.\n\n* Avoid unnecessary dependency for non MS platforms, thanks to Noah Vesely.\n\n* Make ``BaseImage.get_image()`` actually work.\n\n\n5.2 (25 Jan 2016)\n=================\n\n* Add ``--error-correction`` option to qr script.\n\n* Fix script piping to stdout in Python 3 and reading non-UTF-8 characters in\n  Python 3.\n\n* Fix script piping in Windows.\n\n* Add some useful behind-the-curtain methods for tinkerers.\n\n* Fix terminal output when using Python 2.6\n\n* Fix terminal output to display correctly on MS command line.\n\n5.2.1\n-----\n\n* Small fix to terminal output in Python 3 (and fix tests)\n\n5.2.2\n-----\n\n* Revert some terminal changes from 5.2 that broke Python 3\'s real life tty\n  code generation and introduce a better way from Jacob Welsh.\n\n\n5.1 (22 Oct 2014)\n=================\n\n* Make ``qr`` script work in Windows. Thanks Ionel Cristian Mărieș\n\n* Fixed print_ascii function in Python 3.\n\n* Out-of-bounds code version numbers are handled more consistently with a\n  ValueError.\n\n* Much better test coverage (now only officially supporting Python 2.6+)\n\n\n5.0 (17 Jun 2014)\n=================\n\n* Speed optimizations.\n\n* Change the output when using the ``qr`` script to use ASCII rather than\n  just colors, better using the terminal real estate.\n\n* Fix a bug in passing bytecode data directly when in Python 3.\n\n* Substation speed optimizations to best-fit algorithm (thanks Jacob Welsh!).\n\n* Introduce a ``print_ascii`` method and use it as the default for the ``qr``\n  script rather than ``print_tty``.\n\n5.0.1\n-----\n\n* Update version numbers correctly.\n\n\n4.0 (4 Sep 2013)\n================\n\n* Made qrcode work on Python 2.4 - Thanks tcely.\n  Note: officially, qrcode only supports 2.5+.\n\n* Support pure-python PNG generation (via pymaging) for Python 2.6+ -- thanks\n  Adam Wisniewski!\n\n* SVG image generation now supports alternate sizing (the default box size of\n  10 == 1mm per rectangle).\n\n* SVG path image generation allows cleaner SVG output by combining all QR rects\n  into a single path. Thank you, Viktor Stískala.\n\n* Added some extra simple SVG factories that fill the background white.\n\n4.0.1\n-----\n\n* Fix the pymaging backend not able to save the image to a buffer. Thanks ilj!\n\n4.0.2\n-----\n\n* Fix incorrect regex causing a comma to be considered part of the alphanumeric\n  set.\n\n* Switch to using setuptools for setup.py.\n\n4.0.3\n-----\n\n* Fix bad QR code generation due to the regex comma fix in version 4.0.2.\n\n4.0.4\n-----\n\n* Bad version number for previous hotfix release.\n\n\n3.1 (12 Aug 2013)\n=================\n\n* Important fixes for incorrect matches of the alphanumeric encoding mode.\n  Previously, the pattern would match if a single line was alphanumeric only\n  (even if others wern\'t). Also, the two characters ``{`` and ``}`` had snuck\n  in as valid characters. Thanks to Eran Tromer for the report and fix.\n\n* Optimized chunking -- if the parts of the data stream can be encoded more\n  efficiently, the data will be split into chunks of the most efficient modes.\n\n3.1.1\n-----\n\n* Update change log to contain version 3.1 changes. :P\n\n* Give the ``qr`` script an ``--optimize`` argument to control the chunk\n  optimization setting.\n\n\n3.0 (25 Jun 2013)\n=================\n\n* Python 3 support.\n\n* Add QRCode.get_matrix, an easy way to get the matrix array of a QR code\n  including the border. Thanks Hugh Rawlinson.\n\n* Add in a workaround so that Python 2.6 users can use SVG generation (they\n  must install ``lxml``).\n\n* Some initial tests! And tox support (``pip install tox``) for testing across\n  Python platforms.\n\n\n2.7 (5 Mar 2013)\n================\n\n* Fix incorrect termination padding.\n\n\n2.6 (2 Apr 2013)\n================\n\n* Fix the first four columns incorrectly shifted by one. Thanks to Josep\n  Gómez-Suay for the report and fix.\n\n* Fix strings within 4 bits of the QR version limit being incorrectly\n  terminated. Thanks to zhjie231 for the report.\n\n\n2.5 (12 Mar 2013)\n=================\n\n* The PilImage wrapper is more transparent - you can use any methods or\n  attributes available to the underlying PIL Image instance.\n\n* Fixed the first column of the QR Code coming up empty! Thanks to BecoKo.\n\n2.5.1\n-----\n\n* Fix installation error on Windows.\n\n\n2.4 (23 Apr 2012)\n=================\n\n* Use a pluggable backend system for generating images, thanks to Branko Čibej!\n  Comes with PIL and SVG backends built in.\n\n2.4.1\n-----\n\n* Fix a packaging issue\n\n2.4.2\n-----\n\n* Added a ``show`` method to the PIL image wrapper so the ``run_example``\n  function actually works.\n\n\n2.3 (29 Jan 2012)\n=================\n\n* When adding data, auto-select the more efficient encoding methods for numbers\n  and alphanumeric data (KANJI still not supported).\n\n2.3.1\n-----\n\n* Encode unicode to utf-8 bytestrings when adding data to a QRCode.\n\n\n2.2 (18 Jan 2012)\n=================\n\n* Fixed tty output to work on both white and black backgrounds.\n\n* Added `border` parameter to allow customizing of the number of boxes used to\n  create the border of the QR code\n\n\n2.1 (17 Jan 2012)\n=================\n\n* Added a ``qr`` script which can be used to output a qr code to the tty using\n  background colors, or to a file via a pipe.\n', 'context': None}
-    return mapping[error_correction]
+    if logo is not None:
+        return ErrorCorrection.HIGH
+    return error_correction
 
 
-def generate_qr_code(
+def qr_code_cache_key(
     data: str,
     data_type: DataType,
     size: int,
     color: str,
     error_correction: ErrorCorrection,
-) -> GenerateQRCodeResponse:
+    image_format: Format = Format.PNG,
+    logo: Optional[str] = None,
+) -> str:
     """
-    Receives data in supported formats and generates a QR code.
+    Returns the render cache key under which the QR code for these parameters is stored.
+
+    The key ends in the file extension of the output format, e.g. '<sha256>.svg'.
+    The logo reference only takes part in the key when there is one, so keys of
+    plain QR codes are unaffected by it.
+    """
+    params = dict(
+        data=data,
+        data_type=data_type,
+        size=size,
+        color=color,
+        error_correction=error_correction_for(error_correction, logo),
+        image_format=image_format,
+    )
+    if logo is not None:
+        params["logo"] = logo
+    key = render_key(**params)
+    return f"{key}.{image_format.value.lower()}"
+
+
+async def render_qr_code_image(
+    data: str,
+    data_type: DataType,
+    size: int,
+    color: str,
+    error_correction: ErrorCorrection,
+    image_format: Format = Format.PNG,
+    background: bool = False,
+    logo: Optional[str] = None,
+) -> QRCodeImage:
+    """
+    Makes sure the QR code for the given parameters exists in the render cache.
+
+    Renders are content-addressed by their normalized parameters, so repeated
+    requests are served from the render cache without rebuilding the matrix or
+    re-encoding the image. Cache misses are rendered on the shared rendering
+    executor so the event loop is never blocked by encoding work.
 
     Args:
         data (str): The data to be encoded in the QR code.
@@ -76,22 +158,186 @@ def generate_qr_code(
         size (int): Desired size of the QR code, in pixels.
         color (str): Hex code for the QR code's color.
         error_correction (ErrorCorrection): Level of error correction needed.
+        image_format (Format): Output format of the image, PNG or SVG.
+        background (bool): Set for bulk work; waits for executor capacity instead of
+            failing fast, keeps the output out of the in-memory cache tier and uses
+            the size-optimized 'batch' PNG encoding profile.
+        logo (Optional[str]): Logo to place in the center, as a data URI, URL or
+            path below LOGO_DIR. Forces the HIGH error correction level.
+
+    Returns:
+        QRCodeImage: Path of the rendered image relative to QR_CODE_BASE_URL, with
+            the QR version and mask pattern chosen for it and the stored file.
+
+    Raises:
+        RenderQueueFullError: If the rendering executor is saturated and `background` is False.
+    """
+    key = qr_code_cache_key(
+        data, data_type, size, color, error_correction, image_format, logo
+    )
+    stored = await render_cache.stored(key)
+    if stored is None:
+        # The in-memory tier may hold the image if it was only served inline so far.
+        rendered = await render_cache.get(key)
+        if rendered is None:
+            rendered = await render_executor.run(
+                qr_renderer.render_qr_code,
+                data,
+                data_type.value,
+                size,
+                color,
+                error_correction_for(error_correction, logo).value,
+                image_format.value,
+                "batch" if background else "interactive",
+                None if logo is None else await load_logo(logo),
+                wait=background,
+            )
+        stored = await render_cache.put(key, rendered, memory=not background)
+    return QRCodeImage(
+        render_cache.storage.location(stored.image),
+        stored.info,
+        stored.image,
+        stored.size,
+    )
+
+
+async def generate_qr_code_image(
+    data: str,
+    data_type: DataType,
+    size: Optional[int],
+    color: Optional[str],
+    error_correction: Optional[ErrorCorrection],
+    image_format: Format = Format.PNG,
+    if_none_match: Optional[str] = None,
+    logo: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> Response:
+    """
+    Generates a QR code and returns the image itself rather than a URL to it.
+
+    The ETag is derived from the render parameters alone, so conditional requests
+    are answered with 304 before anything is rendered, and the long-lived
+    Cache-Control header lets browsers and CDNs keep the image indefinitely.
+    Fresh renders are kept in memory only; nothing is written to disk.
+
+    Args:
+        data (str): The data to be encoded in the QR code.
+        data_type (DataType): Type of the data provided, e.g., URL, TEXT, VCARD, JSON, CSV.
+        size (Optional[int]): Desired size of the QR code, in pixels.
+        color (Optional[str]): Hex code for the QR code's color.
+        error_correction (Optional[ErrorCorrection]): Level of error correction needed.
+        image_format (Format): Output format of the image, PNG or SVG.
+        if_none_match (Optional[str]): The HTTP `If-None-Match` header of the request, if any.
+        logo (Optional[str]): Logo to place in the center, as a data URI, URL or
+            path below LOGO_DIR. Forces the HIGH error correction level.
+        user_id (Optional[str]): The requesting user, whose preferences fill in omitted
+            size, color and error correction.
 
     Returns:
-        GenerateQRCodeResponse: Response model containing the URL to the generated QR code image.
-
-    """
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=map_error_correction_level(error_correction),
-        box_size=size // 10,
-        border=4,
-    )  # TODO(autogpt): "QRCode" is not a known member of module "qrcode". reportAttributeAccessIssue
-    #   {'metadata': 'Metadata-Version: 2.1\nName: qrcode\nVersion: 7.4.2\nSummary: QR Code image generator\nHome-page: https://github.com/lincolnloop/python-qrcode\nAuthor: Lincoln Loop\nAuthor-email: info@lincolnloop.com\nLicense: BSD\nKeywords: qr denso-wave IEC18004\nClassifier: Development Status :: 5 - Production/Stable\nClassifier: License :: OSI Approved :: BSD License\nClassifier: Operating System :: OS Independent\nClassifier: Intended Audience :: Developers\nClassifier: Programming Language :: Python\nClassifier: Programming Language :: Python :: 3\nClassifier: Programming Language :: Python :: 3.7\nClassifier: Programming Language :: Python :: 3.8\nClassifier: Programming Language :: Python :: 3.9\nClassifier: Programming Language :: Python :: 3.10\nClassifier: Programming Language :: Python :: 3 :: Only\nClassifier: Topic :: Multimedia :: Graphics\nClassifier: Topic :: Software Development :: Libraries :: Python Modules\nRequires-Python: >=3.7\nLicense-File: LICENSE\nRequires-Dist: typing-extensions\nRequires-Dist: pypng\nRequires-Dist: colorama ; platform_system == "Windows"\nProvides-Extra: all\nRequires-Dist: zest.releaser[recommended] ; extra == \'all\'\nRequires-Dist: tox ; extra == \'all\'\nRequires-Dist: pytest ; extra == \'all\'\nRequires-Dist: pytest-cov ; extra == \'all\'\nRequires-Dist: pillow (>=9.1.0) ; extra == \'all\'\nProvides-Extra: dev\nRequires-Dist: tox ; extra == \'dev\'\nRequires-Dist: pytest ; extra == \'dev\'\nRequires-Dist: pytest-cov ; extra == \'dev\'\nProvides-Extra: maintainer\nRequires-Dist: zest.releaser[recommended] ; extra == \'maintainer\'\nProvides-Extra: pil\nRequires-Dist: pillow (>=9.1.0) ; extra == \'pil\'\nProvides-Extra: test\nRequires-Dist: coverage ; extra == \'test\'\nRequires-Dist: pytest ; extra == \'test\'\n\n=============================\nPure python QR Code generator\n=============================\n\nGenerate QR codes.\n\nA standard install uses pypng_ to generate PNG files and can also render QR\ncodes directly to the console. A standard install is just::\n\n    pip install qrcode\n\nFor more image functionality, install qrcode with the ``pil`` dependency so\nthat pillow_ is installed and can be used for generating images::\n\n    pip install "qrcode[pil]"\n\n.. _pypng: https://pypi.python.org/pypi/pypng\n.. _pillow: https://pypi.python.org/pypi/Pillow\n\n\nWhat is a QR Code?\n==================\n\nA Quick Response code is a two-dimensional pictographic code used for its fast\nreadability and comparatively large storage capacity. The code consists of\nblack modules arranged in a square pattern on a white background. The\ninformation encoded can be made up of any kind of data (e.g., binary,\nalphanumeric, or Kanji symbols)\n\nUsage\n=====\n\nFrom the command line, use the installed ``qr`` script::\n\n    qr "Some text" > test.png\n\nOr in Python, use the ``make`` shortcut function:\n\n.. code:: python\n\n    import qrcode\n    img = qrcode.make(\'Some data here\')\n    type(img)  # qrcode.image.pil.PilImage\n    img.save("some_file.png")\n\nAdvanced Usage\n--------------\n\nFor more control, use the ``QRCode`` class. For example:\n\n.. code:: python\n\n    import qrcode\n    qr = qrcode.QRCode(\n        version=1,\n        error_correction=qrcode.constants.ERROR_CORRECT_L,\n        box_size=10,\n        border=4,\n    )\n    qr.add_data(\'Some data\')\n    qr.make(fit=True)\n\n    img = qr.make_image(fill_color="black", back_color="white")\n\nThe ``version`` parameter is an integer from 1 to 40 that controls the size of\nthe QR Code (the smallest, version 1, is a 21x21 matrix).\nSet to ``None`` and use the ``fit`` parameter when making the code to determine\nthis automatically.\n\n``fill_color`` and ``back_color`` can change the background and the painting\ncolor of the QR, when using the default image factory. Both parameters accept\nRGB color tuples.\n\n.. code:: python\n\n\n    img = qr.make_image(back_color=(255, 195, 235), fill_color=(55, 95, 35))\n\nThe ``error_correction`` parameter controls the error correction used for the\nQR Code. The following four constants are made available on the ``qrcode``\npackage:\n\n``ERROR_CORRECT_L``\n    About 7% or less errors can be corrected.\n``ERROR_CORRECT_M`` (default)\n    About 15% or less errors can be corrected.\n``ERROR_CORRECT_Q``\n    About 25% or less errors can be corrected.\n``ERROR_CORRECT_H``.\n    About 30% or less errors can be corrected.\n\nThe ``box_size`` parameter controls how many pixels each "box" of the QR code\nis.\n\nThe ``border`` parameter controls how many boxes thick the border should be\n(the default is 4, which is the minimum according to the specs).\n\nOther image factories\n=====================\n\nYou can encode as SVG, or use a new pure Python image processor to encode to\nPNG images.\n\nThe Python examples below use the ``make`` shortcut. The same ``image_factory``\nkeyword argument is a valid option for the ``QRCode`` class for more advanced\nusage.\n\nSVG\n---\n\nYou can create the entire SVG or an SVG fragment. When building an entire SVG\nimage, you can use the factory that combines as a path (recommended, and\ndefault for the script) or a factory that creates a simple set of rectangles.\n\nFrom your command line::\n\n    qr --factory=svg-path "Some text" > test.svg\n    qr --factory=svg "Some text" > test.svg\n    qr --factory=svg-fragment "Some text" > test.svg\n\nOr in Python:\n\n.. code:: python\n\n    import qrcode\n    import qrcode.image.svg\n\n    if method == \'basic\':\n        # Simple factory, just a set of rects.\n        factory = qrcode.image.svg.SvgImage\n    elif method == \'fragment\':\n        # Fragment factory (also just a set of rects)\n        factory = qrcode.image.svg.SvgFragmentImage\n    else:\n        # Combined path factory, fixes white space that may occur when zooming\n        factory = qrcode.image.svg.SvgPathImage\n\n    img = qrcode.make(\'Some data here\', image_factory=factory)\n\nTwo other related factories are available that work the same, but also fill the\nbackground of the SVG with white::\n\n    qrcode.image.svg.SvgFillImage\n    qrcode.image.svg.SvgPathFillImage\n\nThe ``QRCode.make_image()`` method forwards additional keyword arguments to the\nunderlying ElementTree XML library. This helps to fine tune the root element of\nthe resulting SVG:\n\n.. code:: python\n\n    import qrcode\n    qr = qrcode.QRCode(image_factory=qrcode.image.svg.SvgPathImage)\n    qr.add_data(\'Some data\')\n    qr.make(fit=True)\n\n    img = qr.make_image(attrib={\'class\': \'some-css-class\'})\n\nYou can convert the SVG image into strings using the ``to_string()`` method.\nAdditional keyword arguments are forwarded to ElementTrees ``tostring()``:\n\n.. code:: python\n\n    img.to_string(encoding=\'unicode\')\n\n\nPure Python PNG\n---------------\n\nIf Pillow is not installed, the default image factory will be a pure Python PNG\nencoder that uses `pypng`.\n\nYou can use the factory explicitly from your command line::\n\n    qr --factory=png "Some text" > test.png\n\nOr in Python:\n\n.. code:: python\n\n    import qrcode\n    from qrcode.image.pure import PyPNGImage\n    img = qrcode.make(\'Some data here\', image_factory=PyPNGImage)\n\n\nStyled Image\n------------\n\nWorks only with versions_ >=7.2 (SVG styled images require 7.4).\n\n.. _versions: https://github.com/lincolnloop/python-qrcode/blob/master/CHANGES.rst#72-19-july-2021\n\nTo apply styles to the QRCode, use the ``StyledPilImage`` or one of the\nstandard SVG_ image factories. These accept an optional ``module_drawer``\nparameter to control the shape of the QR Code.\n\nThese QR Codes are not guaranteed to work with all readers, so do some\nexperimentation and set the error correction to high (especially if embedding\nan image).\n\nOther PIL module drawers:\n\n    .. image:: doc/module_drawers.png\n\nFor SVGs, use ``SvgSquareDrawer``, ``SvgCircleDrawer``,\n``SvgPathSquareDrawer``, or ``SvgPathCircleDrawer``.\n\nThese all accept a ``size_ratio`` argument which allows for "gapped" squares or\ncircles by reducing this less than the default of ``Decimal(1)``.\n\n\nThe ``StyledPilImage`` additionally accepts an optional ``color_mask``\nparameter to change the colors of the QR Code, and an optional\n``embeded_image_path`` to embed an image in the center of the code.\n\nOther color masks:\n\n    .. image:: doc/color_masks.png\n\nHere is a code example to draw a QR code with rounded corners, radial gradient\nand an embedded image:\n\n.. code:: python\n\n    import qrcode\n    from qrcode.image.styledpil import StyledPilImage\n    from qrcode.image.styles.moduledrawers.pil import RoundedModuleDrawer\n    from qrcode.image.styles.colormasks import RadialGradiantColorMask\n\n    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L)\n    qr.add_data(\'Some data\')\n\n    img_1 = qr.make_image(image_factory=StyledPilImage, module_drawer=RoundedModuleDrawer())\n    img_2 = qr.make_image(image_factory=StyledPilImage, color_mask=RadialGradiantColorMask())\n    img_3 = qr.make_image(image_factory=StyledPilImage, embeded_image_path="/path/to/image.png")\n\nExamples\n========\n\nGet the text content from `print_ascii`:\n\n.. code:: python\n\n    import io\n    import qrcode\n    qr = qrcode.QRCode()\n    qr.add_data("Some text")\n    f = io.StringIO()\n    qr.print_ascii(out=f)\n    f.seek(0)\n    print(f.read())\n\nThe `add_data` method will append data to the current QR object. To add new data by replacing previous content in the same object, first use clear method:\n\n.. code:: python\n\n    import qrcode\n    qr = qrcode.QRCode()\n    qr.add_data(\'Some data\')\n    img = qr.make_image()\n    qr.clear()\n    qr.add_data(\'New data\')\n    other_img = qr.make_image()\n\nPipe ascii output to text file in command line::\n\n    qr --ascii "Some data" > "test.txt"\n    cat test.txt\n\nAlternative to piping output to file to avoid PowerShell issues::\n\n    # qr "Some data" > test.png\n    qr --output=test.png "Some data"\n\n==========\nChange log\n==========\n\n7.4.2 (6 February 2023)\n=======================\n\n- Allow ``pypng`` factory to allow for saving to a string (like\n  ``qr.save("some_file.png")``) in addition to file-like objects. \n\n\n7.4.1 (3 February 2023)\n=======================\n\n- Fix bad over-optimization in v7.4 that broke large QR codes. Thanks to\n  mattiasj-axis!\n\n\n7.4 (1 February 2023)\n=====================\n\n- Restructure the factory drawers, allowing different shapes in SVG image\n  factories as well.\n\n- Add a ``--factory-drawer`` option to the ``qr`` console script.\n\n- Optimize the output for the ``SVGPathImage`` factory (more than 30% reduction\n  in file sizes).\n\n- Add a ``pypng`` image factory as a pure Python PNG solution. If ``pillow`` is\n  *not* installed, then this becomes the default factory.\n\n- The ``pymaging`` image factory has been removed, but its factory shortcut and\n  the actual PymagingImage factory class now just link to the PyPNGImage\n  factory.\n\n\n7.3.1 (1 October 2021)\n======================\n\n- Improvements for embedded image.\n\n\n7.3 (19 August 2021)\n====================\n\n- Skip color mask if QR is black and white\n\n\n7.2 (19 July 2021)\n==================\n\n- Add Styled PIL image factory, allowing different color masks and shapes in QR codes\n\n- Small performance inprovement\n\n- Add check for border size parameter\n\n\n7.1 (1 July 2021)\n=================\n\n- Add --ascii parameter to command line interface allowing to output ascii when stdout is piped\n\n- Add --output parameter to command line interface to specify output file\n\n- Accept RGB tuples in fill_color and back_color\n\n- Add to_string method to SVG images\n\n- Replace inline styles with SVG attributes to avoid CSP issues\n\n- Add Python3.10 to supported versions\n\n\n7.0 (29 June 2021)\n==================\n\n- Drop Python < 3.6 support.\n\n\n6.1 (14 January 2019)\n=====================\n\n- Fix short chunks of data not being optimized to the correct mode.\n\n- Tests fixed for Python 3\n\n\n6.0 (23 March 2018)\n===================\n\n- Fix optimize length being ignored in ``QRCode.add_data``.\n\n- Better calculation of the best mask pattern and related optimizations. Big\n  thanks to cryptogun!\n\n\n5.3 (18 May 2016)\n=================\n\n* Fix incomplete block table for QR version 15. Thanks Rodrigo Queiro for the\n  report and Jacob Welsh for the investigation and fix.\n\n* Avoid unnecessary dependency for non MS platforms, thanks to Noah Vesely.\n\n* Make ``BaseImage.get_image()`` actually work.\n\n\n5.2 (25 Jan 2016)\n=================\n\n* Add ``--error-correction`` option to qr script.\n\n* Fix script piping to stdout in Python 3 and reading non-UTF-8 characters in\n  Python 3.\n\n* Fix script piping in Windows.\n\n* Add some useful behind-the-curtain methods for tinkerers.\n\n* Fix terminal output when using Python 2.6\n\n* Fix terminal output to display correctly on MS command line.\n\n5.2.1\n-----\n\n* Small fix to terminal output in Python 3 (and fix tests)\n\n5.2.2\n-----\n\n* Revert some terminal changes from 5.2 that broke Python 3\'s real life tty\n  code generation and introduce a better way from Jacob Welsh.\n\n\n5.1 (22 Oct 2014)\n=================\n\n* Make ``qr`` script work in Windows. Thanks Ionel Cristian Mărieș\n\n* Fixed print_ascii function in Python 3.\n\n* Out-of-bounds code version numbers are handled more consistently with a\n  ValueError.\n\n* Much better test coverage (now only officially supporting Python 2.6+)\n\n\n5.0 (17 Jun 2014)\n=================\n\n* Speed optimizations.\n\n* Change the output when using the ``qr`` script to use ASCII rather than\n  just colors, better using the terminal real estate.\n\n* Fix a bug in passing bytecode data directly when in Python 3.\n\n* Substation speed optimizations to best-fit algorithm (thanks Jacob Welsh!).\n\n* Introduce a ``print_ascii`` method and use it as the default for the ``qr``\n  script rather than ``print_tty``.\n\n5.0.1\n-----\n\n* Update version numbers correctly.\n\n\n4.0 (4 Sep 2013)\n================\n\n* Made qrcode work on Python 2.4 - Thanks tcely.\n  Note: officially, qrcode only supports 2.5+.\n\n* Support pure-python PNG generation (via pymaging) for Python 2.6+ -- thanks\n  Adam Wisniewski!\n\n* SVG image generation now supports alternate sizing (the default box size of\n  10 == 1mm per rectangle).\n\n* SVG path image generation allows cleaner SVG output by combining all QR rects\n  into a single path. Thank you, Viktor Stískala.\n\n* Added some extra simple SVG factories that fill the background white.\n\n4.0.1\n-----\n\n* Fix the pymaging backend not able to save the image to a buffer. Thanks ilj!\n\n4.0.2\n-----\n\n* Fix incorrect regex causing a comma to be considered part of the alphanumeric\n  set.\n\n* Switch to using setuptools for setup.py.\n\n4.0.3\n-----\n\n* Fix bad QR code generation due to the regex comma fix in version 4.0.2.\n\n4.0.4\n-----\n\n* Bad version number for previous hotfix release.\n\n\n3.1 (12 Aug 2013)\n=================\n\n* Important fixes for incorrect matches of the alphanumeric encoding mode.\n  Previously, the pattern would match if a single line was alphanumeric only\n  (even if others wern\'t). Also, the two characters ``{`` and ``}`` had snuck\n  in as valid characters. Thanks to Eran Tromer for the report and fix.\n\n* Optimized chunking -- if the parts of the data stream can be encoded more\n  efficiently, the data will be split into chunks of the most efficient modes.\n\n3.1.1\n-----\n\n* Update change log to contain version 3.1 changes. :P\n\n* Give the ``qr`` script an ``--optimize`` argument to control the chunk\n  optimization setting.\n\n\n3.0 (25 Jun 2013)\n=================\n\n* Python 3 support.\n\n* Add QRCode.get_matrix, an easy way to get the matrix array of a QR code\n  including the border. Thanks Hugh Rawlinson.\n\n* Add in a workaround so that Python 2.6 users can use SVG generation (they\n  must install ``lxml``).\n\n* Some initial tests! And tox support (``pip install tox``) for testing across\n  Python platforms.\n\n\n2.7 (5 Mar 2013)\n================\n\n* Fix incorrect termination padding.\n\n\n2.6 (2 Apr 2013)\n================\n\n* Fix the first four columns incorrectly shifted by one. Thanks to Josep\n  Gómez-Suay for the report and fix.\n\n* Fix strings within 4 bits of the QR version limit being incorrectly\n  terminated. Thanks to zhjie231 for the report.\n\n\n2.5 (12 Mar 2013)\n=================\n\n* The PilImage wrapper is more transparent - you can use any methods or\n  attributes available to the underlying PIL Image instance.\n\n* Fixed the first column of the QR Code coming up empty! Thanks to BecoKo.\n\n2.5.1\n-----\n\n* Fix installation error on Windows.\n\n\n2.4 (23 Apr 2012)\n=================\n\n* Use a pluggable backend system for generating images, thanks to Branko Čibej!\n  Comes with PIL and SVG backends built in.\n\n2.4.1\n-----\n\n* Fix a packaging issue\n\n2.4.2\n-----\n\n* Added a ``show`` method to the PIL image wrapper so the ``run_example``\n  function actually works.\n\n\n2.3 (29 Jan 2012)\n=================\n\n* When adding data, auto-select the more efficient encoding methods for numbers\n  and alphanumeric data (KANJI still not supported).\n\n2.3.1\n-----\n\n* Encode unicode to utf-8 bytestrings when adding data to a QRCode.\n\n\n2.2 (18 Jan 2012)\n=================\n\n* Fixed tty output to work on both white and black backgrounds.\n\n* Added `border` parameter to allow customizing of the number of boxes used to\n  create the border of the QR code\n\n\n2.1 (17 Jan 2012)\n=================\n\n* Added a ``qr`` script which can be used to output a qr code to the tty using\n  background colors, or to a file via a pipe.\n', 'context': None}
-    qr.add_data(data)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color=color, back_color="white")
-    img_path = f"qrcodes/{data_type}_{data}_{size}.png"
-    img.save(img_path)
-    qr_code_url = f"https://example.com/{img_path}"
-    return GenerateQRCodeResponse(qr_code_url=qr_code_url)
+        Response: The image, with the chosen QR version and mask pattern in the
+            `X-QR-Version` and `X-QR-Mask-Pattern` headers, or an empty 304 response
+            if the client's copy is current.
+
+    Raises:
+        RenderQueueFullError: If the rendering executor is saturated.
+    """
+    personalized = user_id is not None and None in (size, color, error_correction)
+    size, color, error_correction = await resolve_options(
+        user_id, size, color, error_correction
+    )
+    key = qr_code_cache_key(
+        data, data_type, size, color, error_correction, image_format, logo
+    )
+    # Weak: batch and interactive renders of a key differ only in PNG compression.
+    headers = {"ETag": f'W/"{key}"', "Cache-Control": IMAGE_CACHE_CONTROL}
+    if personalized:
+        headers["Cache-Control"] = PERSONALIZED_IMAGE_CACHE_CONTROL
+        headers["Vary"] = "Authorization"
+    if if_none_match is not None and etag_matches(if_none_match, key):
+        return Response(status_code=304, headers=headers)
+    rendered = await render_cache.get(key)
+    if rendered is None:
+        rendered = await render_executor.run(
+            qr_renderer.render_qr_code,
+            data,
+            data_type.value,
+            size,
+            color,
+            error_correction_for(error_correction, logo).value,
+            image_format.value,
+            "interactive",
+            None if logo is None else await load_logo(logo),
+        )
+        await render_cache.put(key, rendered, disk=False)
+    headers["X-QR-Version"] = str(rendered.info.version)
+    headers["X-QR-Mask-Pattern"] = str(rendered.info.mask_pattern)
+    return Response(
+        content=rendered.content,
+        media_type=qr_renderer.MEDIA_TYPES[image_format.value],
+        headers=headers,
+    )
+
+
+def etag_matches(if_none_match: str, key: str) -> bool:
+    """
+    Checks an `If-None-Match` header (a list of entity tags or '*') against a cache key.
+    """
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag.strip('"') == key:
+            return True
+    return False
+
+
+async def generate_qr_code(
+    data: str,
+    data_type: DataType,
+    size: Optional[int],
+    color: Optional[str],
+    error_correction: Optional[ErrorCorrection],
+    image_format: Format = Format.PNG,
+    logo: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> GenerateQRCodeResponse:
+    """
+    Receives data in supported formats and generates a QR code.
+
+    Args:
+        data (str): The data to be encoded in the QR code.
+        data_type (DataType): Type of the data provided, e.g., URL, TEXT, VCARD, JSON, CSV.
+        size (Optional[int]): Desired size of the QR code, in pixels.
+        color (Optional[str]): Hex code for the QR code's color.
+        error_correction (Optional[ErrorCorrection]): Level of error correction needed.
+        image_format (Format): Output format of the image, PNG or SVG.
+        logo (Optional[str]): Logo to place in the center, as a data URI, URL or
+            path below LOGO_DIR. Forces the HIGH error correction level.
+        user_id (Optional[str]): The requesting user, whose preferences fill in omitted
+            size, color and error correction.
+
+    Returns:
+        GenerateQRCodeResponse: Response model containing the URL to the generated QR code image
+            and the QR version and mask pattern it was encoded with.
+
+    Raises:
+        RenderQueueFullError: If the rendering executor is saturated.
+    """
+    size, color, error_correction = await resolve_options(
+        user_id, size, color, error_correction
+    )
+    image = await render_qr_code_image(
+        data, data_type, size, color, error_correction, image_format, logo=logo
+    )
+    return GenerateQRCodeResponse(
+        qr_code_url=qr_code_url_for(image.path),
+        version=image.info.version,
+        mask_pattern=image.info.mask_pattern,
+    )
+
+
+def qr_code_url_for(img_path: str) -> str:
+    """
+    Builds the public URL under which a rendered QR code image is served.
+    """
+    return f"{QR_CODE_BASE_URL}/{img_path}"
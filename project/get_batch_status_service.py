@@ -0,0 +1,79 @@
+from datetime import datetime
+from typing import List, Optional
+
+import prisma
+import prisma.models
+from pydantic import BaseModel
+
+
+class BatchItemFailure(BaseModel):
+    """
+    A QR code request of the batch that could not be rendered, with the reason.
+    """
+
+    qrCodeRequestId: str
+    error: str
+
+
+class BatchStatusResponse(BaseModel):
+    """
+    Current status and progress of a batch request, including the items that failed to render.
+    """
+
+    batchRequestId: str
+    status: str
+    total: int
+    rendered: int
+    failed: int
+    createdAt: datetime
+    completedAt: Optional[datetime] = None
+    failures: List[BatchItemFailure]
+
+
+async def get_batch_status(
+    batch_request_id: str, max_failures: int = 100
+) -> BatchStatusResponse:
+    """
+    Reports the status and rendering progress of a batch request.
+
+    Args:
+    batch_request_id (str): Identifier of the batch request returned by /batch/create.
+    max_failures (int): Maximum number of failed items to list in the response.
+
+    Returns:
+    BatchStatusResponse: Current status and progress of a batch request, including the items that failed to render.
+    """
+    batch_request = await prisma.models.BatchRequest.prisma().find_unique(
+        where={"id": batch_request_id}
+    )
+    if batch_request is None:
+        raise ValueError("BatchRequest not found.")
+    total = await prisma.models.QRCodeRequest.prisma().count(
+        where={"batchRequestId": batch_request_id}
+    )
+    rendered = await prisma.models.QRCodeRequest.prisma().count(
+        where={"batchRequestId": batch_request_id, "outputUrl": {"not": None}}
+    )
+    failed_items = await prisma.models.QRCodeRequest.prisma().find_many(
+        where={"batchRequestId": batch_request_id, "renderError": {"not": None}},
+        take=max_failures,
+        order={"id": "asc"},
+    )
+    failed = len(failed_items)
+    if failed == max_failures:
+        failed = await prisma.models.QRCodeRequest.prisma().count(
+            where={"batchRequestId": batch_request_id, "renderError": {"not": None}}
+        )
+    return BatchStatusResponse(
+        batchRequestId=batch_request.id,
+        status=batch_request.status,
+        total=total,
+        rendered=rendered,
+        failed=failed,
+        createdAt=batch_request.createdAt,
+        completedAt=batch_request.completedAt,
+        failures=[
+            BatchItemFailure(qrCodeRequestId=item.id, error=item.renderError or "")
+            for item in failed_items
+        ],
+    )
@@ -0,0 +1,105 @@
+from fastapi.responses import Response
+from project.lazy_import import import_timings
+from project.logo_pipeline import logo_sources
+from project.metrics import Counter, Gauge, registry
+from project.password_hasher import password_hasher
+from project.render_cache import render_cache
+from project.render_executor import render_executor
+from project.system_log import system_log_handler
+from project.token_cache import token_cache
+from project.user_preferences import preference_cache
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def cache_lookups():
+    render = render_cache.stats()
+    lookups = {
+        ("render", "memory_hit"): render.memory_hits,
+        ("render", "disk_hit"): render.disk_hits,
+        ("render", "miss"): render.misses,
+    }
+    for name, cache in (
+        ("token", token_cache),
+        ("preference", preference_cache),
+        ("logo_source", logo_sources),
+    ):
+        lookups[(name, "hit")] = cache.hits
+        lookups[(name, "miss")] = cache.misses
+    return lookups
+
+
+registry.register(
+    Counter(
+        "cache_lookups_total",
+        "Cache lookups by cache and outcome; hit ratios are hits over all lookups.",
+        labelnames=("cache", "result"),
+        callback=cache_lookups,
+    )
+)
+registry.register(
+    Gauge(
+        "render_cache_bytes",
+        "Bytes held in the in-memory tier of the render cache.",
+        callback=lambda: {(): render_cache.stats().current_bytes},
+    )
+)
+registry.register(
+    Gauge(
+        "render_executor_in_flight",
+        "Render jobs queued or running in the render executor.",
+        callback=lambda: {(): render_executor.in_flight},
+    )
+)
+registry.register(
+    Gauge(
+        "render_executor_capacity",
+        "Render jobs the executor accepts before interactive requests get 503.",
+        callback=lambda: {(): render_executor.queue_size},
+    )
+)
+registry.register(
+    Gauge(
+        "password_hasher_jobs",
+        "Password hashes running and waiting on the hashing pool.",
+        labelnames=("state",),
+        callback=lambda: {
+            ("running",): password_hasher.in_flight,
+            ("waiting",): password_hasher.waiting,
+        },
+    )
+)
+registry.register(
+    Gauge(
+        "system_log_buffered_records",
+        "Log records waiting to be written to the SystemLog table.",
+        callback=lambda: {(): system_log_handler.buffered},
+    )
+)
+registry.register(
+    Counter(
+        "system_log_dropped_records_total",
+        "Log records dropped because the SystemLog buffer was full.",
+        callback=lambda: {(): system_log_handler.dropped},
+    )
+)
+registry.register(
+    Gauge(
+        "module_import_seconds",
+        "Time taken by the first import of each deferred module.",
+        labelnames=("module",),
+        callback=lambda: {
+            (name,): seconds for name, seconds in dict(import_timings).items()
+        },
+    )
+)
+
+
+def get_metrics() -> Response:
+    """
+    Renders all metrics of this process in the Prometheus text exposition format.
+
+    Returns:
+        Response: The metrics as text/plain, ready for a Prometheus scrape.
+    """
+    return Response(content=registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,11 @@
+from project.password_hasher import PasswordHasherStats, password_hasher
+
+
+def get_password_hasher_stats() -> PasswordHasherStats:
+    """
+    Reports how many password checks are running and queued on the hashing pool.
+
+    Returns:
+        PasswordHasherStats: Load of the password hashing pool.
+    """
+    return password_hasher.stats()
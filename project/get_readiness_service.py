@@ -0,0 +1,50 @@
+from typing import Dict, Optional
+
+from project.lazy_import import import_timings
+from project.startup import startup_warm_up
+from pydantic import BaseModel
+
+
+class LivenessResponse(BaseModel):
+    """
+    Answer of the liveness probe.
+    """
+
+    status: str
+
+
+class ReadinessResponse(BaseModel):
+    """
+    Whether the process has warmed up, and how long starting it took.
+    """
+
+    ready: bool
+    warm_up_seconds: Dict[str, float]
+    import_seconds: Dict[str, float]
+    warm_up_error: Optional[str] = None
+
+
+def get_liveness() -> LivenessResponse:
+    """
+    Reports that the process is up and serving requests.
+
+    Returns:
+        LivenessResponse: Always 'ok'.
+    """
+    return LivenessResponse(status="ok")
+
+
+def get_readiness() -> ReadinessResponse:
+    """
+    Reports whether the startup warm-up has finished.
+
+    Returns:
+        ReadinessResponse: The readiness flag, the duration of each warm-up step
+            and the time taken by the first import of each deferred module.
+    """
+    return ReadinessResponse(
+        ready=startup_warm_up.ready,
+        warm_up_seconds=dict(startup_warm_up.steps),
+        import_seconds=dict(import_timings),
+        warm_up_error=startup_warm_up.error,
+    )
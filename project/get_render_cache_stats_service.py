@@ -0,0 +1,11 @@
+from project.render_cache import RenderCacheStats, render_cache
+
+
+def get_render_cache_stats() -> RenderCacheStats:
+    """
+    Reports hit, miss and eviction counters of the QR code render cache.
+
+    Returns:
+        RenderCacheStats: Counters describing the effectiveness and footprint of the render cache.
+    """
+    return render_cache.stats()
@@ -1,7 +1,20 @@
-from typing import List, Optional
+import base64
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
+import prisma.models
 from pydantic import BaseModel
 
+SYSTEM_LOGS_PAGE_SIZE = int(os.getenv("SYSTEM_LOGS_PAGE_SIZE", 100))
+SYSTEM_LOGS_MAX_PAGE_SIZE = int(os.getenv("SYSTEM_LOGS_MAX_PAGE_SIZE", 1000))
+
+
+class InvalidLogQueryError(ValueError):
+    """
+    Raised when a time or the cursor of a log query cannot be parsed.
+    """
+
 
 class LogEntry(BaseModel):
     """
@@ -16,63 +29,117 @@ class LogEntry(BaseModel):
 
 class GetSystemLogsResponse(BaseModel):
     """
-    Response model for system logs, including paginated logs and metadata.
+    Response model for system logs: one page of entries, newest first, and the cursor of the next page.
     """
 
     logs: List[LogEntry]
-    page: int
-    total_pages: int
     logs_per_page: int
-    total_logs: int
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(timestamp: datetime, log_id: str) -> str:
+    """
+    Encodes the position of a log entry as an opaque pagination cursor.
+    """
+    position = f"{timestamp.isoformat()}|{log_id}".encode("utf8")
+    return base64.urlsafe_b64encode(position).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Raises:
+        InvalidLogQueryError: If the cursor is malformed.
+    """
+    try:
+        timestamp, log_id = (
+            base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf8").split("|")
+        )
+        return datetime.fromisoformat(timestamp), log_id
+    except (UnicodeError, ValueError) as e:
+        raise InvalidLogQueryError(f"Invalid cursor: {cursor}") from e
+
+
+def parse_time(name: str, value: str) -> datetime:
+    """
+    Parses an ISO 8601 time given as the `name` query parameter.
+
+    Raises:
+        InvalidLogQueryError: If the time is malformed.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise InvalidLogQueryError(f"Invalid {name}: {value}") from e
 
 
 async def get_system_logs(
     start_time: Optional[str],
     end_time: Optional[str],
     log_type: Optional[str],
-    page: Optional[int],
+    cursor: Optional[str],
     page_size: Optional[int],
 ) -> GetSystemLogsResponse:
     """
     Retrieves logs related to system operations, user activities, and errors.
 
+    Entries are returned newest first and paginated by keyset: the cursor holds
+    the (timestamp, id) of the last entry returned, and the next page continues
+    strictly below it. Together with the (type, timestamp, id) and (timestamp, id)
+    indexes every page is an index range scan, however deep it is.
+
     Args:
     start_time (Optional[str]): The starting point of the time range for which logs are requested, in ISO 8601 format.
     end_time (Optional[str]): The ending point of the time range for which logs are requested, also in ISO 8601 format.
     log_type (Optional[str]): Optional filter for the type of logs to retrieve, such as 'error', 'activity', or 'performance'.
-    page (Optional[int]): The page number for pagination, starting from 1.
-    page_size (Optional[int]): The number of logs to return per page, for pagination control.
+    cursor (Optional[str]): The `next_cursor` of the previous page, or None for the first page.
+    page_size (Optional[int]): The number of logs to return per page, at most SYSTEM_LOGS_MAX_PAGE_SIZE.
 
     Returns:
-    GetSystemLogsResponse: Response model for system logs, including paginated logs and metadata.
+    GetSystemLogsResponse: Response model for system logs: one page of entries, newest first, and the cursor of the next page.
+
+    Raises:
+    InvalidLogQueryError: If a time or the cursor cannot be parsed.
     """
-    mock_logs = [
-        LogEntry(
-            timestamp="2023-01-01T12:00:00+00:00",
-            type="error",
-            message="Example error log",
-            details="Error details",
-        ),
+    page_size = min(
+        max(page_size or SYSTEM_LOGS_PAGE_SIZE, 1), SYSTEM_LOGS_MAX_PAGE_SIZE
+    )
+    conditions: List[Dict[str, Any]] = []
+    if log_type is not None:
+        conditions.append({"type": log_type})
+    if start_time is not None:
+        conditions.append({"timestamp": {"gte": parse_time("start_time", start_time)}})
+    if end_time is not None:
+        conditions.append({"timestamp": {"lte": parse_time("end_time", end_time)}})
+    if cursor is not None:
+        timestamp, log_id = decode_cursor(cursor)
+        conditions.append(
+            {
+                "OR": [
+                    {"timestamp": {"lt": timestamp}},
+                    {"timestamp": timestamp, "id": {"lt": log_id}},
+                ]
+            }
+        )
+    rows = await prisma.models.SystemLog.prisma().find_many(
+        where={"AND": conditions},
+        order=[{"timestamp": "desc"}, {"id": "desc"}],
+        take=page_size + 1,
+    )
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+    logs = [
         LogEntry(
-            timestamp="2023-01-02T13:00:00+00:00",
-            type="activity",
-            message="Example activity log",
-            details=None,
-        ),
+            timestamp=row.timestamp.isoformat(),
+            type=row.type,
+            message=row.message,
+            details=row.details,
+        )
+        for row in rows
     ]
-    if page is None or page_size is None:
-        page = 1
-        page_size = len(mock_logs)
-    filtered_logs = mock_logs
-    total_logs = len(filtered_logs)
-    total_pages = total_logs // page_size + (1 if total_logs % page_size > 0 else 0)
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-    paginated_logs = filtered_logs[start_index:end_index]
     return GetSystemLogsResponse(
-        logs=paginated_logs,
-        page=page,
-        total_pages=total_pages,
-        logs_per_page=len(paginated_logs),
-        total_logs=total_logs,
+        logs=logs, logs_per_page=len(logs), next_cursor=next_cursor
     )
@@ -1,7 +1,6 @@
 from typing import List
 
-import prisma
-import prisma.models
+from project.user_preferences import load_user_preferences
 from pydantic import BaseModel
 
 
@@ -22,26 +21,25 @@ class GetUserPreferencesResponse(BaseModel):
     preferences: List[UserPreferenceDetail]
 
 
-async def get_user_preferences() -> GetUserPreferencesResponse:
+async def get_user_preferences(user_id: str) -> GetUserPreferencesResponse:
     """
     Retrieves the user's stored preferences for QR code generation and customization.
 
-    This function interacts with the database to fetch the user's stored QR code generation and customization preferences.
-    It compiles these preferences into a structured format suitable for further processing or presentation.
+    Only the given user's preferences are loaded, through the per-user preference cache.
+
+    Args:
+        user_id (str): The unique identifier of the user whose preferences are retrieved.
 
     Returns:
         GetUserPreferencesResponse: A detailed layout of the user's stored preferences for QR code generation and customization, encapsulating various preference parameters.
 
     Example:
-        get_user_preferences()
+        get_user_preferences("user-id")
         > GetUserPreferencesResponse(preferences=[UserPreferenceDetail(preference_key='color', preference_value='#000000')])
     """
-    user_preferences = await prisma.models.UserPreference.prisma().find_many()
+    user_preferences = await load_user_preferences(user_id)
     preferences_details = [
-        UserPreferenceDetail(
-            preference_key=preference.preferenceKey,
-            preference_value=preference.preferenceValue,
-        )
-        for preference in user_preferences
+        UserPreferenceDetail(preference_key=key, preference_value=value)
+        for key, value in user_preferences.items()
     ]
     return GetUserPreferencesResponse(preferences=preferences_details)
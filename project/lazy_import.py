@@ -0,0 +1,68 @@
+import importlib
+import os
+import sys
+import threading
+import time
+import types
+from typing import Dict
+
+# "0" imports modules passed to `lazy_import` right away, as plain imports would.
+LAZY_IMPORTS = os.getenv("LAZY_IMPORTS", "1") == "1"
+
+# Seconds spent on the first import of each module loaded through `timed_import`,
+# including whatever of its dependencies was not loaded yet.
+import_timings: Dict[str, float] = {}
+_timings_lock = threading.Lock()
+
+
+def timed_import(name: str) -> types.ModuleType:
+    """
+    Imports a module by name, recording how long the import took if it was not loaded yet.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - start
+    with _timings_lock:
+        import_timings.setdefault(name, elapsed)
+    return module
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stands in for a module that is imported on first attribute access.
+
+    After the import the module's namespace is copied in, so later lookups are
+    plain attribute reads.
+    """
+
+    def __getattr__(self, attr: str):
+        module = timed_import(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Returns the module `name`, deferring the import until an attribute is first used.
+
+    Used for heavy dependencies (numpy, Pillow, qrcode, jose, bcrypt) that the API process
+    only needs on some requests, so that importing the server stays fast. Names
+    used in annotations evaluated at import time must be quoted, or they trigger
+    the import right away.
+
+    Args:
+        name (str): Absolute module name, e.g. 'PIL.Image'.
+
+    Returns:
+        types.ModuleType: The module if it is already loaded or LAZY_IMPORTS is
+            off, otherwise a LazyModule standing in for it.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if not LAZY_IMPORTS:
+        return timed_import(name)
+    return LazyModule(name)
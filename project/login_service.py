@@ -1,8 +1,8 @@
-import bcrypt
 import prisma
 import prisma.models
 from fastapi import HTTPException
-from jose import jwt
+from project.auth import create_access_token
+from project.password_hasher import password_hasher
 from pydantic import BaseModel
 
 
@@ -19,6 +19,12 @@ async def login(email: str, password: str) -> LoginResponse:
     """
     Authenticates a user and returns an access token.
 
+    The bcrypt check runs on the password hashing pool rather than the event
+    loop. Hashes made with a cost factor other than BCRYPT_ROUNDS are replaced
+    by a fresh hash of the verified password. The access token is a JWT signed
+    with JWT_SECRET_KEY that carries the user's role and expires after
+    ACCESS_TOKEN_TTL seconds.
+
     Args:
         email (str): The user's email address used for login.
         password (str): The user's password in plaintext, which will be hashed server-side for verification.
@@ -29,17 +35,18 @@ async def login(email: str, password: str) -> LoginResponse:
     Raises:
         HTTPException: With status code 404 if the user is not found.
         HTTPException: With status code 401 if the password does not match.
+        PasswordHasherBusyError: If too many password checks are already pending.
     """
     user = await prisma.models.User.prisma().find_unique(where={"email": email})
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    password_match = bcrypt.checkpw(
-        password.encode("utf8"), user.hashedPassword.encode("utf8")
-    )
+    password_match = await password_hasher.verify(password, user.hashedPassword)
     if not password_match:
         raise HTTPException(status_code=401, detail="Incorrect password")
-    secret_key = "SECRET_KEY"
-    algorithm = "HS256"
-    data = {"sub": user.id}
-    access_token = jwt.encode(data, secret_key, algorithm=algorithm)
-    return LoginResponse(access_token=access_token, token_type="bearer")
+    if password_hasher.needs_rehash(user.hashedPassword):
+        await prisma.models.User.prisma().update(
+            where={"id": user.id},
+            data={"hashedPassword": await password_hasher.hash(password)},
+        )
+    access_token = create_access_token(user.id, user.role)
+    return LoginResponse(access_token=access_token.token, token_type="bearer")
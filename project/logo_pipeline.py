@@ -0,0 +1,314 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import http.client
+import ipaddress
+import os
+import socket
+import ssl
+import threading
+import urllib.parse
+from collections import OrderedDict
+from io import BytesIO
+from typing import Generic, Hashable, List, NamedTuple, Optional, Tuple, TypeVar
+
+from project.lazy_import import lazy_import
+from project.metrics import render_stage
+
+# Only render workers decode logos; the API process just loads their bytes.
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
+
+LOGO_CACHE_MAX_BYTES = int(os.getenv("LOGO_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+LOGO_MAX_BYTES = int(os.getenv("LOGO_MAX_BYTES", 1024 * 1024))
+LOGO_FETCH_TIMEOUT = float(os.getenv("LOGO_FETCH_TIMEOUT", 5.0))
+# Comma-separated hosts logo URLs may point to; empty allows any public host.
+LOGO_ALLOWED_HOSTS = {
+    host.strip().lower()
+    for host in os.getenv("LOGO_ALLOWED_HOSTS", "").split(",")
+    if host.strip()
+}
+# Local logos must live below this directory.
+LOGO_DIR = os.getenv("LOGO_DIR", "logos")
+# Edge length of the logo relative to the symbol; 0.25 covers ~6% of the modules.
+LOGO_SIZE_RATIO = float(os.getenv("LOGO_SIZE_RATIO", 0.25))
+# Palette entries left for the logo next to the QR code's two colors.
+LOGO_PALETTE_COLORS = 254
+
+V = TypeVar("V")
+
+
+class LogoCache(Generic[V]):
+    """
+    Byte-bounded, thread-safe LRU used for logo sources and their prepared variants.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, Tuple[V, int]] = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: V, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._current_bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._current_bytes += size
+            while self._current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._current_bytes -= evicted_size
+
+
+class LogoVariant(NamedTuple):
+    """
+    A logo decoded and scaled for one edge length, ready to be pasted.
+
+    `indices` is a 'P' image whose indices point past the two QR code palette
+    entries into `palette`; `png` is the same logo encoded for embedding in SVGs.
+    """
+
+    indices: "Image.Image"
+    palette: List[int]
+    png: bytes
+
+
+# Raw logo files by reference, in the API process.
+logo_sources: LogoCache[bytes] = LogoCache(LOGO_CACHE_MAX_BYTES)
+# Decoded, scaled logos by (content hash, edge length), in each render worker.
+logo_variants: LogoCache[LogoVariant] = LogoCache(LOGO_CACHE_MAX_BYTES)
+
+
+async def load_logo(logo: str) -> bytes:
+    """
+    Resolves a logo reference to the bytes of the image file.
+
+    Accepts `data:` URIs with base64 content, http(s) URLs of public hosts (see
+    `fetch_logo`) and paths below LOGO_DIR. Files are read or downloaded once and then served from memory.
+
+    Args:
+        logo (str): The logo reference as given in the request.
+
+    Returns:
+        bytes: The encoded logo image.
+
+    Raises:
+        ValueError: If the reference is malformed, not public, outside LOGO_DIR or larger than LOGO_MAX_BYTES.
+    """
+    content = logo_sources.get(logo)
+    if content is not None:
+        return content
+    with render_stage("logo_load"):
+        if logo.startswith("data:"):
+            header, _, payload = logo.partition(",")
+            if not header.endswith(";base64"):
+                raise ValueError("Logo data URIs must be base64 encoded.")
+            try:
+                content = base64.b64decode(payload, validate=True)
+            except binascii.Error as e:
+                raise ValueError("Logo data URI is not valid base64.") from e
+        elif logo.startswith(("http://", "https://")):
+            content = await asyncio.to_thread(fetch_logo, logo)
+        else:
+            content = await asyncio.to_thread(read_logo, logo)
+    if len(content) > LOGO_MAX_BYTES:
+        raise ValueError(f"Logo is larger than {LOGO_MAX_BYTES} bytes.")
+    logo_sources.put(logo, content, len(content))
+    return content
+
+
+class PinnedHTTPConnection(http.client.HTTPConnection):
+    """
+    Connects to an address checked beforehand instead of resolving the host again.
+    """
+
+    def __init__(self, host: str, port: int, address: str, timeout: float) -> None:
+        super().__init__(host, port, timeout=timeout)
+        self.address = address
+
+    def connect(self) -> None:
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+
+class PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """
+    Connects to an address checked beforehand, verifying the certificate for the host.
+    """
+
+    def __init__(self, host: str, port: int, address: str, timeout: float) -> None:
+        super().__init__(host, port, timeout=timeout)
+        self.address = address
+        self.ssl_context = ssl.create_default_context()
+
+    def connect(self) -> None:
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        self.sock = self.ssl_context.wrap_socket(sock, server_hostname=self.host)
+
+
+def resolve_public_address(host: str, port: int) -> str:
+    """
+    Resolves a logo host, refusing hosts with any non-public address.
+
+    Private, loopback, link-local, reserved and multicast addresses are refused,
+    so logo URLs cannot reach the internal network or cloud metadata endpoints.
+
+    Raises:
+        ValueError: If the host does not resolve, is not allowed or is not public.
+    """
+    if LOGO_ALLOWED_HOSTS and host.lower() not in LOGO_ALLOWED_HOSTS:
+        raise ValueError("Logo host is not allowed.")
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise ValueError("Logo host could not be resolved.") from e
+    addresses = [info[4][0] for info in infos]
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError("Logo host is not a public address.")
+    return addresses[0]
+
+
+def fetch_logo(url: str) -> bytes:
+    """
+    Downloads a logo from a public host, reading at most one byte more than LOGO_MAX_BYTES.
+
+    The connection goes to the address that was checked, so the host cannot
+    resolve to another one in between. Redirects are not followed, and
+    responses announcing more than LOGO_MAX_BYTES are refused before their body
+    is read.
+
+    Raises:
+        ValueError: If the URL, its host or the response is not acceptable.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if not parts.hostname:
+        raise ValueError("Logo URL has no host.")
+    https = parts.scheme == "https"
+    port = parts.port or (443 if https else 80)
+    address = resolve_public_address(parts.hostname, port)
+    connection_class = PinnedHTTPSConnection if https else PinnedHTTPConnection
+    connection = connection_class(parts.hostname, port, address, LOGO_FETCH_TIMEOUT)
+    try:
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        connection.request("GET", path)
+        response = connection.getresponse()
+        if response.status != 200:
+            raise ValueError(f"Logo URL returned HTTP {response.status}.")
+        length = response.getheader("Content-Length")
+        if length is not None and length.isdigit() and int(length) > LOGO_MAX_BYTES:
+            raise ValueError(f"Logo is larger than {LOGO_MAX_BYTES} bytes.")
+        return response.read(LOGO_MAX_BYTES + 1)
+    finally:
+        connection.close()
+
+
+def read_logo(path: str) -> bytes:
+    """
+    Reads a logo from LOGO_DIR, rejecting paths that resolve outside of it.
+    """
+    root = os.path.realpath(LOGO_DIR)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError("Logo path is outside the logo directory.")
+    with open(resolved, "rb") as f:
+        return f.read(LOGO_MAX_BYTES + 1)
+
+
+def logo_edge(symbol_pixels: int, box_size: int) -> int:
+    """
+    Edge length of the logo, in pixels, snapped to whole modules.
+    """
+    modules = max(int(symbol_pixels / box_size * LOGO_SIZE_RATIO), 1)
+    return modules * box_size
+
+
+def prepare_logo(content: bytes, edge: int) -> LogoVariant:
+    """
+    Decodes and scales a logo to fit an edge x edge box, once per (logo, edge).
+
+    The image is resampled in premultiplied-alpha space ('RGBa'), so transparent
+    pixels do not bleed their color into the edges, then flattened onto white
+    (premultiplied color plus the uncovered share of white) and quantized to a
+    palette that starts after the two QR code entries. The result can be pasted
+    into a rendered 'P' image as is.
+
+    Args:
+        content (bytes): The encoded logo image.
+        edge (int): Maximum width and height of the scaled logo, in pixels.
+
+    Returns:
+        LogoVariant: The prepared logo. Shared; do not modify.
+    """
+    key = (hashlib.sha256(content).digest(), edge)
+    variant = logo_variants.get(key)
+    if variant is not None:
+        return variant
+    with Image.open(BytesIO(content)) as img:
+        img.load()
+        premultiplied = img.convert("RGBA").convert("RGBa")
+    scale = edge / max(premultiplied.size)
+    size = (
+        max(round(premultiplied.width * scale), 1),
+        max(round(premultiplied.height * scale), 1),
+    )
+    pixels = np.asarray(premultiplied.resize(size, Image.Resampling.LANCZOS))
+    flattened = pixels[:, :, :3] + (255 - pixels[:, :, 3:])
+    quantized = Image.fromarray(flattened, mode="RGB").quantize(LOGO_PALETTE_COLORS)
+    palette = quantized.getpalette()[: LOGO_PALETTE_COLORS * 3]
+    buffer = BytesIO()
+    quantized.save(buffer, format="PNG")
+    variant = LogoVariant(
+        indices=Image.fromarray(np.asarray(quantized) + 2, mode="P"),
+        palette=palette,
+        png=buffer.getvalue(),
+    )
+    logo_variants.put(
+        key, variant, variant.indices.width * variant.indices.height + len(variant.png)
+    )
+    return variant
+
+
+def composite_logo(img: "Image.Image", logo: LogoVariant) -> "Image.Image":
+    """
+    Pastes the prepared logo onto the center of the rendered QR code.
+
+    The logo tile is opaque, so compositing is a single index `paste` that also
+    clears the modules behind it, and the logo palette is appended to the two
+    QR code colors.
+
+    Args:
+        img (Image.Image): The rasterized QR code; other modes are reduced to two colors first.
+        logo (LogoVariant): A variant from `prepare_logo`.
+
+    Returns:
+        Image.Image: A 'P' image with the logo composited in.
+    """
+    if img.mode != "P":
+        img = img.convert("P", palette=Image.Palette.ADAPTIVE, colors=2)
+    qr_palette = img.getpalette()[:6]
+    box = (
+        (img.width - logo.indices.width) // 2,
+        (img.height - logo.indices.height) // 2,
+    )
+    img.paste(logo.indices, box)
+    img.putpalette(qr_palette + logo.palette)
+    return img
@@ -1,5 +1,8 @@
 import prisma
 import prisma.models
+from project.auth import decode_access_token, is_jwt
+from project.token_cache import token_cache
+from project.token_revocation import revocation_list
 from pydantic import BaseModel
 
 
@@ -17,6 +20,9 @@ async def logout(token: str) -> LogoutResponseModel:
 
     This function requires an authentication token as its input. It checks if the token exists
     in the database and, if found, invalidates it to log out the user effectively.
+    API keys are deleted and dropped from the permission check cache; JWTs are
+    added to the revocation list until they expire. Either way the token stops
+    working in this process immediately.
     The function returns a LogoutResponseModel object, indicating the operation's success.
 
     Args:
@@ -29,10 +35,14 @@ async def logout(token: str) -> LogoutResponseModel:
     logout_response = await logout('some_valid_token_string')
     > LogoutResponseModel(message='Successfully logged out.')
     """
-    existing_token = await prisma.models.APIKey.prisma().find_unique(
-        where={"key": token}
-    )
-    if not existing_token:
+    if is_jwt(token):
+        user = decode_access_token(token)
+        if user is None:
+            return LogoutResponseModel(message="Invalid token.")
+        await revocation_list.revoke(user.jti, user.expires_at)
+        return LogoutResponseModel(message="Successfully logged out.")
+    deleted = await prisma.models.APIKey.prisma().delete_many(where={"key": token})
+    token_cache.invalidate(token)
+    if not deleted:
         return LogoutResponseModel(message="Invalid token.")
-    await prisma.models.APIKey.prisma().delete(where={"id": existing_token.id})
     return LogoutResponseModel(message="Successfully logged out.")
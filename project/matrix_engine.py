@@ -0,0 +1,276 @@
+import os
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+import qrcode
+import qrcode.util
+from numpy.lib.stride_tricks import sliding_window_view
+from project.encoding_planner import plan_encoding
+from project.metrics import render_stage
+from project.render_cache import RenderInfo
+
+MATRIX_CACHE_SIZE = int(os.getenv("MATRIX_CACHE_SIZE", 1024))
+
+# Finder-like 1:1:3:1:1 patterns with four light modules on either side (penalty N3).
+FINDER_PATTERNS = np.array(
+    [
+        [1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0],
+        [0, 0, 0, 0, 1, 0, 1, 1, 1, 0, 1],
+    ],
+    dtype=bool,
+)
+
+
+class VersionTemplate(NamedTuple):
+    """
+    Everything about a QR version that does not depend on the encoded data.
+
+    `function_modules` holds the finder, separator, timing and alignment patterns
+    with the format and version information areas left light, which is the state
+    mask penalties are evaluated in. `data_rows`/`data_cols` list the data module
+    coordinates in placement order and `data_masks` holds, for each of the eight
+    mask patterns, whether it flips the module at each of those coordinates.
+    """
+
+    size: int
+    function_modules: np.ndarray
+    data_rows: np.ndarray
+    data_cols: np.ndarray
+    data_masks: np.ndarray
+    version_bits: np.ndarray
+
+
+class QRMatrix(NamedTuple):
+    """
+    The module matrix of an encoded QR code (without quiet zone) and how it was encoded.
+    """
+
+    modules: np.ndarray
+    info: RenderInfo
+
+
+def mask_patterns(size: int) -> np.ndarray:
+    """
+    Evaluates the eight mask conditions over a size x size grid.
+
+    Returns:
+        np.ndarray: Boolean array of shape (8, size, size), True where the mask flips the module.
+    """
+    i, j = np.indices((size, size))
+    return np.stack(
+        [
+            (i + j) % 2 == 0,
+            i % 2 == 0,
+            j % 3 == 0,
+            (i + j) % 3 == 0,
+            (i // 2 + j // 3) % 2 == 0,
+            (i * j) % 2 + (i * j) % 3 == 0,
+            ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+            ((i * j) % 3 + (i + j) % 2) % 2 == 0,
+        ]
+    )
+
+
+def format_positions(size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Coordinates of the 15 format information bits, both copies, least significant bit first.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Row and column indices, 30 entries each.
+    """
+    rows: List[int] = []
+    cols: List[int] = []
+    for i in range(15):
+        if i < 6:
+            rows.append(i)
+        elif i < 8:
+            rows.append(i + 1)
+        else:
+            rows.append(size - 15 + i)
+        cols.append(8)
+    for i in range(15):
+        rows.append(8)
+        if i < 8:
+            cols.append(size - i - 1)
+        elif i < 9:
+            cols.append(15 - i)
+        else:
+            cols.append(15 - i - 1)
+    return np.array(rows), np.array(cols)
+
+
+def version_positions(size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Coordinates of the 18 version information bits, both copies, least significant bit first.
+    """
+    bits = np.arange(18)
+    near = bits // 3
+    far = bits % 3 + size - 11
+    return np.concatenate([near, far]), np.concatenate([far, near])
+
+
+@lru_cache(maxsize=None)
+def version_template(version: int) -> VersionTemplate:
+    """
+    Builds, once per version, the function patterns and the data placement order.
+
+    The fixed patterns come from qrcode itself. The data placement order is the
+    two-column zigzag of the specification, walked once over the free modules so
+    that placing data later is a single fancy-indexing assignment.
+
+    Args:
+        version (int): QR version, 1 to 40.
+
+    Returns:
+        VersionTemplate: The cached template for the version.
+    """
+    qr = qrcode.QRCode(version=version)
+    size = qr.modules_count = version * 4 + 17
+    qr.modules = [[None] * size for _ in range(size)]
+    qr.setup_position_probe_pattern(0, 0)
+    qr.setup_position_probe_pattern(size - 7, 0)
+    qr.setup_position_probe_pattern(0, size - 7)
+    qr.setup_position_adjust_pattern()
+    qr.setup_timing_pattern()
+    qr.setup_type_info(True, 0)
+    if version >= 7:
+        qr.setup_type_number(True)
+
+    rows: List[int] = []
+    cols: List[int] = []
+    row, step = size - 1, -1
+    for col in range(size - 1, 0, -2):
+        if col <= 6:
+            col -= 1
+        while 0 <= row < size:
+            for c in (col, col - 1):
+                if qr.modules[row][c] is None:
+                    rows.append(row)
+                    cols.append(c)
+            row += step
+        row -= step
+        step = -step
+
+    function_modules = np.array(
+        [[bool(module) for module in line] for line in qr.modules]
+    )
+    data_rows, data_cols = np.array(rows), np.array(cols)
+    version_bits = np.zeros(18, dtype=bool)
+    if version >= 7:
+        number = qrcode.util.BCH_type_number(version)
+        version_bits = (number >> np.arange(18)) & 1 == 1
+    return VersionTemplate(
+        size=size,
+        function_modules=function_modules,
+        data_rows=data_rows,
+        data_cols=data_cols,
+        data_masks=mask_patterns(size)[:, data_rows, data_cols],
+        version_bits=version_bits,
+    )
+
+
+def mask_penalties(candidates: np.ndarray) -> np.ndarray:
+    """
+    Scores a stack of masked symbols with the four penalty rules (N1 to N4).
+
+    All rules are evaluated for every candidate at once with array operations,
+    following qrcode's `util.lost_point` so both pick the same mask.
+
+    Args:
+        candidates (np.ndarray): Boolean array of shape (count, size, size).
+
+    Returns:
+        np.ndarray: The penalty score of each candidate.
+    """
+    size = candidates.shape[1]
+    transposed = candidates.transpose(0, 2, 1)
+    penalties = run_penalties(candidates) + run_penalties(transposed)
+
+    top, bottom = candidates[:, :-1], candidates[:, 1:]
+    uniform = (
+        (top[:, :, :-1] == top[:, :, 1:])
+        & (top[:, :, :-1] == bottom[:, :, :-1])
+        & (top[:, :, :-1] == bottom[:, :, 1:])
+    )
+    penalties += 3 * uniform.sum(axis=(1, 2))
+
+    for matrix in (candidates, transposed):
+        windows = sliding_window_view(matrix, FINDER_PATTERNS.shape[1], axis=2)
+        finder_like = (windows == FINDER_PATTERNS[0]).all(axis=-1) | (
+            windows == FINDER_PATTERNS[1]
+        ).all(axis=-1)
+        penalties += 40 * finder_like.sum(axis=(1, 2))
+
+    percent = candidates.sum(axis=(1, 2)) / (size * size)
+    penalties += 10 * (np.abs(percent * 100 - 50) / 5).astype(np.int64)
+    return penalties
+
+
+def run_penalties(candidates: np.ndarray) -> np.ndarray:
+    """
+    Penalty N1: every row run of five or more same-colored modules scores its length minus two.
+    """
+    count, size = candidates.shape[0], candidates.shape[1]
+    # One extra always-set column marks each row end, so runs never span rows or candidates.
+    edges = np.ones((count, size, size + 1), dtype=bool)
+    edges[:, :, 1:size] = candidates[:, :, 1:] != candidates[:, :, :-1]
+    starts = np.flatnonzero(edges)
+    lengths = np.diff(starts)
+    long_runs = lengths >= 5
+    owners = starts[:-1][long_runs] // (size * (size + 1))
+    return np.bincount(owners, weights=lengths[long_runs] - 2, minlength=count).astype(
+        np.int64
+    )
+
+
+@lru_cache(maxsize=MATRIX_CACHE_SIZE)
+def encode_matrix(data: str, data_type: str, error_correction: int) -> QRMatrix:
+    """
+    Encodes the data into a finished QR module matrix.
+
+    The codewords come from the encoding planner and qrcode's Reed-Solomon code.
+    They are laid over the version template for all eight masks at once, the
+    candidates are scored in one vectorized pass and the format information of the
+    winner is filled in. Results are memoized by payload and error correction
+    level, independently of size and color, so re-rendering a code with a
+    different look does not encode it again. The returned matrix is read-only.
+
+    Args:
+        data (str): The data to be encoded in the QR code.
+        data_type (str): Name of the data type, e.g. 'URL' or 'CSV'.
+        error_correction (int): qrcode error correction constant.
+
+    Returns:
+        QRMatrix: The module matrix, True for dark modules, with its version and mask pattern.
+    """
+    with render_stage("encode"):
+        plan = plan_encoding(data, data_type, error_correction)
+        codewords = qrcode.util.create_data(
+            plan.version, error_correction, plan.qr_data()
+        )
+    with render_stage("matrix"):
+        template = version_template(plan.version)
+        bits = np.unpackbits(np.array(codewords, dtype=np.uint8)).astype(bool)
+        data_bits = np.zeros(len(template.data_rows), dtype=bool)
+        data_bits[: min(len(bits), len(data_bits))] = bits[: len(data_bits)]
+        candidates = np.repeat(template.function_modules[np.newaxis], 8, axis=0)
+        candidates[:, template.data_rows, template.data_cols] = (
+            data_bits ^ template.data_masks
+        )
+    with render_stage("mask"):
+        mask_pattern = int(np.argmin(mask_penalties(candidates)))
+
+    modules = candidates[mask_pattern].copy()
+    format_info = qrcode.util.BCH_type_info((error_correction << 3) | mask_pattern)
+    format_bits = (format_info >> np.arange(15)) & 1 == 1
+    modules[format_positions(template.size)] = np.concatenate(
+        [format_bits, format_bits]
+    )
+    modules[template.size - 8, 8] = True
+    if plan.version >= 7:
+        modules[version_positions(template.size)] = np.concatenate(
+            [template.version_bits, template.version_bits]
+        )
+    modules.setflags(write=False)
+    return QRMatrix(modules, RenderInfo(plan.version, mask_pattern))
@@ -0,0 +1,363 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+Labels = Tuple[str, ...]
+
+# Upper bounds, in seconds, for request and render timings.
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    pairs = (
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    A named metric family in the Prometheus text format.
+
+    Values are only updated from the event loop (render stages are measured in
+    the workers and recorded when the job returns), so updates are plain
+    dictionary and list operations without locks. `callback`, if given, is called
+    at scrape time and returns the current value of each label combination,
+    for values that live elsewhere, like cache counters.
+    """
+
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[Labels, float]]] = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values: Dict[Labels, float] = {}
+
+    def samples(self) -> Iterator[Tuple[str, Labels, float]]:
+        values = self.callback() if self.callback is not None else self._values
+        for labels, value in sorted(values.items()):
+            yield self.name, labels, value
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, labels, value in self.samples():
+            label_names = self.labelnames
+            if name.endswith("_bucket"):
+                label_names = self.labelnames + ("le",)
+            lines.append(
+                f"{name}{format_labels(label_names, labels)} {format_value(value)}"
+            )
+        return lines
+
+
+class Counter(Metric):
+    """
+    A monotonically increasing count.
+    """
+
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down, usually read through `callback` at scrape time.
+    """
+
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Counts observations into fixed buckets, so recording one is a bisect and two additions.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label combination: one count per bucket plus +Inf, then sum and count.
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self) -> Iterator[Tuple[str, Labels, float]]:
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), series[:-2]):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", labels + (format_value(bound),), cumulative
+            yield f"{self.name}_sum", labels, series[-2]
+            yield f"{self.name}_count", labels, series[-1]
+
+
+class Registry:
+    """
+    The set of metrics exposed at /metrics.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time to answer an HTTP request, by route template and status.",
+        labelnames=("method", "route", "status"),
+    )
+)
+RENDER_STAGE_SECONDS = registry.register(
+    Histogram(
+        "qr_render_stage_duration_seconds",
+        "Time spent in each stage of rendering a QR code.",
+        labelnames=("stage",),
+    )
+)
+RENDER_JOB_SECONDS = registry.register(
+    Histogram(
+        "qr_render_job_duration_seconds",
+        "Time from submitting a render job to the executor until its result is back, queueing included.",
+    )
+)
+DB_QUERY_SECONDS = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "Time for one database query, by model and operation.",
+        labelnames=("model", "operation"),
+    )
+)
+DB_QUERIES_PER_REQUEST = registry.register(
+    Histogram(
+        "db_queries_per_request",
+        "Number of database queries issued while answering one HTTP request.",
+        buckets=QUERY_COUNT_BUCKETS,
+        labelnames=("route",),
+    )
+)
+
+_stage_timings = threading.local()
+# [query count, query seconds] of the HTTP request being answered, if any.
+request_queries: ContextVar[Optional[List[float]]] = ContextVar(
+    "request_queries", default=None
+)
+
+
+@contextmanager
+def render_stage(stage: str) -> Iterator[None]:
+    """
+    Times a render stage.
+
+    Inside `run_with_stage_timings` (i.e. in a render worker) the timing is
+    collected and shipped back with the job's result; elsewhere it is recorded
+    in RENDER_STAGE_SECONDS directly.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = getattr(_stage_timings, "collected", None)
+        if timings is not None:
+            timings.append((stage, elapsed))
+        else:
+            RENDER_STAGE_SECONDS.observe(elapsed, stage)
+
+
+def run_with_stage_timings(
+    fn: Callable[..., Any], *args: Any
+) -> Tuple[Any, List[Tuple[str, float]]]:
+    """
+    Calls `fn(*args)` and returns its result with the render stages timed during the call.
+
+    Runs in the render workers, whose own metrics are never scraped.
+    """
+    _stage_timings.collected = []
+    try:
+        return fn(*args), _stage_timings.collected
+    finally:
+        _stage_timings.collected = None
+
+
+def record_stage_timings(timings: List[Tuple[str, float]]) -> None:
+    """
+    Records the stage timings returned by `run_with_stage_timings`.
+    """
+    for stage, elapsed in timings:
+        RENDER_STAGE_SECONDS.observe(elapsed, stage)
+
+
+def record_query(model: str, operation: str, elapsed: float) -> None:
+    """
+    Records one database round trip, and counts it towards the HTTP request being answered, if any.
+    """
+    DB_QUERY_SECONDS.observe(elapsed, model, operation)
+    queries = request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+        queries[1] += elapsed
+
+
+def instrument_database(client_class: type, batch_class: type) -> None:
+    """
+    Times every query made through Prisma clients of `client_class`.
+
+    Prisma Client Python sends single operations, raw queries and transactions
+    through the client's `_execute`, but `batch_()` commits send their queries
+    to the engine directly, so `batch_class.commit` is wrapped as well and
+    recorded as one 'batch' operation. Both are private to the pinned prisma
+    version; tests/test_metrics.py fails if they disappear.
+    """
+    execute = client_class._execute
+    if getattr(execute, "instrumented", False):
+        return
+    commit = batch_class.commit
+
+    async def _execute(self, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await execute(self, **kwargs)
+        finally:
+            model = kwargs.get("model")
+            record_query(
+                "" if model is None else model.__name__,
+                str(kwargs.get("method", "")),
+                time.perf_counter() - start,
+            )
+
+    async def _commit(self):
+        start = time.perf_counter()
+        try:
+            return await commit(self)
+        finally:
+            record_query("", "batch", time.perf_counter() - start)
+
+    _execute.instrumented = True
+    client_class._execute = _execute
+    batch_class.commit = _commit
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency and database query count of every HTTP request.
+
+    Requests are labelled with their route template rather than the raw path,
+    which keeps the number of series bounded.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._routes: Dict[Any, str] = {}
+
+    def route_of(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            route = next(
+                (
+                    candidate.path
+                    for candidate in scope["app"].routes
+                    if getattr(candidate, "endpoint", None) is endpoint
+                ),
+                "unmatched",
+            )
+            self._routes[endpoint] = route
+        return route
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        queries = [0, 0.0]
+        token = request_queries.set(queries)
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            request_queries.reset(token)
+            route = self.route_of(scope)
+            HTTP_REQUEST_SECONDS.observe(elapsed, scope["method"], route, str(status))
+            DB_QUERIES_PER_REQUEST.observe(queries[0], route)
@@ -0,0 +1,145 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from project.lazy_import import lazy_import
+from pydantic import BaseModel
+
+# Only needed by logins and password changes; imported during startup warm-up.
+bcrypt = lazy_import("bcrypt")
+
+# bcrypt releases the GIL, so each worker thread keeps one core busy.
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", max(min((os.cpu_count() or 1) // 2, 4), 1))
+)
+PASSWORD_HASH_MAX_PENDING = int(
+    os.getenv("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 16)
+)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+
+
+class PasswordHasherBusyError(Exception):
+    """
+    Raised when more password checks are pending than PASSWORD_HASH_MAX_PENDING.
+    """
+
+
+class PasswordHasherStats(BaseModel):
+    """
+    Load of the password hashing pool.
+    """
+
+    in_flight: int
+    waiting: int
+    workers: int
+    max_pending: int
+    rounds: int
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool so logins never block the event loop.
+
+    At most `workers` hashes run at once; further calls wait their turn, up to
+    `max_pending` in total, after which they are rejected instead of queueing
+    without bound. The pool is separate from the render executor so login
+    storms and QR code rendering do not compete for the same slots.
+    """
+
+    def __init__(self, workers: int, max_pending: int, rounds: int) -> None:
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+        self.rounds = rounds
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._slots = asyncio.Semaphore(workers)
+        self._pending = 0
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Number of hashes currently running.
+        """
+        return min(self._pending, self.workers)
+
+    @property
+    def waiting(self) -> int:
+        """
+        Number of calls queued behind the running hashes.
+        """
+        return max(self._pending - self.workers, 0)
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker threads once the running hashes have finished.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """
+        Checks a plaintext password against a stored bcrypt hash.
+
+        Raises:
+            PasswordHasherBusyError: If too many password checks are already pending.
+        """
+        return await self._run(
+            bcrypt.checkpw, password.encode("utf8"), hashed_password.encode("utf8")
+        )
+
+    async def hash(self, password: str) -> str:
+        """
+        Hashes a plaintext password with the configured cost factor.
+
+        Raises:
+            PasswordHasherBusyError: If too many password checks are already pending.
+        """
+        hashed = await self._run(
+            bcrypt.hashpw, password.encode("utf8"), bcrypt.gensalt(self.rounds)
+        )
+        return hashed.decode("utf8")
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """
+        Tells whether a stored hash was made with a different cost factor than configured.
+        """
+        try:
+            return int(hashed_password.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self) -> PasswordHasherStats:
+        """
+        Returns a snapshot of the pool's load.
+        """
+        return PasswordHasherStats(
+            in_flight=self.in_flight,
+            waiting=self.waiting,
+            workers=self.workers,
+            max_pending=self.max_pending,
+            rounds=self.rounds,
+        )
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            raise PasswordHasherBusyError(
+                "Too many concurrent logins, try again later."
+            )
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hasher"
+            )
+        self._pending += 1
+        try:
+            async with self._slots:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._pool, fn, *args
+                )
+        finally:
+            self._pending -= 1
+
+
+password_hasher = PasswordHasher(
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, BCRYPT_ROUNDS
+)
@@ -0,0 +1,259 @@
+import os
+import random
+import sys
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+
+import prisma.enums
+from project.auth import authenticate, bearer_token
+
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", 0.005))
+PROFILER_MAX_PROFILES = int(os.getenv("PROFILER_MAX_PROFILES", 20))
+PROFILER_MAX_DEPTH = int(os.getenv("PROFILER_MAX_DEPTH", 128))
+# Administrators can profile a single request by sending this header.
+PROFILER_HEADER = b"x-profile"
+SAMPLER_THREAD_NAME = "sampling-profiler"
+
+
+class Profile:
+    """
+    Stack samples aggregated over the requests profiled in one session.
+    """
+
+    def __init__(self, requests: int, sample_percent: float, interval: float) -> None:
+        self.id = uuid.uuid4().hex
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.sample_percent = sample_percent
+        self.interval = interval
+        self.remaining = requests
+        self.requests = 0
+        self.in_flight = 0
+        self.samples = 0
+        self.stacks: Dict[str, int] = {}
+
+    def collapsed(self) -> str:
+        """
+        Renders the samples as collapsed stacks ('root;...;leaf count' per line),
+        the input format of flamegraph.pl, speedscope and similar tools.
+        """
+        return "".join(
+            f"{stack} {count}\n"
+            # The sampling thread may add stacks meanwhile; dict() copies atomically.
+            for stack, count in sorted(
+                dict(self.stacks).items(), key=lambda item: -item[1]
+            )
+        )
+
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse_stack(thread_name: str, frame, max_depth: int) -> str:
+    """
+    Turns a thread's current frame into a 'thread;outermost;...;innermost' stack.
+    """
+    names: List[str] = []
+    while frame is not None and len(names) < max_depth:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads of the process while profiled requests are running.
+
+    A session is armed for the next `requests` requests, each picked with
+    probability `sample_percent`; administrators can also profile a single request
+    with the `X-Profile` header. A sampling thread runs only while at least one
+    picked request is in progress, and every `interval` seconds adds the stack of
+    each thread to every session with a request in progress. Requests are
+    interleaved on the event loop, so a session also sees whatever else ran
+    concurrently; with many requests this averages into where the server spends
+    its time. Render jobs run in worker processes and show up as waits.
+
+    When nothing is armed, the only cost per request is one attribute check and a
+    scan of the request headers for `X-Profile`.
+    """
+
+    def __init__(self, interval: float, max_profiles: int, max_depth: int) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self.armed: Optional[Profile] = None
+        self._finished: Deque[Profile] = deque(maxlen=max_profiles)
+        self._active: List[Profile] = []
+        self._lock = threading.Lock()
+        self._sampling = 0
+        self._stop_sampling: Optional[threading.Event] = None
+
+    def start(self, requests: int, sample_percent: float) -> Profile:
+        """
+        Arms a session profiling the next `requests` requests, finishing the one already armed.
+
+        Raises:
+            ValueError: If `requests` is not positive or `sample_percent` not in (0, 100].
+        """
+        if requests < 1:
+            raise ValueError("requests must be at least 1.")
+        if not 0 < sample_percent <= 100:
+            raise ValueError("sample_percent must be above 0 and at most 100.")
+        self.stop()
+        self.armed = Profile(requests, sample_percent, self.interval)
+        return self.armed
+
+    def stop(self) -> Optional[Profile]:
+        """
+        Finishes the armed session, if any, and returns it.
+        """
+        profile, self.armed = self.armed, None
+        if profile is not None:
+            self._finish(profile)
+        return profile
+
+    def profiles(self) -> List[Profile]:
+        """
+        Returns the armed session and the most recent finished ones, newest first.
+        """
+        armed = [] if self.armed is None else [self.armed]
+        return armed + list(reversed(self._finished))
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return next(
+            (profile for profile in self.profiles() if profile.id == profile_id), None
+        )
+
+    def pick(self) -> Optional[Profile]:
+        """
+        Decides whether the next request belongs to the armed session.
+        """
+        profile = self.armed
+        if profile is None or profile.remaining <= 0:
+            return None
+        if profile.sample_percent < 100 and random.random() * 100 >= (
+            profile.sample_percent
+        ):
+            return None
+        profile.remaining -= 1
+        return profile
+
+    def begin(self, profile: Profile) -> None:
+        """
+        Marks a request of `profile` as running, starting the sampling thread if needed.
+        """
+        with self._lock:
+            profile.requests += 1
+            profile.in_flight += 1
+            if profile.in_flight == 1:
+                self._active.append(profile)
+            self._sampling += 1
+            if self._sampling == 1:
+                self._stop_sampling = threading.Event()
+                threading.Thread(
+                    target=self._sample,
+                    args=(self._stop_sampling,),
+                    name=SAMPLER_THREAD_NAME,
+                    daemon=True,
+                ).start()
+
+    def end(self, profile: Profile) -> None:
+        """
+        Marks a request of `profile` as done, finishing the session once all its requests are.
+        """
+        with self._lock:
+            profile.in_flight -= 1
+            if profile.in_flight == 0:
+                self._active.remove(profile)
+            self._sampling -= 1
+            if self._sampling == 0:
+                self._stop_sampling.set()
+        if profile.in_flight == 0 and profile.remaining <= 0:
+            if profile is self.armed:
+                self.armed = None
+            self._finish(profile)
+
+    def _finish(self, profile: Profile) -> None:
+        if profile.finished_at is None:
+            profile.finished_at = datetime.now(timezone.utc)
+            self._finished.append(profile)
+
+    def _sample(self, stop: threading.Event) -> None:
+        while not stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = [
+                collapse_stack(names.get(ident, str(ident)), frame, self.max_depth)
+                for ident, frame in sys._current_frames().items()
+                # Leave out this thread and one from an earlier burst still winding down.
+                if names.get(ident) != SAMPLER_THREAD_NAME
+            ]
+            with self._lock:
+                for profile in self._active:
+                    profile.samples += 1
+                    for stack in stacks:
+                        profile.stacks[stack] = profile.stacks.get(stack, 0) + 1
+
+
+profiler = SamplingProfiler(
+    PROFILER_INTERVAL, PROFILER_MAX_PROFILES, PROFILER_MAX_DEPTH
+)
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware that runs picked requests under the sampling profiler.
+
+    Profiled responses carry the session id in an `X-Profile-Id` header.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = profiler.pick() if profiler.armed is not None else None
+        if profile is None and any(
+            name == PROFILER_HEADER for name, _ in scope["headers"]
+        ):
+            if await self.is_administrator(scope):
+                profile = Profile(1, 100, profiler.interval)
+                profile.remaining = 0
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_profile_id(message) -> None:
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", []))
+                    + [(b"x-profile-id", profile.id.encode("ascii"))],
+                }
+            await send(message)
+
+        profiler.begin(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.end(profile)
+
+    async def is_administrator(self, scope) -> bool:
+        authorization = next(
+            (
+                value.decode("latin-1")
+                for name, value in scope["headers"]
+                if name == b"authorization"
+            ),
+            None,
+        )
+        token = bearer_token(authorization)
+        user = None if token is None else await authenticate(token)
+        return user is not None and user.role == prisma.enums.Role.ADMINISTRATOR
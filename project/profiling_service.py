@@ -0,0 +1,110 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi.responses import Response
+from project.profiler import Profile, profiler
+from pydantic import BaseModel
+
+
+class ProfileNotFoundError(ValueError):
+    """
+    Raised when no retained profiling session has the requested id.
+    """
+
+
+class ProfileSummary(BaseModel):
+    """
+    Describes a profiling session without its stack samples.
+    """
+
+    id: str
+    started_at: datetime
+    finished_at: Optional[datetime]
+    requests: int
+    remaining_requests: int
+    sample_percent: float
+    samples: int
+    interval: float
+
+
+class ProfileListResponse(BaseModel):
+    """
+    The armed profiling session, if any, followed by the most recent finished ones.
+    """
+
+    profiles: List[ProfileSummary]
+
+
+def summarize(profile: Profile) -> ProfileSummary:
+    return ProfileSummary(
+        id=profile.id,
+        started_at=profile.started_at,
+        finished_at=profile.finished_at,
+        requests=profile.requests,
+        remaining_requests=max(profile.remaining, 0),
+        sample_percent=profile.sample_percent,
+        samples=profile.samples,
+        interval=profile.interval,
+    )
+
+
+def start_profiling(requests: int, sample_percent: float) -> ProfileSummary:
+    """
+    Arms the sampling profiler for the next requests, replacing any armed session.
+
+    Args:
+        requests (int): Number of requests to profile.
+        sample_percent (float): Chance, in percent, that a request is picked.
+
+    Returns:
+        ProfileSummary: The armed session.
+
+    Raises:
+        ValueError: If `requests` is not positive or `sample_percent` not in (0, 100].
+    """
+    return summarize(profiler.start(requests, sample_percent))
+
+
+def stop_profiling() -> ProfileListResponse:
+    """
+    Finishes the armed profiling session early.
+
+    Returns:
+        ProfileListResponse: The finished session, or no sessions if none was armed.
+    """
+    profile = profiler.stop()
+    return ProfileListResponse(profiles=[] if profile is None else [summarize(profile)])
+
+
+def list_profiles() -> ProfileListResponse:
+    """
+    Lists the armed profiling session and the retained finished ones, newest first.
+
+    Returns:
+        ProfileListResponse: Summaries of the sessions.
+    """
+    return ProfileListResponse(
+        profiles=[summarize(profile) for profile in profiler.profiles()]
+    )
+
+
+def get_profile(profile_id: str) -> Response:
+    """
+    Returns the samples of a profiling session as collapsed stacks.
+
+    Each line is a semicolon-separated stack, outermost frame first, and the
+    number of samples it was seen in, ready for flamegraph.pl or speedscope.
+
+    Args:
+        profile_id (str): Id of the session, from the `X-Profile-Id` header or the profile list.
+
+    Returns:
+        Response: The collapsed stacks as text/plain.
+
+    Raises:
+        ProfileNotFoundError: If no retained session has this id.
+    """
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise ProfileNotFoundError("Profile not found.")
+    return Response(content=profile.collapsed(), media_type="text/plain")
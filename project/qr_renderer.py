@@ -0,0 +1,326 @@
+import base64
+import os
+import zlib
+from io import BytesIO
+from typing import List, NamedTuple, Optional
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+import qrcode
+import qrcode.constants
+from PIL import Image, ImageColor
+from project.encoding_planner import plan_encoding
+from project.logo_pipeline import composite_logo, logo_edge, prepare_logo
+from project.matrix_engine import encode_matrix, version_template
+from project.metrics import render_stage
+from project.render_cache import RenderedQRCode, RenderInfo
+
+ERROR_CORRECTION_LEVELS = {
+    "LOW": qrcode.constants.ERROR_CORRECT_L,
+    "MEDIUM": qrcode.constants.ERROR_CORRECT_M,
+    "QUARTILE": qrcode.constants.ERROR_CORRECT_Q,
+    "HIGH": qrcode.constants.ERROR_CORRECT_H,
+}
+
+BORDER = 4
+
+# "numpy" rasterizes the module matrix with array operations, "pil" uses qrcode's image factory.
+QR_RASTER_BACKEND = os.getenv("QR_RASTER_BACKEND", "numpy")
+
+ZLIB_STRATEGIES = {
+    "default": zlib.Z_DEFAULT_STRATEGY,
+    "filtered": zlib.Z_FILTERED,
+    "huffman": zlib.Z_HUFFMAN_ONLY,
+    "rle": zlib.Z_RLE,
+    "fixed": zlib.Z_FIXED,
+}
+
+
+class PngEncoding(NamedTuple):
+    """
+    zlib settings used when encoding a PNG: compression level (0-9) and strategy name.
+    """
+
+    compress_level: int
+    strategy: str
+
+
+# Interactive renders favour encode speed, batch renders favour output size.
+PNG_ENCODING_PROFILES = {
+    "interactive": PngEncoding(
+        int(os.getenv("PNG_COMPRESS_LEVEL_INTERACTIVE", 6)),
+        os.getenv("PNG_COMPRESS_STRATEGY_INTERACTIVE", "default"),
+    ),
+    "batch": PngEncoding(
+        int(os.getenv("PNG_COMPRESS_LEVEL_BATCH", 9)),
+        os.getenv("PNG_COMPRESS_STRATEGY_BATCH", "default"),
+    ),
+}
+
+
+def build_qr(
+    data: str, data_type: str, size: int, error_correction: str
+) -> qrcode.QRCode:
+    """
+    Encodes the data and builds the module matrix with qrcode itself.
+
+    The encoding planner picks the smallest version for the error correction
+    level and splits the data into optimal numeric/alphanumeric/byte segments.
+    The chosen mask pattern is recorded on the returned object. Renders go
+    through the matrix engine instead; this is used by the 'pil' raster backend
+    and as the reference the engine is benchmarked against.
+
+    Args:
+        data (str): The data to be encoded in the QR code.
+        data_type (str): Name of the data type, e.g. 'URL' or 'CSV'.
+        size (int): Desired size of the QR code, in pixels.
+        error_correction (str): Name of the error correction level, e.g. 'LOW' or 'HIGH'.
+
+    Returns:
+        qrcode.QRCode: The QR code with its module matrix computed.
+    """
+    level = ERROR_CORRECTION_LEVELS[error_correction]
+    plan = plan_encoding(data, data_type, level)
+    qr = qrcode.QRCode(
+        version=plan.version,
+        error_correction=level,
+        box_size=box_size_for(size),
+        border=BORDER,
+    )
+    for chunk in plan.qr_data():
+        qr.add_data(chunk)
+    qr.mask_pattern = qr.best_mask_pattern()
+    qr.make(fit=False)
+    return qr
+
+
+def box_size_for(size: int) -> int:
+    """
+    Edge length of one module, in pixels, for the requested QR code size.
+    """
+    return max(size // 10, 1)
+
+
+def render_png(
+    data: str,
+    data_type: str,
+    size: int,
+    color: str,
+    error_correction: str,
+    profile: str = "interactive",
+    logo: Optional[bytes] = None,
+) -> RenderedQRCode:
+    """
+    Builds the QR code matrix for the given data and encodes it as a PNG image.
+
+    Only plain values are accepted so the call can be shipped to another process.
+    With a logo the palette grows past two colors and the PNG is encoded at 8 bits.
+
+    Args:
+        data (str): The data to be encoded in the QR code.
+        data_type (str): Name of the data type, e.g. 'URL' or 'CSV'.
+        size (int): Desired size of the QR code, in pixels.
+        color (str): Hex code (or color name) for the QR code's modules.
+        error_correction (str): Name of the error correction level, e.g. 'LOW' or 'HIGH'.
+        profile (str): Name of the PNG encoding profile, 'interactive' or 'batch'.
+        logo (Optional[bytes]): Encoded logo image to place in the center, if any.
+
+    Returns:
+        RenderedQRCode: The encoded PNG image with the chosen version and mask pattern.
+    """
+    box_size = box_size_for(size)
+    if QR_RASTER_BACKEND == "numpy":
+        matrix = encode_matrix(
+            data, data_type, ERROR_CORRECTION_LEVELS[error_correction]
+        )
+        with render_stage("rasterize"):
+            img = rasterize_modules(matrix.modules, box_size, color)
+        info = matrix.info
+    else:
+        with render_stage("matrix"):
+            qr = build_qr(data, data_type, size, error_correction)
+        with render_stage("rasterize"):
+            img = qr.make_image(fill_color=color, back_color="white").get_image()
+        info = render_info(qr)
+    if logo is not None:
+        with render_stage("logo"):
+            symbol_pixels = img.width - 2 * BORDER * box_size
+            img = composite_logo(
+                img, prepare_logo(logo, logo_edge(symbol_pixels, box_size))
+            )
+    with render_stage("png"):
+        content = encode_png(
+            img, PNG_ENCODING_PROFILES[profile], bits=1 if logo is None else 8
+        )
+    return RenderedQRCode(content, info)
+
+
+def encode_png(img: Image.Image, encoding: PngEncoding, bits: int = 1) -> bytes:
+    """
+    Encodes a two color image as a 1-bit palette PNG.
+
+    Images that are not already in palette mode are reduced to a two entry
+    palette first, so the pixel data is 1/24th of an RGB encoding before zlib
+    even starts.
+
+    Args:
+        img (Image.Image): The rasterized QR code.
+        encoding (PngEncoding): zlib compression level and strategy to use.
+        bits (int): Bits per pixel; 8 for images with a logo in their palette.
+
+    Returns:
+        bytes: The encoded PNG image.
+    """
+    if img.mode != "P":
+        img = img.convert("P", palette=Image.Palette.ADAPTIVE, colors=2)
+    buffer = BytesIO()
+    img.save(
+        buffer,
+        format="PNG",
+        bits=bits,
+        compress_level=encoding.compress_level,
+        compress_type=ZLIB_STRATEGIES[encoding.strategy],
+    )
+    return buffer.getvalue()
+
+
+def rasterize_modules(
+    modules: List[List[bool]], box_size: int, color: str
+) -> Image.Image:
+    """
+    Turns the module matrix into a palette image in a few vectorized operations.
+
+    The boolean matrix becomes a uint8 array of palette indices (0 = white
+    background, 1 = module color), gets the quiet zone added with `np.pad` and is
+    scaled up to the box size with `np.repeat`, which is equivalent to
+    `np.kron(matrix, np.ones((box_size, box_size)))` but avoids the multiplication.
+    Pillow receives the finished buffer and only has to attach the palette.
+
+    Args:
+        modules (List[List[bool]]): The QR code module matrix, True for dark modules.
+        box_size (int): Edge length of one module, in pixels.
+        color (str): Hex code (or color name) for the QR code's modules.
+
+    Returns:
+        Image.Image: A 'P' mode image with a two entry palette.
+    """
+    matrix = np.pad(np.asarray(modules, dtype=np.uint8), BORDER)
+    pixels = np.repeat(np.repeat(matrix, box_size, axis=0), box_size, axis=1)
+    img = Image.fromarray(pixels, mode="P")
+    img.putpalette((255, 255, 255) + ImageColor.getrgb(color)[:3])
+    return img
+
+
+def render_svg(
+    data: str,
+    data_type: str,
+    size: int,
+    color: str,
+    error_correction: str,
+    logo: Optional[bytes] = None,
+) -> RenderedQRCode:
+    """
+    Builds the QR code matrix for the given data and emits it as an SVG document.
+
+    Dark modules are run-length merged per row into rectangles that all live in
+    a single `<path>`, so the document size grows with the number of runs rather
+    than the number of modules. The drawing is in module units and scaled by the
+    `width`/`height` attributes, which match the pixel size of the PNG output.
+    A logo is embedded as a PNG `<image>` at the same place and scale as in
+    the PNG output.
+
+    Args:
+        data (str): The data to be encoded in the QR code.
+        data_type (str): Name of the data type, e.g. 'URL' or 'CSV'.
+        size (int): Desired size of the QR code, in pixels.
+        color (str): Hex code (or color name) for the QR code's modules.
+        error_correction (str): Name of the error correction level, e.g. 'LOW' or 'HIGH'.
+        logo (Optional[bytes]): Encoded logo image to place in the center, if any.
+
+    Returns:
+        RenderedQRCode: The UTF-8 encoded SVG document with the chosen version and mask pattern.
+    """
+    matrix = encode_matrix(data, data_type, ERROR_CORRECTION_LEVELS[error_correction])
+    with render_stage("svg"):
+        modules_count = matrix.modules.shape[0]
+        dimension = modules_count + 2 * BORDER
+        box_size = box_size_for(size)
+        pixels = dimension * box_size
+        # Dark runs start where a row steps from light to dark and end where it steps back.
+        steps = np.diff(
+            np.pad(matrix.modules, ((0, 0), (1, 1))).astype(np.int8), axis=1
+        )
+        starts = np.argwhere(steps == 1)
+        ends = np.argwhere(steps == -1)
+        commands = [
+            f"M{x + BORDER} {y + BORDER}h{end - x}v1h-{end - x}z"
+            for (y, x), (_, end) in zip(starts.tolist(), ends.tolist())
+        ]
+        svg = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+            f'viewBox="0 0 {dimension} {dimension}" shape-rendering="crispEdges">'
+            f'<rect width="{dimension}" height="{dimension}" fill="white"/>'
+            f'<path fill={quoteattr(color)} d="{"".join(commands)}"/>'
+        )
+        if logo is not None:
+            variant = prepare_logo(logo, logo_edge(modules_count * box_size, box_size))
+            width = variant.indices.width / box_size
+            height = variant.indices.height / box_size
+            svg += (
+                f'<image x="{(dimension - width) / 2:g}" y="{(dimension - height) / 2:g}" '
+                f'width="{width:g}" height="{height:g}" '
+                f'href="data:image/png;base64,{base64.b64encode(variant.png).decode("ascii")}"/>'
+            )
+        svg += "</svg>"
+    return RenderedQRCode(svg.encode("utf8"), matrix.info)
+
+
+MEDIA_TYPES = {
+    "PNG": "image/png",
+    "SVG": "image/svg+xml",
+}
+
+
+def render_info(qr: qrcode.QRCode) -> RenderInfo:
+    """
+    Extracts the version and mask pattern chosen while building the matrix.
+    """
+    return RenderInfo(qr.version, qr.mask_pattern)
+
+
+def render_qr_code(
+    data: str,
+    data_type: str,
+    size: int,
+    color: str,
+    error_correction: str,
+    image_format: str,
+    profile: str = "interactive",
+    logo: Optional[bytes] = None,
+) -> RenderedQRCode:
+    """
+    Renders the QR code in the requested output format ('PNG' or 'SVG').
+
+    The encoding profile only affects PNG output.
+    """
+    if image_format == "SVG":
+        return render_svg(data, data_type, size, color, error_correction, logo)
+    return render_png(data, data_type, size, color, error_correction, profile, logo)
+
+
+def warm_up() -> None:
+    """
+    Prepares a render worker before it takes jobs.
+
+    Builds the cached template of every QR version and renders one small code
+    per error correction level, as PNG and SVG, so that imports, templates and
+    encoders are ready and the first real requests do not pay for them.
+    Rendering a code of every version would add seconds per worker without
+    warming anything more: beyond the template, large versions are only slower
+    to encode.
+    """
+    for version in range(1, 41):
+        version_template(version)
+    for error_correction in ERROR_CORRECTION_LEVELS:
+        render_png("warm-up", "TEXT", 100, "#000000", error_correction)
+    render_svg("warm-up", "TEXT", 100, "#000000", "MEDIUM", None)
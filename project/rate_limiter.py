@@ -0,0 +1,214 @@
+import json
+import logging
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from project.auth import authenticate, bearer_token, is_jwt
+from project.token_cache import token_cache
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+# Number of reverse proxies in front of the server that append to X-Forwarded-For.
+# 0 uses the connection's peer address, which behind a proxy is the proxy's.
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", 0))
+
+
+class RateLimit(NamedTuple):
+    """
+    Token bucket parameters: sustained requests per second and the burst allowed on top.
+    """
+
+    rate: float
+    burst: float
+
+
+def rate_limit_from_env(name: str, rate: float, burst: float) -> RateLimit:
+    return RateLimit(
+        float(os.getenv(f"RATE_LIMIT_{name}_RATE", rate)),
+        float(os.getenv(f"RATE_LIMIT_{name}_BURST", burst)),
+    )
+
+
+# Keyed by the Role values of schema.prisma; ANONYMOUS applies per client address,
+# as does AUTHENTICATION to requests whose API key has to be looked up in the database.
+RATE_LIMITS: Dict[str, RateLimit] = {
+    "ANONYMOUS": rate_limit_from_env("ANONYMOUS", 2, 10),
+    "AUTHENTICATION": rate_limit_from_env("AUTHENTICATION", 5, 20),
+    "GENERALUSER": rate_limit_from_env("GENERALUSER", 5, 20),
+    "PREMIUMUSER": rate_limit_from_env("PREMIUMUSER", 20, 80),
+    "ADMINISTRATOR": rate_limit_from_env("ADMINISTRATOR", 100, 400),
+}
+
+
+class RateLimitBackend(ABC):
+    """
+    Storage for token buckets. Implementations shared between server processes
+    (e.g. backed by Redis) let several workers enforce one limit per client.
+    """
+
+    name: str
+
+    @abstractmethod
+    async def consume(self, key: str, limit: RateLimit, cost: float = 1) -> float:
+        """
+        Takes `cost` tokens from the bucket stored under `key`, refilling it first.
+
+        Returns:
+            float: 0 if the request is allowed, otherwise the seconds until it would be.
+        """
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets held in this process, in an LRU bounded to `max_keys` buckets.
+
+    Each call is a dictionary lookup and a little arithmetic. Evicting an idle
+    bucket is harmless: it would have refilled to full anyway. Only used from the
+    event loop, so no locking is needed.
+    """
+
+    name = "local"
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, Tuple[float, float]] = OrderedDict()
+
+    async def consume(self, key: str, limit: RateLimit, cost: float = 1) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated_at) * limit.rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / limit.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+def create_backend(name: str) -> RateLimitBackend:
+    """
+    Instantiates the rate limit backend configured by RATE_LIMIT_BACKEND.
+    """
+    if name == "local":
+        return LocalRateLimitBackend(RATE_LIMIT_MAX_KEYS)
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+
+rate_limit_backend = create_backend(RATE_LIMIT_BACKEND)
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware that applies a token bucket per user (or per client address for
+    unauthenticated requests) before the request reaches any endpoint.
+
+    Requests with a valid bearer token are limited by the user's role; everything
+    else shares the ANONYMOUS limit of its client address. API keys that are not
+    cached yet are first charged to the AUTHENTICATION limit of the client
+    address, so a flood of made-up keys cannot turn into as many database
+    lookups. Rejected requests get a 429 with a `Retry-After` header.
+
+    The client address is the connection's peer unless `trusted_proxies` is set,
+    in which case it is taken from that many entries from the end of
+    X-Forwarded-For. Only set it when every request passes through that many
+    proxies that append to the header, or clients can pick their own address.
+    """
+
+    def __init__(
+        self,
+        app,
+        backend: Optional[RateLimitBackend] = None,
+        limits: Optional[Dict[str, RateLimit]] = None,
+        trusted_proxies: Optional[int] = None,
+    ) -> None:
+        self.app = app
+        self.backend = backend or rate_limit_backend
+        self.limits = limits or RATE_LIMITS
+        self.trusted_proxies = (
+            RATE_LIMIT_TRUSTED_PROXIES if trusted_proxies is None else trusted_proxies
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        address = self.client_address(scope)
+        token = bearer_token(self.header(scope, b"authorization"))
+        if token is not None and not is_jwt(token) and not token_cache.is_cached(token):
+            wait = await self.backend.consume(
+                f"auth:{address}", self.limits["AUTHENTICATION"]
+            )
+            if wait > 0:
+                await self.reject(send, wait)
+                return
+        key, limit = await self.bucket_for(token, address)
+        wait = await self.backend.consume(key, limit)
+        if wait > 0:
+            await self.reject(send, wait)
+            return
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def header(scope, name: bytes) -> Optional[str]:
+        """
+        Returns all values of a request header joined by commas, or None if it is absent.
+        """
+        values = [
+            value.decode("latin-1") for key, value in scope["headers"] if key == name
+        ]
+        return ",".join(values) if values else None
+
+    def client_address(self, scope) -> str:
+        """
+        Returns the address of the client, looking past `trusted_proxies` proxies.
+        """
+        if self.trusted_proxies > 0:
+            forwarded_for = self.header(scope, b"x-forwarded-for")
+            if forwarded_for is not None:
+                hops = [hop.strip() for hop in forwarded_for.split(",")]
+                if len(hops) >= self.trusted_proxies and hops[-self.trusted_proxies]:
+                    return hops[-self.trusted_proxies]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def bucket_for(
+        self, token: Optional[str], address: str
+    ) -> Tuple[str, RateLimit]:
+        """
+        Picks the bucket key and limit for a request from its bearer token or client address.
+        """
+        user = None
+        if token is not None:
+            try:
+                user = await authenticate(token)
+            except Exception:
+                # Fall back to the client address rather than failing every request
+                # while the database is unreachable.
+                logger.exception("Authenticating a request for rate limiting failed")
+        if user is not None:
+            return f"user:{user.user_id}", self.limits[user.role.value]
+        return f"ip:{address}", self.limits["ANONYMOUS"]
+
+    async def reject(self, send, wait: float) -> None:
+        body = json.dumps({"error": "Rate limit exceeded."}).encode("utf8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                    (b"retry-after", str(math.ceil(wait)).encode("latin-1")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from project.storage import (
+    STORAGE_BACKEND,
+    StorageBackend,
+    create_backend,
+    sharded_name,
+)
+from pydantic import BaseModel
+
+# Bumped whenever the renderer output changes so stale disk entries are not served.
+RENDER_VERSION = 2
+
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "qrcodes")
+
+
+class RenderCacheStats(BaseModel):
+    """
+    Counters describing the effectiveness and footprint of the render cache.
+    """
+
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    evictions: int
+    deduplicated: int
+    entries: int
+    current_bytes: int
+    max_bytes: int
+
+
+def render_key(**params) -> str:
+    """
+    Derives the content address of a rendered QR code from its render parameters.
+
+    Parameters are normalized (enum values unwrapped, colors lower-cased) and
+    serialized with sorted keys so equivalent requests share one cache entry.
+
+    Returns:
+        str: Hex encoded SHA-256 digest identifying the rendered image.
+    """
+    normalized = {"render_version": RENDER_VERSION}
+    for name, value in params.items():
+        if hasattr(value, "value"):
+            value = value.value
+        if name == "color" and isinstance(value, str):
+            value = value.strip().lower()
+        normalized[name] = value
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf8")).hexdigest()
+
+
+class RenderInfo(NamedTuple):
+    """
+    Encoding parameters chosen for a rendered QR code: the symbol version and mask pattern.
+    """
+
+    version: int
+    mask_pattern: int
+
+
+class RenderedQRCode(NamedTuple):
+    """
+    An encoded QR code image together with the encoding parameters chosen for it.
+    """
+
+    content: bytes
+    info: RenderInfo
+
+
+class StoredRender(NamedTuple):
+    """
+    A render in the storage tier: the name and size of its image in storage and its encoding parameters.
+    """
+
+    image: str
+    size: int
+    info: RenderInfo
+
+
+def manifest_name(key: str) -> str:
+    return f"renders/{sharded_name(key, '.json')}"
+
+
+def image_name(content: bytes, extension: str) -> str:
+    return f"images/{sharded_name(hashlib.sha256(content).hexdigest(), extension)}"
+
+
+class RenderCache:
+    """
+    Two tier cache of rendered images: a byte-bounded in-memory LRU backed by a storage backend.
+
+    In storage, images are named by the hash of their content and a small JSON
+    manifest per render key holds the image name and its RenderInfo. Renders
+    whose parameters differ but whose bytes do not (e.g. 'black' and '#000000')
+    share one image. Both live in sharded directories, see `sharded_name`.
+    """
+
+    def __init__(self, max_bytes: int, storage: StorageBackend) -> None:
+        self.max_bytes = max_bytes
+        self.storage = storage
+        self._entries: OrderedDict[str, RenderedQRCode] = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._deduplicated = 0
+
+    async def get(self, key: str) -> Optional[RenderedQRCode]:
+        """
+        Looks an entry up in memory first, then in storage, promoting storage hits into memory.
+
+        Args:
+            key (str): Content address from `render_key`, plus a file extension.
+
+        Returns:
+            Optional[RenderedQRCode]: The cached render, or None if neither tier holds it.
+        """
+        with self._lock:
+            rendered = self._entries.get(key)
+            if rendered is not None:
+                self._entries.move_to_end(key)
+                self._memory_hits += 1
+                return rendered
+        stored = await self._read_manifest(key)
+        content = None
+        if stored is not None:
+            content = await self.storage.read(stored.image)
+        if content is None:
+            with self._lock:
+                self._misses += 1
+            return None
+        rendered = RenderedQRCode(content, stored.info)
+        with self._lock:
+            self._disk_hits += 1
+            self._remember(key, rendered)
+        return rendered
+
+    async def stored(self, key: str) -> Optional[StoredRender]:
+        """
+        Checks whether the storage tier holds the key, without reading the image.
+
+        Returns:
+            Optional[StoredRender]: The stored image and its encoding parameters,
+                or None if the entry or its image is not in storage.
+        """
+        stored = await self._read_manifest(key)
+        if stored is None or await self.storage.size(stored.image) is None:
+            return None
+        with self._lock:
+            self._disk_hits += 1
+        return stored
+
+    async def put(
+        self,
+        key: str,
+        rendered: RenderedQRCode,
+        memory: bool = True,
+        disk: bool = True,
+    ) -> Optional[StoredRender]:
+        """
+        Stores a freshly rendered image in storage and in memory, unless either tier is disabled.
+
+        The image is only written if storage does not hold the same bytes yet, and
+        always before the manifest, so a manifest never points at a missing image.
+
+        Args:
+            key (str): Content address from `render_key`, plus a file extension.
+            rendered (RenderedQRCode): The encoded image and its encoding parameters.
+            memory (bool): Whether to keep the entry in the in-memory tier. Bulk
+                renders pass False so they do not evict interactive hot entries.
+            disk (bool): Whether to write the entry to the storage tier. Images that
+                are returned inline pass False to keep storage off the hot path.
+
+        Returns:
+            Optional[StoredRender]: Where the image was stored, or None if `disk` is False.
+        """
+        stored = None
+        if disk:
+            stored = StoredRender(
+                image_name(rendered.content, os.path.splitext(key)[1]),
+                len(rendered.content),
+                rendered.info,
+            )
+            if await self.storage.size(stored.image) is None:
+                await self.storage.write(stored.image, rendered.content)
+            else:
+                with self._lock:
+                    self._deduplicated += 1
+            manifest = {
+                "image": stored.image,
+                "size": stored.size,
+                **rendered.info._asdict(),
+            }
+            await self.storage.write(
+                manifest_name(key), json.dumps(manifest).encode("utf8")
+            )
+        if memory:
+            with self._lock:
+                self._remember(key, rendered)
+        return stored
+
+    def stats(self) -> RenderCacheStats:
+        """
+        Returns a snapshot of the hit, miss and eviction counters.
+        """
+        with self._lock:
+            return RenderCacheStats(
+                memory_hits=self._memory_hits,
+                disk_hits=self._disk_hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                deduplicated=self._deduplicated,
+                entries=len(self._entries),
+                current_bytes=self._current_bytes,
+                max_bytes=self.max_bytes,
+            )
+
+    async def _read_manifest(self, key: str) -> Optional[StoredRender]:
+        content = await self.storage.read(manifest_name(key))
+        if content is None:
+            return None
+        try:
+            manifest = json.loads(content)
+            return StoredRender(
+                manifest.pop("image"), manifest.pop("size"), RenderInfo(**manifest)
+            )
+        except (ValueError, TypeError, KeyError):
+            return None
+
+    def _remember(self, key: str, rendered: RenderedQRCode) -> None:
+        # Callers hold self._lock.
+        size = len(rendered.content)
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._current_bytes -= len(previous.content)
+        self._entries[key] = rendered
+        self._current_bytes += size
+        while self._current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._current_bytes -= len(evicted.content)
+            self._evictions += 1
+
+
+render_cache = RenderCache(
+    RENDER_CACHE_MAX_BYTES, create_backend(STORAGE_BACKEND, RENDER_CACHE_DIR)
+)
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from project.lazy_import import lazy_import
+from project.metrics import (
+    RENDER_JOB_SECONDS,
+    record_stage_timings,
+    run_with_stage_timings,
+)
+
+logger = logging.getLogger(__name__)
+
+RENDER_EXECUTOR = os.getenv("RENDER_EXECUTOR", "process")
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", os.cpu_count() or 1))
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", RENDER_WORKERS * 4))
+# "1" warms every worker up (see qr_renderer.warm_up) before it takes jobs.
+RENDER_PREWARM = os.getenv("RENDER_PREWARM", "1") == "1"
+
+qr_renderer = lazy_import("project.qr_renderer")
+
+
+def warm_up_worker() -> None:
+    """
+    Initializer of the worker pool.
+    """
+    qr_renderer.warm_up()
+
+
+class RenderQueueFullError(Exception):
+    """
+    Raised when the rendering executor has no free slot for an interactive request.
+    """
+
+
+class RenderExecutor:
+    """
+    Runs CPU-bound rendering off the event loop with a bounded number of in-flight jobs.
+
+    A process pool sized to the available cores is used by default; if process
+    pools are unavailable (or `RENDER_EXECUTOR=thread`), a thread pool is used.
+    With `prewarm`, each worker warms up before its first job.
+    """
+
+    def __init__(self, kind: str, workers: int, queue_size: int, prewarm: bool) -> None:
+        self.kind = kind
+        self.workers = workers
+        self.prewarm = prewarm
+        self.queue_size = max(queue_size, workers)
+        self._pool: Optional[Executor] = None
+        self._slots = asyncio.Semaphore(self.queue_size)
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Number of jobs currently queued or running in the pool.
+        """
+        return self._in_flight
+
+    def start(self) -> None:
+        """
+        Creates the worker pool, falling back to threads if processes cannot be spawned.
+        """
+        if self._pool is not None:
+            return
+        initializer = warm_up_worker if self.prewarm else None
+        if self.kind == "process":
+            try:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=initializer,
+                )
+                return
+            except (OSError, NotImplementedError, ImportError):
+                logger.warning(
+                    "Process pool unavailable, falling back to thread pool for rendering",
+                    exc_info=True,
+                )
+                self.kind = "thread"
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="render",
+            initializer=initializer,
+        )
+
+    async def warm_up(self) -> None:
+        """
+        Starts all workers and waits until they have warmed up.
+
+        Pools only start workers when jobs arrive; submitting one job per worker
+        while none is idle makes the pool start all of them at once. Workers run
+        the warm-up initializer before their first job, so by the time the jobs
+        are done all workers have warmed up, unless a fast one took two jobs
+        while another was still warming up.
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self._pool, os.getpid) for _ in range(self.workers))
+        )
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker pool, cancelling jobs that have not started yet.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def _discard(self, pool: Executor) -> None:
+        # Every job of a broken pool fails at once; only the first one replaces it.
+        if self._pool is not pool:
+            return
+        logger.exception("Render worker died, restarting the pool")
+        self._pool = None
+        # Without waiting: the event loop must not block on the dead workers.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, wait: bool = False) -> Any:
+        """
+        Executes `fn(*args)` in the worker pool.
+
+        The render stages timed in the worker come back with the result and are
+        recorded in the metrics of this process.
+
+        Args:
+            fn (Callable): A module level (picklable) function.
+            *args: Plain, picklable arguments for `fn`.
+            wait (bool): Wait for a free slot instead of failing fast. Background
+                work such as batch processing sets this; interactive requests do not.
+
+        Returns:
+            Any: The return value of `fn`.
+
+        Raises:
+            RenderQueueFullError: If `wait` is False and every slot is taken.
+        """
+        if not wait and self._slots.locked():
+            raise RenderQueueFullError("Rendering capacity exhausted, retry shortly.")
+        async with self._slots:
+            self.start()
+            pool = self._pool
+            self._in_flight += 1
+            start = time.perf_counter()
+            try:
+                (
+                    result,
+                    stage_timings,
+                ) = await asyncio.get_running_loop().run_in_executor(
+                    pool, run_with_stage_timings, fn, *args
+                )
+                RENDER_JOB_SECONDS.observe(time.perf_counter() - start)
+                record_stage_timings(stage_timings)
+                return result
+            except BrokenProcessPool:
+                self._discard(pool)
+                raise
+            finally:
+                self._in_flight -= 1
+
+
+render_executor = RenderExecutor(
+    RENDER_EXECUTOR, RENDER_WORKERS, RENDER_QUEUE_SIZE, RENDER_PREWARM
+)
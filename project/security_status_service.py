@@ -1,5 +1,6 @@
 from typing import List
 
+import project.rate_limiter
 from pydantic import BaseModel
 
 
@@ -24,7 +25,14 @@ async def security_status() -> SecurityStatusResponse:
         SecurityStatusResponse: Provides a summary of the system's security status, including encryption status, API security measures, and compliance with data protection standards.
     """
     encryption_status = "Active and Configured"
-    api_security = "Rate limiting and token validation in place"
+    limits = ", ".join(
+        f"{role} {limit.rate:g}/s (burst {limit.burst:g})"
+        for role, limit in project.rate_limiter.RATE_LIMITS.items()
+    )
+    api_security = (
+        f"Token bucket rate limiting per user ({project.rate_limiter.rate_limit_backend.name} backend: {limits}); "
+        "bearer tokens validated as signed JWTs with revocation checks or API keys"
+    )
     compliance_status = "Compliant with GDPR and other standards"
     detected_issues = ["Example Issue: API Key unused for over a year"]
     return SecurityStatusResponse(
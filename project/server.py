@@ -3,30 +3,60 @@ from contextlib import asynccontextmanager
 from typing import List, Optional
 
 import project.api_documentation_service
+import project.auth
+import project.batch_worker
 import project.check_permission_service
 import project.create_batch_request_service
 import project.customize_qr_code_service
+import project.download_batch_service
 import project.generate_qr_code_service
+import project.get_batch_status_service
+import project.get_metrics_service
+import project.get_password_hasher_stats_service
+import project.get_readiness_service
+import project.get_render_cache_stats_service
 import project.get_system_logs_service
 import project.get_user_preferences_service
 import project.login_service
 import project.logout_service
+import project.metrics
+import project.password_hasher
+import project.profiler
+import project.profiling_service
+import project.rate_limiter
+import project.render_executor
 import project.security_status_service
+import project.startup
+import project.system_log
+import project.token_revocation
 import project.update_user_preferences_service
-from fastapi import FastAPI
+import project.user_preferences
+from fastapi import Depends, FastAPI, Header
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import Response
-from prisma import Prisma
+from fastapi.responses import JSONResponse, Response
+from prisma import Batch, Prisma
 
 logger = logging.getLogger(__name__)
 
+project.metrics.instrument_database(Prisma, Batch)
 db_client = Prisma(auto_register=True)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await db_client.connect()
+    project.system_log.system_log_handler.start(logging.getLogger("project"))
+    project.render_executor.render_executor.start()
+    project.batch_worker.batch_worker.start()
+    project.token_revocation.revocation_list.start()
+    project.startup.startup_warm_up.start(db_client)
     yield
+    await project.startup.startup_warm_up.stop()
+    await project.token_revocation.revocation_list.stop()
+    await project.batch_worker.batch_worker.stop()
+    project.render_executor.render_executor.shutdown()
+    project.password_hasher.password_hasher.shutdown()
+    await project.system_log.system_log_handler.stop(logging.getLogger("project"))
     await db_client.disconnect()
 
 
@@ -36,6 +66,13 @@ app = FastAPI(
     description="The project focuses on developing an endpoint that primarily receives various types of data, including URLs, text, and contact information, to generate QR codes. Key features of the endpoint include: \n\n1. **Data Handling:** The endpoint is adept at processing different data formats, with a particular emphasis on text inputs, which are the primary type of data it will handle. This capability ensures versatility in the QR codes' applications, enabling users to encode a wide range of information.\n\n2. **Customization:** Users have specific customization requirements for the QR codes, emphasizing the need for distinctive branding elements. The desired customizations include the ability to alter the QR code's color to match the brand identity and the incorporation of a logo within the QR code. This customization extends to modifying the QR code's size to ensure it remains easily scannable from standard distances.\n\n3. **Output Formats:** The preferred format for the generated QR codes is PNG. This choice reflects a balance between wide compatibility across platforms and the quality of the image suitable for various display sizes.\n\n4. **Technical Approach:** The project will leverage Python as the programming language of choice, given its rich ecosystem for image processing and web development. For generating and customizing QR codes, exploration in the `qrcode` library has provided a solid foundation, highlighting capabilities such as basic QR code generation, color customization, and integration of logos. Further customization options have been identified, including altering shapes and patterns within the QR code for aesthetic and functional purposes.\n\n5. **API and Database Design:** FastAPI is selected as the API framework for its performance and ease of use in creating web applications with Python. PostgreSQL will serve as the database solution, ensuring robust data management capabilities for storing information related to the QR codes, such as creation parameters and user data. The ORM of choice will be Prisma, which offers a powerful and easy-to-use interface for connecting the application's Python code with the PostgreSQL database.\n\nThis project summary encapsulates the task requirements and the chosen tech stack for the development of a feature-rich, customizable QR code generation endpoint.",
 )
 
+# Added before the rate limiter so that it runs inside it: X-Profile requests
+# are limited before the profiler authenticates them.
+app.add_middleware(project.profiler.ProfilerMiddleware)
+app.add_middleware(project.rate_limiter.RateLimitMiddleware)
+# Added last so it runs first and also times requests rejected by the rate limiter.
+app.add_middleware(project.metrics.MetricsMiddleware)
+
 
 @app.post(
     "/generate", response_model=project.generate_qr_code_service.GenerateQRCodeResponse
@@ -43,26 +80,302 @@ app = FastAPI(
 async def api_post_generate_qr_code(
     data: str,
     data_type: project.generate_qr_code_service.DataType,
-    size: int,
-    color: str,
-    error_correction: project.generate_qr_code_service.ErrorCorrection,
+    size: Optional[int] = None,
+    color: Optional[str] = None,
+    error_correction: Optional[project.generate_qr_code_service.ErrorCorrection] = None,
+    format: project.generate_qr_code_service.Format = project.generate_qr_code_service.Format.PNG,
+    logo: Optional[str] = None,
+    user: Optional[project.auth.AuthenticatedUser] = Depends(project.auth.optional_user),
 ) -> project.generate_qr_code_service.GenerateQRCodeResponse | Response:
     """
     Receives data in supported formats and generates a QR code.
     """
     try:
-        res = project.generate_qr_code_service.generate_qr_code(
-            data, data_type, size, color, error_correction
+        res = await project.generate_qr_code_service.generate_qr_code(
+            data,
+            data_type,
+            size,
+            color,
+            error_correction,
+            format,
+            logo,
+            None if user is None else user.user_id,
+        )
+        return res
+    except project.render_executor.RenderQueueFullError as e:
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=503,
+            headers={"Retry-After": "1"},
+        )
+    except project.user_preferences.InvalidOptionError as e:
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=400,
+        )
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=500,
+        )
+
+
+@app.get("/generate")
+async def api_get_generate_qr_code_image(
+    data: str,
+    data_type: project.generate_qr_code_service.DataType,
+    size: Optional[int] = None,
+    color: Optional[str] = None,
+    error_correction: Optional[project.generate_qr_code_service.ErrorCorrection] = None,
+    format: project.generate_qr_code_service.Format = project.generate_qr_code_service.Format.PNG,
+    logo: Optional[str] = None,
+    user: Optional[project.auth.AuthenticatedUser] = Depends(project.auth.optional_user),
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
+    """
+    Generates a QR code and returns the image bytes, with ETag-based conditional GET support.
+    """
+    try:
+        res = await project.generate_qr_code_service.generate_qr_code_image(
+            data,
+            data_type,
+            size,
+            color,
+            error_correction,
+            format,
+            if_none_match,
+            logo,
+            None if user is None else user.user_id,
         )
         return res
+    except project.render_executor.RenderQueueFullError as e:
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=503,
+            headers={"Retry-After": "1"},
+        )
+    except project.user_preferences.InvalidOptionError as e:
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=400,
+        )
     except Exception as e:
         logger.exception("Error processing request")
         res = dict()
         res["error"] = str(e)
-        return Response(
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=500,
+        )
+
+
+@app.get(
+    "/cache/stats",
+    response_model=project.get_render_cache_stats_service.RenderCacheStats,
+)
+async def api_get_render_cache_stats(
+    user: project.auth.AuthenticatedUser = Depends(project.auth.current_administrator),
+) -> project.get_render_cache_stats_service.RenderCacheStats | Response:
+    """
+    Reports hit, miss and eviction counters of the QR code render cache.
+    """
+    try:
+        res = project.get_render_cache_stats_service.get_render_cache_stats()
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=500,
+        )
+
+
+@app.get("/health/live", response_model=project.get_readiness_service.LivenessResponse)
+async def api_get_liveness() -> project.get_readiness_service.LivenessResponse:
+    """
+    Liveness probe: answers as soon as the process serves requests.
+    """
+    return project.get_readiness_service.get_liveness()
+
+
+@app.get(
+    "/health/ready", response_model=project.get_readiness_service.ReadinessResponse
+)
+async def api_get_readiness() -> project.get_readiness_service.ReadinessResponse | Response:
+    """
+    Readiness probe: 503 until the startup warm-up has finished, with import and warm-up timings.
+    """
+    try:
+        res = project.get_readiness_service.get_readiness()
+        if not res.ready:
+            return Response(
+                content=res.json(),
+                status_code=503,
+                media_type="application/json",
+            )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=500,
+        )
+
+
+@app.get("/metrics")
+async def api_get_metrics(
+    user: project.auth.AuthenticatedUser = Depends(project.auth.current_administrator),
+) -> Response:
+    """
+    Exposes request latency, render stage timings, database query statistics, cache hit counts and queue depths in the Prometheus text format.
+    """
+    try:
+        res = project.get_metrics_service.get_metrics()
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=500,
+        )
+
+
+@app.post(
+    "/admin/profiler/start",
+    response_model=project.profiling_service.ProfileSummary,
+)
+async def api_post_start_profiling(
+    requests: int = 100,
+    sample_percent: float = 100.0,
+    user: project.auth.AuthenticatedUser = Depends(project.auth.current_administrator),
+) -> project.profiling_service.ProfileSummary | Response:
+    """
+    Arms the sampling profiler for the next requests, optionally sampling only a percentage of them.
+    """
+    try:
+        res = project.profiling_service.start_profiling(requests, sample_percent)
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=500,
+        )
+
+
+@app.post(
+    "/admin/profiler/stop",
+    response_model=project.profiling_service.ProfileListResponse,
+)
+async def api_post_stop_profiling(
+    user: project.auth.AuthenticatedUser = Depends(project.auth.current_administrator),
+) -> project.profiling_service.ProfileListResponse | Response:
+    """
+    Finishes the armed profiling session early.
+    """
+    try:
+        res = project.profiling_service.stop_profiling()
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=500,
+        )
+
+
+@app.get(
+    "/admin/profiler/profiles",
+    response_model=project.profiling_service.ProfileListResponse,
+)
+async def api_get_list_profiles(
+    user: project.auth.AuthenticatedUser = Depends(project.auth.current_administrator),
+) -> project.profiling_service.ProfileListResponse | Response:
+    """
+    Lists the armed profiling session and the most recent finished ones.
+    """
+    try:
+        res = project.profiling_service.list_profiles()
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=500,
+        )
+
+
+@app.get("/admin/profiler/profiles/{profile_id}")
+async def api_get_profile(
+    profile_id: str,
+    user: project.auth.AuthenticatedUser = Depends(project.auth.current_administrator),
+) -> Response:
+    """
+    Returns the samples of a profiling session as collapsed stacks for flame graph tools.
+    """
+    try:
+        res = project.profiling_service.get_profile(profile_id)
+        return res
+    except project.profiling_service.ProfileNotFoundError as e:
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=404,
+        )
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=500,
+        )
+
+
+@app.get(
+    "/auth/hasher/stats",
+    response_model=project.get_password_hasher_stats_service.PasswordHasherStats,
+)
+async def api_get_password_hasher_stats(
+    user: project.auth.AuthenticatedUser = Depends(project.auth.current_administrator),
+) -> project.get_password_hasher_stats_service.PasswordHasherStats | Response:
+    """
+    Reports how many password checks are running and queued on the hashing pool.
+    """
+    try:
+        res = project.get_password_hasher_stats_service.get_password_hasher_stats()
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
             content=jsonable_encoder(res),
             status_code=500,
-            media_type="application/json",
         )
 
 
@@ -81,10 +394,9 @@ async def api_get_api_documentation() -> project.api_documentation_service.APIDo
         logger.exception("Error processing request")
         res = dict()
         res["error"] = str(e)
-        return Response(
+        return JSONResponse(
             content=jsonable_encoder(res),
             status_code=500,
-            media_type="application/json",
         )
 
 
@@ -103,10 +415,9 @@ async def api_get_security_status() -> project.security_status_service.SecurityS
         logger.exception("Error processing request")
         res = dict()
         res["error"] = str(e)
-        return Response(
+        return JSONResponse(
             content=jsonable_encoder(res),
             status_code=500,
-            media_type="application/json",
         )
 
 
@@ -124,10 +435,9 @@ async def api_post_logout(
         logger.exception("Error processing request")
         res = dict()
         res["error"] = str(e)
-        return Response(
+        return JSONResponse(
             content=jsonable_encoder(res),
             status_code=500,
-            media_type="application/json",
         )
 
 
@@ -148,10 +458,9 @@ async def api_get_check_permission(
         logger.exception("Error processing request")
         res = dict()
         res["error"] = str(e)
-        return Response(
+        return JSONResponse(
             content=jsonable_encoder(res),
             status_code=500,
-            media_type="application/json",
         )
 
 
@@ -159,21 +468,24 @@ async def api_get_check_permission(
     "/user/preferences",
     response_model=project.get_user_preferences_service.GetUserPreferencesResponse,
 )
-async def api_get_get_user_preferences() -> project.get_user_preferences_service.GetUserPreferencesResponse | Response:
+async def api_get_get_user_preferences(
+    user_id: str,
+) -> project.get_user_preferences_service.GetUserPreferencesResponse | Response:
     """
     Retrieves the user's stored preferences for QR code generation and customization.
     """
     try:
-        res = await project.get_user_preferences_service.get_user_preferences()
+        res = await project.get_user_preferences_service.get_user_preferences(
+            user_id
+        )
         return res
     except Exception as e:
         logger.exception("Error processing request")
         res = dict()
         res["error"] = str(e)
-        return Response(
+        return JSONResponse(
             content=jsonable_encoder(res),
             status_code=500,
-            media_type="application/json",
         )
 
 
@@ -193,14 +505,71 @@ async def api_post_create_batch_request(
             userId, qrCodeRequests
         )
         return res
+    except project.user_preferences.InvalidOptionError as e:
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=400,
+        )
     except Exception as e:
         logger.exception("Error processing request")
         res = dict()
         res["error"] = str(e)
-        return Response(
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=500,
+        )
+
+
+@app.get(
+    "/batch/{batch_request_id}",
+    response_model=project.get_batch_status_service.BatchStatusResponse,
+)
+async def api_get_batch_status(
+    batch_request_id: str,
+) -> project.get_batch_status_service.BatchStatusResponse | Response:
+    """
+    Reports the status and rendering progress of a batch request.
+    """
+    try:
+        res = await project.get_batch_status_service.get_batch_status(
+            batch_request_id
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=500,
+        )
+
+
+@app.get("/batch/{batch_request_id}/download")
+async def api_get_download_batch(
+    batch_request_id: str,
+    format: project.download_batch_service.ArchiveFormat = project.download_batch_service.ArchiveFormat.ZIP,
+    after: Optional[str] = None,
+    range: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
+) -> Response:
+    """
+    Streams the rendered QR codes of a completed batch as a ZIP archive or NDJSON.
+    """
+    try:
+        res = await project.download_batch_service.download_batch(
+            batch_request_id, format, range, if_range, after
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
             content=jsonable_encoder(res),
             status_code=500,
-            media_type="application/json",
         )
 
 
@@ -224,14 +593,20 @@ async def api_put_update_user_preferences(
             color, size, error_correction_level, margin, logo_integration, user_id
         )
         return res
+    except project.user_preferences.InvalidOptionError as e:
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=400,
+        )
     except Exception as e:
         logger.exception("Error processing request")
         res = dict()
         res["error"] = str(e)
-        return Response(
+        return JSONResponse(
             content=jsonable_encoder(res),
             status_code=500,
-            media_type="application/json",
         )
 
 
@@ -239,28 +614,34 @@ async def api_put_update_user_preferences(
     "/logs/system", response_model=project.get_system_logs_service.GetSystemLogsResponse
 )
 async def api_get_get_system_logs(
-    start_time: Optional[str],
-    end_time: Optional[str],
-    log_type: Optional[str],
-    page: Optional[int],
-    page_size: Optional[int],
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    log_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    page_size: Optional[int] = None,
 ) -> project.get_system_logs_service.GetSystemLogsResponse | Response:
     """
     Retrieves logs related to system operations, user activities, and errors.
     """
     try:
         res = await project.get_system_logs_service.get_system_logs(
-            start_time, end_time, log_type, page, page_size
+            start_time, end_time, log_type, cursor, page_size
         )
         return res
+    except project.get_system_logs_service.InvalidLogQueryError as e:
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=400,
+        )
     except Exception as e:
         logger.exception("Error processing request")
         res = dict()
         res["error"] = str(e)
-        return Response(
+        return JSONResponse(
             content=jsonable_encoder(res),
             status_code=500,
-            media_type="application/json",
         )
 
 
@@ -274,14 +655,21 @@ async def api_post_login(
     try:
         res = await project.login_service.login(email, password)
         return res
+    except project.password_hasher.PasswordHasherBusyError as e:
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=503,
+            headers={"Retry-After": "1"},
+        )
     except Exception as e:
         logger.exception("Error processing request")
         res = dict()
         res["error"] = str(e)
-        return Response(
+        return JSONResponse(
             content=jsonable_encoder(res),
             status_code=500,
-            media_type="application/json",
         )
 
 
@@ -290,7 +678,7 @@ async def api_post_login(
     response_model=project.customize_qr_code_service.CustomizeQRCodeResponse,
 )
 async def api_post_customize_qr_code(
-    qr_code_id: str, color: str, logo: Optional[str], size: int
+    qr_code_id: str, color: str, size: int, logo: Optional[str] = None
 ) -> project.customize_qr_code_service.CustomizeQRCodeResponse | Response:
     """
     Applies customization options to a generated QR code.
@@ -300,12 +688,26 @@ async def api_post_customize_qr_code(
             qr_code_id, color, logo, size
         )
         return res
+    except project.render_executor.RenderQueueFullError as e:
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=503,
+            headers={"Retry-After": "1"},
+        )
+    except project.user_preferences.InvalidOptionError as e:
+        res = dict()
+        res["error"] = str(e)
+        return JSONResponse(
+            content=jsonable_encoder(res),
+            status_code=400,
+        )
     except Exception as e:
         logger.exception("Error processing request")
         res = dict()
         res["error"] = str(e)
-        return Response(
+        return JSONResponse(
             content=jsonable_encoder(res),
             status_code=500,
-            media_type="application/json",
         )
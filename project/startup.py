@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Sequence
+
+from prisma import Prisma
+from project.lazy_import import timed_import
+from project.render_executor import render_executor
+
+logger = logging.getLogger(__name__)
+
+# Imported lazily by the API but needed by the first renders, token checks and logins.
+WARM_UP_MODULES = ("project.qr_renderer", "jose.jwt", "bcrypt")
+
+
+class StartupWarmUp:
+    """
+    Prepares a fresh process for traffic after the application has started.
+
+    Runs in the background so the liveness probe answers right away, while the
+    readiness probe reports the process unready until the deferred modules are
+    imported, the database has answered a query and the render workers have
+    warmed up. Warm-up is best effort: a failing step is logged and the process
+    reports ready anyway, since everything it prepares also happens on demand.
+    """
+
+    def __init__(self, modules: Sequence[str]) -> None:
+        self.modules = modules
+        self.ready = False
+        self.error: Optional[str] = None
+        # Seconds taken by each warm-up step, in the order they ran.
+        self.steps: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db_client: Prisma) -> None:
+        """
+        Starts the warm-up on the running event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db_client))
+
+    async def stop(self) -> None:
+        """
+        Cancels the warm-up if it is still running.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, db_client: Prisma) -> None:
+        try:
+            await self._step("imports", self._import_modules)
+            await self._step("database", lambda: db_client.query_raw("SELECT 1"))
+            if render_executor.prewarm:
+                await self._step("render_workers", render_executor.warm_up)
+        except Exception as e:
+            logger.exception("Startup warm-up failed")
+            self.error = str(e)
+        self.ready = True
+        logger.info("Ready after warm-up: %s", self.steps)
+
+    async def _step(self, name: str, step: Callable[[], Awaitable]) -> None:
+        start = time.perf_counter()
+        await step()
+        self.steps[name] = time.perf_counter() - start
+
+    async def _import_modules(self) -> None:
+        # In a thread, so the event loop keeps answering probes meanwhile.
+        for name in self.modules:
+            await asyncio.to_thread(timed_import, name)
+
+
+startup_warm_up = StartupWarmUp(WARM_UP_MODULES)
@@ -0,0 +1,244 @@
+import asyncio
+import mimetypes
+import os
+import threading
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import Any, BinaryIO, Optional
+
+from project.lazy_import import lazy_import
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+# Used by the "s3" backend, which needs boto3 (the "s3" extra) unless given a client.
+STORAGE_S3_BUCKET = os.getenv("STORAGE_S3_BUCKET")
+STORAGE_S3_PREFIX = os.getenv("STORAGE_S3_PREFIX", "qrcodes")
+# Set to use an S3-compatible service other than AWS, e.g. a local MinIO.
+STORAGE_S3_ENDPOINT_URL = os.getenv("STORAGE_S3_ENDPOINT_URL")
+
+boto3 = lazy_import("boto3")
+
+
+def sharded_name(digest: str, suffix: str = "") -> str:
+    """
+    Spreads names over two levels of directories by the first four hex digits of `digest`.
+
+    That keeps directories at a few hundred entries even with millions of files.
+    """
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{suffix}"
+
+
+class StorageBackend(ABC):
+    """
+    Stores files by name (a relative, '/'-separated path).
+
+    Writes are atomic: readers see either no file or the complete file, never a
+    partial one. The async methods do their I/O off the event loop.
+    """
+
+    name: str
+
+    @abstractmethod
+    async def read(self, name: str) -> Optional[bytes]:
+        """
+        Returns the content of the file, or None if it does not exist.
+        """
+
+    @abstractmethod
+    async def write(self, name: str, content: bytes) -> None:
+        """
+        Stores the file, replacing any previous content.
+        """
+
+    @abstractmethod
+    async def size(self, name: str) -> Optional[int]:
+        """
+        Returns the size of the file in bytes, or None if it does not exist.
+        """
+
+    @abstractmethod
+    def open(self, name: str) -> BinaryIO:
+        """
+        Opens the file for reading. Blocking; for use from worker threads.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+
+    @abstractmethod
+    def location(self, name: str) -> str:
+        """
+        Returns the path, relative to QR_CODE_BASE_URL, under which the file is served.
+        """
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Files below a local directory, written to a temporary file and renamed into place.
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def path_for(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    async def read(self, name: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, name)
+
+    async def write(self, name: str, content: bytes) -> None:
+        await asyncio.to_thread(self._write, name, content)
+
+    async def size(self, name: str) -> Optional[int]:
+        return await asyncio.to_thread(self._size, name)
+
+    def open(self, name: str) -> BinaryIO:
+        return open(self.path_for(name), "rb")
+
+    def location(self, name: str) -> str:
+        return f"{self.directory}/{name}"
+
+    def _read(self, name: str) -> Optional[bytes]:
+        try:
+            with open(self.path_for(name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, name: str, content: bytes) -> None:
+        path = self.path_for(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _size(self, name: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self.path_for(name))
+        except FileNotFoundError:
+            return None
+
+
+def is_not_found(error: Exception) -> bool:
+    """
+    Tells whether an S3 client error means the object does not exist.
+    """
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Objects in an S3 bucket, or any service speaking the S3 API.
+
+    `client` is anything with the put_object, get_object and head_object methods
+    of a boto3 S3 client, e.g. a stand-in for tests. Without one, a boto3 client
+    is created on first use. Single-request uploads are atomic in S3, so no
+    rename is needed.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str,
+        endpoint_url: Optional[str] = None,
+        client: Optional[Any] = None,
+    ) -> None:
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.endpoint_url = endpoint_url
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        # boto3 clients are thread-safe once created, but creating one is not.
+        with self._client_lock:
+            if self._client is None:
+                self._client = boto3.client("s3", endpoint_url=self.endpoint_url)
+            return self._client
+
+    def key_for(self, name: str) -> str:
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    async def read(self, name: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, name)
+
+    async def write(self, name: str, content: bytes) -> None:
+        await asyncio.to_thread(
+            self.client.put_object,
+            Bucket=self.bucket,
+            Key=self.key_for(name),
+            Body=content,
+            ContentType=mimetypes.guess_type(name)[0] or "application/octet-stream",
+        )
+
+    async def size(self, name: str) -> Optional[int]:
+        return await asyncio.to_thread(self._size, name)
+
+    def open(self, name: str) -> BinaryIO:
+        # Stored images are small, so they are fetched whole.
+        content = self._read(name)
+        if content is None:
+            raise FileNotFoundError(self.key_for(name))
+        return BytesIO(content)
+
+    def location(self, name: str) -> str:
+        return self.key_for(name)
+
+    def _read(self, name: str) -> Optional[bytes]:
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=self.key_for(name)
+            )
+        except Exception as e:
+            if is_not_found(e):
+                return None
+            raise
+        return response["Body"].read()
+
+    def _size(self, name: str) -> Optional[int]:
+        try:
+            response = self.client.head_object(
+                Bucket=self.bucket, Key=self.key_for(name)
+            )
+        except Exception as e:
+            if is_not_found(e):
+                return None
+            raise
+        return response["ContentLength"]
+
+
+def create_backend(name: str, directory: str) -> StorageBackend:
+    """
+    Instantiates the storage backend configured by STORAGE_BACKEND.
+
+    Args:
+        name (str): 'local' or 's3'.
+        directory (str): Root directory of the local backend.
+
+    Raises:
+        ValueError: If the backend is unknown or STORAGE_S3_BUCKET is missing for 's3'.
+    """
+    if name == "local":
+        return LocalStorageBackend(directory)
+    if name == "s3":
+        if not STORAGE_S3_BUCKET:
+            raise ValueError(
+                "STORAGE_S3_BUCKET must be set for the s3 storage backend."
+            )
+        return S3StorageBackend(
+            STORAGE_S3_BUCKET, STORAGE_S3_PREFIX, STORAGE_S3_ENDPOINT_URL
+        )
+    raise ValueError(f"Unknown storage backend: {name}")
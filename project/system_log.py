@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+
+import prisma.models
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_LOG_LEVEL = os.getenv("SYSTEM_LOG_LEVEL", "INFO")
+SYSTEM_LOG_FLUSH_INTERVAL = float(os.getenv("SYSTEM_LOG_FLUSH_INTERVAL", 1.0))
+SYSTEM_LOG_BATCH_SIZE = int(os.getenv("SYSTEM_LOG_BATCH_SIZE", 500))
+SYSTEM_LOG_MAX_BUFFER = int(os.getenv("SYSTEM_LOG_MAX_BUFFER", 10000))
+
+# Log records can set e.g. extra={"log_type": "performance"}; otherwise the level decides.
+LOG_TYPE_ATTRIBUTE = "log_type"
+
+
+def log_type_for(record: logging.LogRecord) -> str:
+    """
+    Returns the SystemLog type of a record: its `log_type` extra, else 'error' or 'activity'.
+    """
+    log_type = getattr(record, LOG_TYPE_ATTRIBUTE, None)
+    if log_type is not None:
+        return str(log_type)
+    return "error" if record.levelno >= logging.ERROR else "activity"
+
+
+class SystemLogHandler(logging.Handler):
+    """
+    Logging handler that stores records in the SystemLog table without blocking the caller.
+
+    `emit` only appends the record to an in-memory buffer. A task on the event
+    loop writes the buffer out with one `create_many` per `batch_size` records,
+    every `flush_interval` seconds or as soon as a full batch is waiting. When
+    the database falls behind, the buffer keeps the newest `max_buffer` records
+    and drops older ones rather than growing without bound.
+    """
+
+    def __init__(
+        self, flush_interval: float, batch_size: int, max_buffer: int, level=0
+    ) -> None:
+        super().__init__(level)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self._buffer: Deque[Dict] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+
+    @property
+    def buffered(self) -> int:
+        """
+        Number of records waiting to be written.
+        """
+        return len(self._buffer)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Failures to write the log must not be written to the log.
+        if record.name == __name__:
+            return
+        try:
+            details = None
+            if record.exc_info:
+                details = "".join(traceback.format_exception(*record.exc_info))
+            self._buffer.append(
+                {
+                    "timestamp": datetime.fromtimestamp(record.created, timezone.utc),
+                    "type": log_type_for(record),
+                    "logger": record.name,
+                    "message": record.getMessage(),
+                    "details": details,
+                }
+            )
+            if len(self._buffer) > self.max_buffer:
+                self._buffer.popleft()
+                self.dropped += 1
+            if (
+                len(self._buffer) >= self.batch_size
+                and self._loop is not None
+                and not self._batch_ready.is_set()
+            ):
+                self._loop.call_soon_threadsafe(self._batch_ready.set)
+        except Exception:
+            self.handleError(record)
+
+    def start(self, target: logging.Logger) -> None:
+        """
+        Attaches the handler to `target` and starts flushing on the running event loop.
+        """
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._batch_ready = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            target.addHandler(self)
+            if target.getEffectiveLevel() > self.level:
+                target.setLevel(self.level)
+
+    async def stop(self, target: logging.Logger) -> None:
+        """
+        Detaches the handler from `target`, stops the flush loop and writes out what is buffered.
+        """
+        target.removeHandler(self)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+        try:
+            while self._buffer:
+                await self.flush_buffer()
+        except Exception:
+            logger.exception("Writing buffered system logs on shutdown failed")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._batch_ready.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            try:
+                while self._buffer:
+                    await self.flush_buffer()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Writing system logs failed")
+
+    async def flush_buffer(self) -> None:
+        """
+        Writes up to `batch_size` buffered records in a single insert.
+        """
+        rows: List[Dict] = []
+        while self._buffer and len(rows) < self.batch_size:
+            rows.append(self._buffer.popleft())
+        if not rows:
+            return
+        try:
+            await prisma.models.SystemLog.prisma().create_many(data=rows)
+        except BaseException:
+            # Keep the records for the next attempt, still bounded by max_buffer.
+            self._buffer.extendleft(reversed(rows))
+            while len(self._buffer) > self.max_buffer:
+                self._buffer.popleft()
+                self.dropped += 1
+            raise
+
+
+system_log_handler = SystemLogHandler(
+    SYSTEM_LOG_FLUSH_INTERVAL,
+    SYSTEM_LOG_BATCH_SIZE,
+    SYSTEM_LOG_MAX_BUFFER,
+    level=SYSTEM_LOG_LEVEL,
+)
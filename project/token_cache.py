@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+import prisma.enums
+
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", 60.0))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", 10000))
+# Seconds an unknown API key is remembered as invalid, sparing the database repeated lookups.
+TOKEN_CACHE_INVALID_TTL = float(os.getenv("TOKEN_CACHE_INVALID_TTL", 10.0))
+
+
+class TokenIdentity(NamedTuple):
+    """
+    The user an API token belongs to and that user's role.
+    """
+
+    user_id: str
+    role: prisma.enums.Role
+
+
+class TokenCache:
+    """
+    Bounded token -> TokenIdentity cache whose entries expire after `ttl` seconds.
+
+    Invalidation is immediate within the process; other processes pick up
+    revocations once their entry expires. Tokens that turned out to be invalid
+    are remembered separately for `invalid_ttl` seconds, in an LRU of the same
+    bound, so a flood of bad tokens cannot push out valid ones.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, invalid_ttl: float) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.invalid_ttl = invalid_ttl
+        self._entries: OrderedDict[str, Tuple[TokenIdentity, float]] = OrderedDict()
+        self._invalid: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[TokenIdentity]:
+        """
+        Returns the cached identity of the token, or None if it is unknown or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            identity, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[token]
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(token)
+            return identity
+
+    def is_invalid(self, token: str) -> bool:
+        """
+        Tells whether the token was recently looked up and found invalid.
+        """
+        with self._lock:
+            expires_at = self._invalid.get(token)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._invalid[token]
+                return False
+            return True
+
+    def is_cached(self, token: str) -> bool:
+        """
+        Tells whether resolving the token needs no database lookup, without counting a hit or miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[1] > now:
+                return True
+            expires_at = self._invalid.get(token)
+            return expires_at is not None and expires_at > now
+
+    def generation(self) -> int:
+        """
+        Returns a marker to pass to `put`, taken before the token is looked up in the database.
+        """
+        with self._lock:
+            return self._generation
+
+    def put(self, token: str, identity: TokenIdentity, generation: int) -> None:
+        """
+        Caches the identity of a token unless an invalidation happened since `generation`.
+
+        This keeps a lookup that raced with a logout from re-caching the revoked token.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries.pop(token, None)
+            self._entries[token] = (identity, time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put_invalid(self, token: str) -> None:
+        """
+        Remembers that the token is invalid for `invalid_ttl` seconds.
+        """
+        with self._lock:
+            self._invalid.pop(token, None)
+            self._invalid[token] = time.monotonic() + self.invalid_ttl
+            while len(self._invalid) > self.max_entries:
+                self._invalid.popitem(last=False)
+
+    def invalidate(self, token: str) -> None:
+        """
+        Drops the token from the cache, e.g. after its API key was deleted.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(token, None)
+
+
+token_cache = TokenCache(
+    TOKEN_CACHE_TTL, TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_INVALID_TTL
+)
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional, Set
+
+import prisma
+import prisma.models
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_REFRESH_INTERVAL = float(os.getenv("REVOCATION_REFRESH_INTERVAL", 30.0))
+# 2**20 bits (128 KiB) with 7 hashes keeps false positives below 1e-8 for 10k revoked tokens.
+REVOCATION_BLOOM_BITS = int(os.getenv("REVOCATION_BLOOM_BITS", 1 << 20))
+REVOCATION_BLOOM_HASHES = int(os.getenv("REVOCATION_BLOOM_HASHES", 7))
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership filter: no false negatives, rare false positives.
+    """
+
+    def __init__(self, bits: int, hashes: int) -> None:
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray((bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.bits for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._array[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RevocationList:
+    """
+    In-memory view of the RevokedToken table for checking JWTs without a query.
+
+    A bloom filter of all unexpired revoked token ids is rebuilt from the database
+    every `refresh_interval` seconds. Tokens whose id is not in the filter, which is
+    virtually every valid token, are accepted without touching the database; the
+    rare filter hits are confirmed with a lookup. Revocations made by this process
+    apply immediately, revocations made elsewhere after the next refresh.
+    """
+
+    def __init__(self, refresh_interval: float, bits: int, hashes: int) -> None:
+        self.refresh_interval = refresh_interval
+        self.bits = bits
+        self.hashes = hashes
+        self._filter = BloomFilter(bits, hashes)
+        self._revoked: Set[str] = set()
+        self._recent: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """
+        Starts refreshing the filter from the database on the running event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stops the refresh loop.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Refreshing the token revocation list failed")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def refresh(self) -> None:
+        """
+        Rebuilds the filter from the unexpired revoked tokens and purges expired ones.
+        """
+        self._recent = set()
+        now = datetime.now(timezone.utc)
+        await prisma.models.RevokedToken.prisma().delete_many(
+            where={"expiresAt": {"lt": now}}
+        )
+        rows = await prisma.models.RevokedToken.prisma().find_many(
+            where={"expiresAt": {"gte": now}}
+        )
+        bloom = BloomFilter(self.bits, self.hashes)
+        for row in rows:
+            bloom.add(row.jti)
+        # Revocations made while the rows were loading.
+        for jti in self._recent:
+            bloom.add(jti)
+        self._filter = bloom
+        self._revoked = set()
+
+    async def is_revoked(self, jti: str) -> bool:
+        """
+        Tells whether the token id was revoked, querying the database only on filter hits.
+        """
+        if jti not in self._filter:
+            return False
+        if jti in self._revoked:
+            return True
+        row = await prisma.models.RevokedToken.prisma().find_unique(where={"jti": jti})
+        if row is None:
+            return False
+        self._revoked.add(jti)
+        return True
+
+    async def revoke(self, jti: str, expires_at: datetime) -> None:
+        """
+        Records the token id as revoked until the token would have expired anyway.
+        """
+        await prisma.models.RevokedToken.prisma().upsert(
+            where={"jti": jti},
+            data={
+                "create": {"jti": jti, "expiresAt": expires_at},
+                "update": {},
+            },
+        )
+        self._filter.add(jti)
+        self._recent.add(jti)
+        self._revoked.add(jti)
+
+
+revocation_list = RevocationList(
+    REVOCATION_REFRESH_INTERVAL, REVOCATION_BLOOM_BITS, REVOCATION_BLOOM_HASHES
+)
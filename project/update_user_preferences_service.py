@@ -1,10 +1,31 @@
 from typing import Any, Dict
 
 import prisma
-import prisma.models
+from project.user_preferences import (
+    preference_cache,
+    validate_color,
+    validate_size,
+)
 from pydantic import BaseModel
 
 
+def upsert_preferences_sql(count: int) -> str:
+    """
+    Builds one INSERT ... ON CONFLICT statement writing `count` preferences of a user.
+
+    Parameter $1 is the user id, followed by a key and a value per preference. The
+    statement relies on the unique (userId, preferenceKey) index, so concurrent
+    updates overwrite each other's values instead of creating duplicate rows.
+    """
+    rows = ", ".join(f"($1, ${2 * i + 2}, ${2 * i + 3})" for i in range(count))
+    return (
+        'INSERT INTO "UserPreference" ("userId", "preferenceKey", "preferenceValue") '
+        f"VALUES {rows} "
+        'ON CONFLICT ("userId", "preferenceKey") '
+        'DO UPDATE SET "preferenceValue" = EXCLUDED."preferenceValue"'
+    )
+
+
 class UpdateUserPreferencesResponse(BaseModel):
     """
     Describes the structure of the response after updating user preferences for QR code generation and customization.
@@ -37,8 +58,14 @@ async def update_user_preferences(
     Returns:
         UpdateUserPreferencesResponse: Describes the structure of the response after updating user preferences for QR code generation and customization.
 
-    This function queries the UserPreference model to update the user's preferences if they exist or creates new preferences if they don't. It then returns a response object indicating the success of the operation.
+    All preferences are written in a single upsert statement, so the update costs one round trip and either fully applies or not at all. The new values are written through to the preference cache.
+
+    Raises:
+        InvalidColorError: If the color is not a hex code or a known color name.
+        InvalidSizeError: If the size is below MIN_QR_SIZE or above MAX_QR_SIZE.
     """
+    validate_color(color)
+    validate_size(size)
     preferences = {
         "color": color,
         "size": str(size),
@@ -47,22 +74,12 @@ async def update_user_preferences(
         "logo_integration": str(logo_integration),
     }
     try:
-        for key, value in preferences.items():
-            preference_exists = await prisma.models.UserPreference.prisma().find_first(
-                where={"AND": [{"userId": user_id}, {"preferenceKey": key}]}
-            )
-            if preference_exists:
-                await prisma.models.UserPreference.prisma().update(
-                    where={"id": preference_exists.id}, data={"preferenceValue": value}
-                )
-            else:
-                await prisma.models.UserPreference.prisma().create(
-                    data={
-                        "userId": user_id,
-                        "preferenceKey": key,
-                        "preferenceValue": value,
-                    }
-                )
+        await prisma.get_client().execute_raw(
+            upsert_preferences_sql(len(preferences)),
+            user_id,
+            *(item for pair in preferences.items() for item in pair),
+        )
+        preference_cache.update(user_id, preferences)
         return UpdateUserPreferencesResponse(
             success=True,
             updated_preferences=preferences,
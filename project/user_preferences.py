@@ -0,0 +1,250 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import prisma.models
+from project.lazy_import import lazy_import
+
+ImageColor = lazy_import("PIL.ImageColor")
+
+PREFERENCE_CACHE_TTL = float(os.getenv("PREFERENCE_CACHE_TTL", 300.0))
+PREFERENCE_CACHE_MAX_ENTRIES = int(os.getenv("PREFERENCE_CACHE_MAX_ENTRIES", 10000))
+
+# Used for parameters that neither the request nor the user's preferences set.
+DEFAULT_QR_SIZE = int(os.getenv("DEFAULT_QR_SIZE", 300))
+DEFAULT_QR_COLOR = os.getenv("DEFAULT_QR_COLOR", "#000000")
+DEFAULT_ERROR_CORRECTION = os.getenv("DEFAULT_ERROR_CORRECTION", "MEDIUM")
+
+# Accepted sizes. Modules are size // 10 pixels wide, so the largest version 40
+# code is about 18.5 * MAX_QR_SIZE pixels on each side.
+MIN_QR_SIZE = int(os.getenv("MIN_QR_SIZE", 10))
+MAX_QR_SIZE = int(os.getenv("MAX_QR_SIZE", 500))
+
+# '#rgb', '#rgba', '#rrggbb' or '#rrggbbaa'; color names are checked against Pillow's.
+HEX_COLOR = re.compile(r"#(?:[0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})")
+
+# Preferences store error correction as 'L', 'M', 'Q' or 'H'.
+ERROR_CORRECTION_PREFERENCES = {
+    "L": "LOW",
+    "M": "MEDIUM",
+    "Q": "QUARTILE",
+    "H": "HIGH",
+}
+
+
+class InvalidOptionError(ValueError):
+    """
+    Raised when a requested rendering parameter is out of range or malformed.
+    """
+
+
+class InvalidColorError(InvalidOptionError):
+    """
+    Raised when a requested color is neither a hex code nor a known color name.
+    """
+
+
+class InvalidSizeError(InvalidOptionError):
+    """
+    Raised when a requested size is outside MIN_QR_SIZE..MAX_QR_SIZE.
+    """
+
+
+def is_valid_color(color: str) -> bool:
+    """
+    Tells whether a color can be rendered to PNG by Pillow and written into an SVG as is.
+
+    Hex codes are checked without importing Pillow. Names are limited to those
+    Pillow knows, which are the CSS color names SVG viewers accept as well.
+    """
+    if HEX_COLOR.fullmatch(color):
+        return True
+    return color.isalpha() and color.lower() in ImageColor.colormap
+
+
+def validate_color(color: str) -> str:
+    """
+    Returns the color if it is valid.
+
+    Raises:
+        InvalidColorError: If it is not a hex code or a known color name.
+    """
+    if not is_valid_color(color):
+        raise InvalidColorError(
+            f"Invalid color {color!r}; use a hex code such as '#1a2b3c' or a color name."
+        )
+    return color
+
+
+def is_valid_size(size: int) -> bool:
+    """
+    Tells whether a size is within the configured bounds.
+    """
+    return MIN_QR_SIZE <= size <= MAX_QR_SIZE
+
+
+def validate_size(size: int) -> int:
+    """
+    Returns the size if it is within the configured bounds.
+
+    Raises:
+        InvalidSizeError: If it is below MIN_QR_SIZE or above MAX_QR_SIZE.
+    """
+    if not is_valid_size(size):
+        raise InvalidSizeError(
+            f"Invalid size {size}; use a size from {MIN_QR_SIZE} to {MAX_QR_SIZE}."
+        )
+    return size
+
+
+class PreferenceCache:
+    """
+    Bounded user id -> preferences cache whose entries expire after `ttl` seconds.
+
+    Preference updates write through to the cached entry, so they apply
+    immediately within the process; other processes see them once their entry
+    expires.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Tuple[Dict[str, str], float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[Dict[str, str]]:
+        """
+        Returns the cached preferences of the user, or None if they are unknown or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            preferences, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+            return preferences
+
+    def generation(self) -> int:
+        """
+        Returns a marker to pass to `put`, taken before the preferences are loaded from the database.
+        """
+        with self._lock:
+            return self._generation
+
+    def put(self, user_id: str, preferences: Dict[str, str], generation: int) -> None:
+        """
+        Caches preferences loaded from the database unless they were updated since `generation`.
+
+        This keeps a load that raced with an update from caching the old values.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._store(user_id, preferences)
+
+    def update(self, user_id: str, preferences: Dict[str, str]) -> None:
+        """
+        Writes updated preferences through to the cached entry of the user, if any.
+        """
+        with self._lock:
+            self._generation += 1
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._store(user_id, {**entry[0], **preferences})
+
+    def _store(self, user_id: str, preferences: Dict[str, str]) -> None:
+        self._entries.pop(user_id, None)
+        self._entries[user_id] = (preferences, time.monotonic() + self.ttl)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+preference_cache = PreferenceCache(PREFERENCE_CACHE_TTL, PREFERENCE_CACHE_MAX_ENTRIES)
+
+
+async def load_user_preferences(user_id: str) -> Dict[str, str]:
+    """
+    Returns the preferences of one user as a key -> value mapping.
+
+    Only the user's own rows are read, through the (userId, preferenceKey) index,
+    and the result is cached, so repeated lookups do not touch the database.
+    """
+    preferences = preference_cache.get(user_id)
+    if preferences is None:
+        generation = preference_cache.generation()
+        rows = await prisma.models.UserPreference.prisma().find_many(
+            where={"userId": user_id}
+        )
+        preferences = {row.preferenceKey: row.preferenceValue for row in rows}
+        preference_cache.put(user_id, preferences, generation)
+    return preferences
+
+
+class GenerationOptions(NamedTuple):
+    """
+    Rendering parameters after filling in omitted values. `error_correction` is an ErrorCorrection value.
+    """
+
+    size: int
+    color: str
+    error_correction: str
+
+
+async def resolve_generation_options(
+    user_id: Optional[str],
+    size: Optional[int],
+    color: Optional[str],
+    error_correction: Optional[str],
+) -> GenerationOptions:
+    """
+    Fills in omitted rendering parameters from the user's preferences, then from the defaults.
+
+    A preferred color or size that is not valid is ignored in favor of the default.
+
+    Args:
+        user_id (Optional[str]): The requesting user, or None for anonymous requests.
+        size (Optional[int]): Requested size in pixels, if given.
+        color (Optional[str]): Requested hex color, if given.
+        error_correction (Optional[str]): Requested error correction level name, if given.
+
+    Returns:
+        GenerationOptions: The parameters to render with.
+
+    Raises:
+        InvalidColorError: If the requested color is not valid.
+        InvalidSizeError: If the requested size is out of bounds.
+    """
+    if size is not None:
+        validate_size(size)
+    if color is not None:
+        validate_color(color)
+    preferences: Dict[str, str] = {}
+    if user_id is not None and None in (size, color, error_correction):
+        preferences = await load_user_preferences(user_id)
+    if size is None:
+        preferred_size = preferences.get("size", "")
+        size = int(preferred_size) if preferred_size.isdigit() else DEFAULT_QR_SIZE
+        if not is_valid_size(size):
+            size = DEFAULT_QR_SIZE
+    if color is None:
+        color = preferences.get("color")
+        if not color or not is_valid_color(color):
+            color = DEFAULT_QR_COLOR
+    if error_correction is None:
+        error_correction = ERROR_CORRECTION_PREFERENCES.get(
+            preferences.get("error_correction_level", "").upper(),
+            DEFAULT_ERROR_CORRECTION,
+        )
+    return GenerationOptions(size, color, error_correction)
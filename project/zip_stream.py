@@ -0,0 +1,247 @@
+import struct
+import zlib
+from typing import BinaryIO, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+DATA_DESCRIPTOR = struct.Struct("<IIII")
+CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+END_OF_CENTRAL_DIRECTORY = struct.Struct("<IHHHHIIH")
+
+ZIP_VERSION = 20
+# Bit 3: sizes and CRC follow the data; bit 11: names are UTF-8.
+ZIP_FLAGS = 0x0008 | 0x0800
+# Entries are stamped 1980-01-01 00:00 so the archive bytes are reproducible.
+DOS_TIME = 0
+DOS_DATE = (1 << 5) | 1
+MAX_ENTRIES = 0xFFFF
+MAX_OFFSET = 0xFFFFFFFF
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class ZipEntry(NamedTuple):
+    """
+    A file to include in the archive: its name inside the archive, its path and its size.
+    """
+
+    name: str
+    path: str
+    size: int
+
+
+class StoredZipStream:
+    """
+    Uncompressed ZIP archive streamed from files with constant memory.
+
+    Entries are stored rather than deflated (PNG data does not compress further),
+    timestamps are fixed and CRCs are carried in data descriptors, so the byte
+    layout and total length are known before any file is read. That makes it
+    possible to answer HTTP range requests by streaming only the requested span.
+    Files are opened with `opener`, e.g. a storage backend's `open`.
+    """
+
+    def __init__(
+        self,
+        entries: List[ZipEntry],
+        opener: Callable[[str], BinaryIO] = lambda path: open(path, "rb"),
+    ) -> None:
+        if len(entries) > MAX_ENTRIES:
+            raise ValueError(f"ZIP archives are limited to {MAX_ENTRIES} entries.")
+        self.entries = entries
+        self.opener = opener
+        self._names = [entry.name.encode("utf8") for entry in entries]
+        self._crcs: List[Optional[int]] = [None] * len(entries)
+        self._parts: List[Tuple[int, int, Callable[[int, int], Iterator[bytes]]]] = []
+        self._local_offsets: List[int] = []
+        offset = 0
+        for index, entry in enumerate(entries):
+            self._local_offsets.append(offset)
+            offset = self._add_part(
+                offset,
+                LOCAL_HEADER.size + len(self._names[index]),
+                self._local_header(index),
+            )
+            offset = self._add_part(offset, entry.size, self._file_data(index))
+            offset = self._add_part(
+                offset, DATA_DESCRIPTOR.size, self._data_descriptor(index)
+            )
+        self._central_directory_offset = offset
+        for index in range(len(entries)):
+            offset = self._add_part(
+                offset,
+                CENTRAL_HEADER.size + len(self._names[index]),
+                self._central_header(index),
+            )
+        self._central_directory_size = offset - self._central_directory_offset
+        offset = self._add_part(
+            offset, END_OF_CENTRAL_DIRECTORY.size, self._end_of_central_directory()
+        )
+        if self._central_directory_offset > MAX_OFFSET:
+            raise ValueError("ZIP archives are limited to 4 GiB.")
+        self.total_size = offset
+
+    def iter_range(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Yields the archive bytes in the inclusive range [start, end].
+
+        Args:
+            start (int): Offset of the first byte to produce.
+            end (Optional[int]): Offset of the last byte to produce, defaults to the last byte.
+        """
+        if end is None:
+            end = self.total_size - 1
+        for part_offset, part_size, produce in self._parts:
+            part_end = part_offset + part_size - 1
+            if part_size == 0 or part_end < start:
+                continue
+            if part_offset > end:
+                break
+            yield from produce(
+                max(start - part_offset, 0), min(end, part_end) - part_offset + 1
+            )
+
+    def _add_part(
+        self, offset: int, size: int, produce: Callable[[int, int], Iterator[bytes]]
+    ) -> int:
+        self._parts.append((offset, size, produce))
+        return offset + size
+
+    def _crc(self, index: int) -> int:
+        crc = self._crcs[index]
+        if crc is None:
+            crc = 0
+            with self.opener(self.entries[index].path) as f:
+                while chunk := f.read(READ_CHUNK_SIZE):
+                    crc = zlib.crc32(chunk, crc)
+            self._crcs[index] = crc
+        return crc
+
+    def _static(
+        self, build: Callable[[], bytes]
+    ) -> Callable[[int, int], Iterator[bytes]]:
+        def produce(lo: int, hi: int) -> Iterator[bytes]:
+            yield build()[lo:hi]
+
+        return produce
+
+    def _local_header(self, index: int) -> Callable[[int, int], Iterator[bytes]]:
+        name = self._names[index]
+        return self._static(
+            lambda: LOCAL_HEADER.pack(
+                0x04034B50,
+                ZIP_VERSION,
+                ZIP_FLAGS,
+                0,
+                DOS_TIME,
+                DOS_DATE,
+                0,
+                0,
+                0,
+                len(name),
+                0,
+            )
+            + name
+        )
+
+    def _file_data(self, index: int) -> Callable[[int, int], Iterator[bytes]]:
+        entry = self.entries[index]
+
+        def produce(lo: int, hi: int) -> Iterator[bytes]:
+            whole = lo == 0 and hi == entry.size
+            crc = 0
+            with self.opener(entry.path) as f:
+                f.seek(lo)
+                remaining = hi - lo
+                while remaining > 0:
+                    chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ValueError(f"{entry.path} changed size while streaming.")
+                    if whole:
+                        crc = zlib.crc32(chunk, crc)
+                    remaining -= len(chunk)
+                    yield chunk
+            if whole:
+                self._crcs[index] = crc
+
+        return produce
+
+    def _data_descriptor(self, index: int) -> Callable[[int, int], Iterator[bytes]]:
+        size = self.entries[index].size
+        return self._static(
+            lambda: DATA_DESCRIPTOR.pack(0x08074B50, self._crc(index), size, size)
+        )
+
+    def _central_header(self, index: int) -> Callable[[int, int], Iterator[bytes]]:
+        name = self._names[index]
+        size = self.entries[index].size
+        return self._static(
+            lambda: CENTRAL_HEADER.pack(
+                0x02014B50,
+                ZIP_VERSION,
+                ZIP_VERSION,
+                ZIP_FLAGS,
+                0,
+                DOS_TIME,
+                DOS_DATE,
+                self._crc(index),
+                size,
+                size,
+                len(name),
+                0,
+                0,
+                0,
+                0,
+                0,
+                self._local_offsets[index],
+            )
+            + name
+        )
+
+    def _end_of_central_directory(self) -> Callable[[int, int], Iterator[bytes]]:
+        count = len(self.entries)
+        return self._static(
+            lambda: END_OF_CENTRAL_DIRECTORY.pack(
+                0x06054B50,
+                0,
+                0,
+                count,
+                count,
+                self._central_directory_size,
+                self._central_directory_offset,
+                0,
+            )
+        )
+
+
+def parse_range(
+    range_header: Optional[str], total_size: int
+) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range HTTP `Range` header into inclusive byte offsets.
+
+    Args:
+        range_header (Optional[str]): The raw header value, e.g. 'bytes=100-' or 'bytes=-500'.
+        total_size (int): Length of the full representation.
+
+    Returns:
+        Optional[Tuple[int, int]]: The (start, end) offsets, or None if the header is absent,
+        malformed or uses multiple ranges, in which case the full body should be sent.
+
+    Raises:
+        ValueError: If the range cannot be satisfied.
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    first, _, last = range_header[len("bytes=") :].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else total_size - 1
+        else:
+            start = max(total_size - int(last), 0)
+            end = total_size - 1
+    except ValueError:
+        return None
+    end = min(end, total_size - 1)
+    if start > end:
+        raise ValueError(f"Range not satisfiable for {total_size} bytes.")
+    return start, end
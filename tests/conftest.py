@@ -0,0 +1,34 @@
+import random
+import string
+
+import pytest
+
+ALPHABETS = [
+    string.digits,
+    string.ascii_uppercase + string.digits + " $%*+-./:",
+    string.ascii_letters + string.digits,
+    string.printable,
+    "aé漢1A",
+]
+
+LENGTHS = [1, 7, 30, 120, 400]
+
+
+def make_payloads(seed: str, count: int, runs: int = 1):
+    rng = random.Random(seed)
+    for _ in range(count):
+        # Runs from different alphabets exercise switching between modes.
+        parts = []
+        for _ in range(rng.randint(1, runs)):
+            alphabet = rng.choice(ALPHABETS)
+            length = max(rng.choice(LENGTHS) // runs, 1)
+            parts.append("".join(rng.choice(alphabet) for _ in range(length)))
+        yield "".join(parts)
+
+
+@pytest.fixture
+def random_payloads():
+    """
+    Reproducible payloads of up to `runs` runs, each drawn from one alphabet.
+    """
+    return make_payloads
@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip(
+    "prisma.models", reason="needs the generated Prisma client (prisma generate)"
+)
+
+import project.batch_worker  # noqa: E402
+from project.batch_worker import BatchWorker  # noqa: E402
+
+QUEUED, PROCESSING = (
+    project.batch_worker.prisma.enums.BatchStatus.QUEUED,
+    project.batch_worker.prisma.enums.BatchStatus.PROCESSING,
+)
+
+
+def matches(row, where) -> bool:
+    for name, condition in where.items():
+        if name == "OR":
+            if not any(matches(row, option) for option in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = getattr(row, name)
+            if value is None or not value < condition["lt"]:
+                return False
+        elif getattr(row, name) != condition:
+            return False
+    return True
+
+
+class BatchRequests:
+    """
+    Stands in for prisma.models.BatchRequest. Lookups yield to the event loop,
+    so concurrent claims interleave between reading and updating.
+    """
+
+    def __init__(self) -> None:
+        self.rows = []
+
+    def add(self, batch_id, minutes_ago, status=QUEUED):
+        created_at = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+        row = SimpleNamespace(
+            id=batch_id,
+            status=status,
+            createdAt=created_at,
+            claimId=None,
+            leaseExpiresAt=None,
+        )
+        self.rows.append(row)
+        return row
+
+    def prisma(self):
+        return self
+
+    async def find_first(self, where, order):
+        rows = sorted(
+            (row for row in self.rows if matches(row, where)),
+            key=lambda row: row.createdAt,
+        )
+        await asyncio.sleep(0)
+        return SimpleNamespace(**vars(rows[0])) if rows else None
+
+    async def update_many(self, where, data):
+        rows = [row for row in self.rows if matches(row, where)]
+        for row in rows:
+            vars(row).update(data)
+        return len(rows)
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    table = BatchRequests()
+    monkeypatch.setattr(
+        project.batch_worker.prisma.models, "BatchRequest", table, raising=False
+    )
+    return table
+
+
+def worker(lease_seconds=300) -> BatchWorker:
+    return BatchWorker(1.0, 1, 10, lease_seconds)
+
+
+def test_claims_the_oldest_queued_batch(batches):
+    batches.add("newer", 1)
+    oldest = batches.add("oldest", 5)
+    claimed = asyncio.run(worker().claim_next())
+    assert claimed.id == "oldest"
+    assert oldest.status == PROCESSING
+    assert oldest.claimId == claimed.claimId
+    assert oldest.leaseExpiresAt > datetime.now(timezone.utc)
+
+
+def test_concurrent_claims_get_one_winner(batches):
+    batches.add("only", 1)
+
+    async def main():
+        return await asyncio.gather(worker().claim_next(), worker().claim_next())
+
+    claims = asyncio.run(main())
+    assert sum(claim is not None for claim in claims) == 1
+
+
+def test_expired_lease_is_taken_over(batches):
+    row = batches.add("batch", 1)
+    first, second = worker(), worker()
+    stale = asyncio.run(first.claim_next())
+    row.leaseExpiresAt = datetime.now(timezone.utc) - timedelta(seconds=1)
+    assert asyncio.run(second.requeue_expired()) == 1
+    assert row.status == QUEUED
+    current = asyncio.run(second.claim_next())
+    assert current.claimId != stale.claimId
+    # The first worker notices it lost the claim and cannot renew it.
+    assert not asyncio.run(first.renew_lease(stale))
+    assert asyncio.run(second.renew_lease(current))
+    assert row.claimId == current.claimId
+
+
+def test_live_leases_are_not_requeued(batches):
+    row = batches.add("batch", 1)
+    asyncio.run(worker().claim_next())
+    assert asyncio.run(worker().requeue_expired()) == 0
+    assert row.status == PROCESSING
+
+
+def test_processing_batch_without_lease_is_requeued(batches):
+    row = batches.add("batch", 1, status=PROCESSING)
+    assert asyncio.run(worker().requeue_expired()) == 1
+    assert row.status == QUEUED
+
+
+def test_stop_only_requeues_a_current_claim(batches):
+    row = batches.add("batch", 1)
+    first, second = worker(), worker()
+    stale = asyncio.run(first.claim_next())
+    row.leaseExpiresAt = datetime.now(timezone.utc) - timedelta(seconds=1)
+    asyncio.run(second.requeue_expired())
+    current = asyncio.run(second.claim_next())
+    first._current = (stale.id, stale.claimId)
+    asyncio.run(first.stop())
+    assert (row.status, row.claimId) == (PROCESSING, current.claimId)
+    second._current = (current.id, current.claimId)
+    asyncio.run(second.stop())
+    assert (row.status, row.claimId) == (QUEUED, None)
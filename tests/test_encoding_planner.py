@@ -0,0 +1,72 @@
+import pytest
+import qrcode
+import qrcode.exceptions
+from project.encoding_planner import normalize_data, plan_encoding
+from project.qr_renderer import ERROR_CORRECTION_LEVELS
+
+
+def qrcode_fit(data: str, level: int) -> int:
+    qr = qrcode.QRCode(error_correction=level)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.version
+
+
+def fits(plan, level: int, version: int) -> bool:
+    qr = qrcode.QRCode(version=version, error_correction=level)
+    for chunk in plan.qr_data():
+        qr.add_data(chunk)
+    try:
+        qr.make(fit=False)
+    except qrcode.exceptions.DataOverflowError:
+        return False
+    return True
+
+
+@pytest.mark.parametrize("error_correction", list(ERROR_CORRECTION_LEVELS))
+@pytest.mark.parametrize("data_type", ["TEXT", "URL"])
+def test_version_never_exceeds_qrcode_fit(error_correction, data_type, random_payloads):
+    level = ERROR_CORRECTION_LEVELS[error_correction]
+    for data in random_payloads(f"{error_correction}-{data_type}", 40, runs=6):
+        if data_type == "URL":
+            data = f"https://Example.com/{data}"
+        plan = plan_encoding(data, data_type, level)
+        assert plan.version <= qrcode_fit(data, level), data
+
+
+@pytest.mark.parametrize("error_correction", list(ERROR_CORRECTION_LEVELS))
+def test_version_is_the_smallest_that_fits(error_correction, random_payloads):
+    level = ERROR_CORRECTION_LEVELS[error_correction]
+    for data in random_payloads(error_correction, 20, runs=6):
+        plan = plan_encoding(data, "TEXT", level)
+        assert fits(plan, level, plan.version)
+        if plan.version > 1:
+            assert not fits(plan, level, plan.version - 1)
+
+
+def test_segments_cover_the_data():
+    data = "Order 12345678901234 SHIPPED to ÅSA"
+    plan = plan_encoding(data, "TEXT", ERROR_CORRECTION_LEVELS["LOW"])
+    assert "".join(segment.text for segment in plan.segments) == data
+
+
+def test_url_scheme_and_host_are_upper_cased():
+    assert (
+        normalize_data("https://Example.com/Path?q=a#Frag", "URL")
+        == "HTTPS://EXAMPLE.COM/Path?q=a#Frag"
+    )
+    assert normalize_data("https://Example.com/Path", "TEXT") == (
+        "https://Example.com/Path"
+    )
+
+
+def test_non_ascii_url_host_is_kept():
+    assert normalize_data("https://straße.de/x", "URL") == "https://straße.de/x"
+    assert normalize_data("https://Bücher.example/Path", "URL") == (
+        "https://Bücher.example/Path"
+    )
+
+
+def test_overflow_raises():
+    with pytest.raises(qrcode.exceptions.DataOverflowError):
+        plan_encoding("x" * 3000, "TEXT", ERROR_CORRECTION_LEVELS["HIGH"])
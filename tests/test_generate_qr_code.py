@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip(
+    "prisma.models", reason="needs the generated Prisma client (prisma generate)"
+)
+
+import project.generate_qr_code_service  # noqa: E402
+from project.generate_qr_code_service import (  # noqa: E402
+    IMAGE_CACHE_CONTROL,
+    DataType,
+    ErrorCorrection,
+    Format,
+    etag_matches,
+    generate_qr_code_image,
+    qr_code_cache_key,
+)
+from project.render_cache import RenderCache  # noqa: E402
+from project.storage import LocalStorageBackend  # noqa: E402
+
+KEY = "0123abcd.png"
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        (f'"{KEY}"', True),
+        (f'W/"{KEY}"', True),
+        (f'"other.png", W/"{KEY}"', True),
+        ("*", True),
+        ('"other.png"', False),
+        (f'"{KEY}x"', False),
+    ],
+)
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches(if_none_match, KEY) is expected
+
+
+@pytest.fixture
+def renders(monkeypatch, tmp_path):
+    calls = []
+
+    async def run(fn, *args, wait=False):
+        calls.append(args)
+        return fn(*args)
+
+    monkeypatch.setattr(
+        project.generate_qr_code_service,
+        "render_cache",
+        RenderCache(1 << 20, LocalStorageBackend(str(tmp_path))),
+    )
+    monkeypatch.setattr(project.generate_qr_code_service.render_executor, "run", run)
+    return calls
+
+
+def generate(if_none_match=None, color="#112233"):
+    return asyncio.run(
+        generate_qr_code_image(
+            "https://example.com",
+            DataType.URL,
+            100,
+            color,
+            ErrorCorrection.MEDIUM,
+            Format.PNG,
+            if_none_match=if_none_match,
+        )
+    )
+
+
+def test_etag_is_derived_from_the_render_parameters(renders):
+    response = generate()
+    key = qr_code_cache_key(
+        "https://example.com", DataType.URL, 100, "#112233", ErrorCorrection.MEDIUM
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'W/"{key}"'
+    assert response.headers["cache-control"] == IMAGE_CACHE_CONTROL
+    assert response.body.startswith(b"\x89PNG")
+    assert generate(color="#112244").headers["etag"] != response.headers["etag"]
+
+
+def test_matching_if_none_match_is_answered_without_rendering(renders):
+    etag = generate().headers["etag"]
+    assert len(renders) == 1
+    response = generate(if_none_match=etag)
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == etag
+    assert len(renders) == 1
+
+
+def test_stale_if_none_match_gets_the_image(renders):
+    response = generate(if_none_match='W/"stale.png"')
+    assert response.status_code == 200
+    assert response.body.startswith(b"\x89PNG")
@@ -0,0 +1,132 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import project.logo_pipeline
+import pytest
+from project.logo_pipeline import LOGO_MAX_BYTES, fetch_logo, resolve_public_address
+
+
+def resolving_to(*addresses):
+    def getaddrinfo(host, port, type=0):
+        return [
+            (socket.AF_INET6 if ":" in a else socket.AF_INET, type, 6, "", (a, port))
+            for a in addresses
+        ]
+
+    return getaddrinfo
+
+
+@pytest.mark.parametrize(
+    "address",
+    [
+        "127.0.0.1",
+        "10.1.2.3",
+        "192.168.0.10",
+        "169.254.169.254",
+        "0.0.0.0",
+        "224.0.0.1",
+        "::1",
+        "fd00::1",
+    ],
+)
+def test_non_public_addresses_are_refused(monkeypatch, address):
+    monkeypatch.setattr(socket, "getaddrinfo", resolving_to(address))
+    with pytest.raises(ValueError):
+        resolve_public_address("logo.example", 443)
+
+
+def test_any_non_public_address_refuses_the_host(monkeypatch):
+    monkeypatch.setattr(
+        socket, "getaddrinfo", resolving_to("93.184.216.34", "10.0.0.1")
+    )
+    with pytest.raises(ValueError):
+        resolve_public_address("logo.example", 443)
+
+
+def test_public_address_is_returned(monkeypatch):
+    monkeypatch.setattr(socket, "getaddrinfo", resolving_to("93.184.216.34"))
+    assert resolve_public_address("logo.example", 443) == "93.184.216.34"
+
+
+def test_allowed_hosts(monkeypatch):
+    monkeypatch.setattr(socket, "getaddrinfo", resolving_to("93.184.216.34"))
+    monkeypatch.setattr(project.logo_pipeline, "LOGO_ALLOWED_HOSTS", {"cdn.example"})
+    assert resolve_public_address("CDN.example", 443) == "93.184.216.34"
+    with pytest.raises(ValueError):
+        resolve_public_address("logo.example", 443)
+
+
+class LogoHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers["Host"]))
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/logo.png")
+            self.end_headers()
+        elif self.path == "/large.png":
+            self.send_response(200)
+            self.send_header("Content-Length", str(LOGO_MAX_BYTES + 1))
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header("Content-Length", "4")
+            self.end_headers()
+            self.wfile.write(b"logo")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LogoHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def pinned(monkeypatch):
+    # Stands in for a public host whose checked address is the test server.
+    resolved = []
+
+    def resolve_public_address(host, port):
+        resolved.append(host)
+        return "127.0.0.1"
+
+    monkeypatch.setattr(
+        project.logo_pipeline, "resolve_public_address", resolve_public_address
+    )
+    return resolved
+
+
+def test_connects_to_the_checked_address(server, pinned):
+    # 'logo.invalid' never resolves, so the request can only reach the pinned address.
+    port = server.server_address[1]
+    assert fetch_logo(f"http://logo.invalid:{port}/logo.png?v=1") == b"logo"
+    assert pinned == ["logo.invalid"]
+    assert server.requests == [("/logo.png?v=1", f"logo.invalid:{port}")]
+
+
+def test_redirects_are_not_followed(server, pinned):
+    port = server.server_address[1]
+    with pytest.raises(ValueError, match="302"):
+        fetch_logo(f"http://logo.invalid:{port}/redirect")
+    assert [path for path, _ in server.requests] == ["/redirect"]
+
+
+def test_announced_oversized_logos_are_refused(server, pinned):
+    port = server.server_address[1]
+    with pytest.raises(ValueError, match="larger"):
+        fetch_logo(f"http://logo.invalid:{port}/large.png")
+
+
+def test_loopback_urls_are_refused(server):
+    port = server.server_address[1]
+    with pytest.raises(ValueError, match="public"):
+        fetch_logo(f"http://127.0.0.1:{port}/logo.png")
+    assert server.requests == []
@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip(
+    "prisma.models", reason="needs the generated Prisma client (prisma generate)"
+)
+
+import project.auth  # noqa: E402
+import project.logout_service  # noqa: E402
+from project.auth import authenticate  # noqa: E402
+from project.logout_service import logout  # noqa: E402
+from project.token_cache import TokenCache  # noqa: E402
+
+
+class APIKeys:
+    """
+    Stands in for prisma.models.APIKey, counting lookups.
+    """
+
+    def __init__(self, keys) -> None:
+        self.rows = {
+            key: SimpleNamespace(
+                key=key, User=SimpleNamespace(id=user_id, role="GENERALUSER")
+            )
+            for key, user_id in keys.items()
+        }
+        self.lookups = 0
+        self.during_lookup = None
+
+    def prisma(self):
+        return self
+
+    async def find_unique(self, where, include):
+        self.lookups += 1
+        row = self.rows.get(where["key"])
+        if self.during_lookup is not None:
+            await self.during_lookup()
+        return row
+
+    async def delete_many(self, where):
+        return 1 if self.rows.pop(where["key"], None) is not None else 0
+
+
+@pytest.fixture
+def api_keys(monkeypatch):
+    table = APIKeys({"key-1": "user-1", "key-2": "user-2"})
+    monkeypatch.setattr(project.auth.prisma.models, "APIKey", table, raising=False)
+    return table
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = TokenCache(ttl=60, max_entries=100, invalid_ttl=10)
+    monkeypatch.setattr(project.auth, "token_cache", cache)
+    monkeypatch.setattr(project.logout_service, "token_cache", cache)
+    return cache
+
+
+def test_api_keys_are_cached(api_keys, cache):
+    assert asyncio.run(authenticate("key-1")).user_id == "user-1"
+    assert asyncio.run(authenticate("key-1")).user_id == "user-1"
+    assert api_keys.lookups == 1
+
+
+def test_logout_invalidates_the_cached_key(api_keys, cache):
+    asyncio.run(authenticate("key-1"))
+    asyncio.run(authenticate("key-2"))
+    response = asyncio.run(logout("key-1"))
+    assert response.message == "Successfully logged out."
+    assert cache.get("key-1") is None
+    assert asyncio.run(authenticate("key-1")) is None
+    # Other keys stay cached.
+    lookups = api_keys.lookups
+    assert asyncio.run(authenticate("key-2")).user_id == "user-2"
+    assert api_keys.lookups == lookups
+
+
+def test_lookup_racing_with_logout_is_not_cached(api_keys, cache):
+    async def log_out():
+        api_keys.during_lookup = None
+        await logout("key-1")
+
+    api_keys.during_lookup = log_out
+    # The lookup read the key before it was deleted ...
+    assert asyncio.run(authenticate("key-1")) is not None
+    # ... but must not cache it, or the key would keep working until the TTL.
+    assert cache.get("key-1") is None
+    assert asyncio.run(authenticate("key-1")) is None
+
+
+def test_logout_of_unknown_key(api_keys, cache):
+    assert asyncio.run(logout("key-9")).message == "Invalid token."
@@ -0,0 +1,40 @@
+import random
+import string
+
+import numpy as np
+import pytest
+from project.matrix_engine import encode_matrix
+from project.qr_renderer import ERROR_CORRECTION_LEVELS, build_qr
+
+
+@pytest.mark.parametrize("error_correction", list(ERROR_CORRECTION_LEVELS))
+@pytest.mark.parametrize("data_type", ["TEXT", "URL"])
+def test_matches_qrcode(error_correction, data_type, random_payloads):
+    level = ERROR_CORRECTION_LEVELS[error_correction]
+    for data in random_payloads(f"{error_correction}-{data_type}", 25):
+        if data_type == "URL":
+            data = f"https://example.com/{data}"
+        qr = build_qr(data, data_type, 100, error_correction)
+        matrix = encode_matrix.__wrapped__(data, data_type, level)
+        assert matrix.info.version == qr.version
+        assert matrix.info.mask_pattern == qr.mask_pattern
+        assert np.array_equal(matrix.modules, np.array(qr.modules, dtype=bool)), data
+
+
+@pytest.mark.parametrize("error_correction", list(ERROR_CORRECTION_LEVELS))
+def test_matches_qrcode_with_version_information(error_correction):
+    # Versions 7 and up carry version information blocks.
+    data = "".join(random.Random(7).choice(string.printable) for _ in range(1200))
+    level = ERROR_CORRECTION_LEVELS[error_correction]
+    qr = build_qr(data, "TEXT", 100, error_correction)
+    matrix = encode_matrix.__wrapped__(data, "TEXT", level)
+    assert matrix.info.version >= 7
+    assert np.array_equal(matrix.modules, np.array(qr.modules, dtype=bool))
+
+
+def test_memoized_matrix_is_read_only():
+    level = ERROR_CORRECTION_LEVELS["MEDIUM"]
+    matrix = encode_matrix("https://example.com", "URL", level)
+    assert encode_matrix("https://example.com", "URL", level) is matrix
+    with pytest.raises(ValueError):
+        matrix.modules[0, 0] = False
@@ -0,0 +1,63 @@
+import asyncio
+import inspect
+
+import pytest
+from project.metrics import DB_QUERY_SECONDS, instrument_database, request_queries
+
+
+class Client:
+    async def _execute(self, *, method, arguments, model=None):
+        return method
+
+
+class Batch:
+    def __init__(self) -> None:
+        self.committed = False
+
+    async def commit(self) -> None:
+        self.committed = True
+
+
+class Model:
+    pass
+
+
+def query_count(model: str, operation: str) -> int:
+    series = DB_QUERY_SECONDS._series.get((model, operation))
+    return 0 if series is None else series[-1]
+
+
+def test_queries_and_batch_commits_are_recorded():
+    instrument_database(Client, Batch)
+    before = query_count("Model", "find_many"), query_count("", "batch")
+
+    async def handle_request():
+        request_queries.set([0, 0.0])
+        assert await Client()._execute(method="find_many", arguments={}, model=Model)
+        batch = Batch()
+        await batch.commit()
+        assert batch.committed
+        return request_queries.get()
+
+    queries = asyncio.run(handle_request())
+    assert queries[0] == 2
+    assert query_count("Model", "find_many") == before[0] + 1
+    assert query_count("", "batch") == before[1] + 1
+
+
+def test_instrumenting_twice_wraps_once():
+    instrument_database(Client, Batch)
+    execute, commit = Client._execute, Batch.commit
+    instrument_database(Client, Batch)
+    assert (Client._execute, Batch.commit) == (execute, commit)
+
+
+def test_prisma_client_has_the_instrumented_methods():
+    # instrument_database wraps private methods of the pinned prisma version.
+    pytest.importorskip(
+        "prisma.models", reason="needs the generated Prisma client (prisma generate)"
+    )
+    from prisma import Batch, Prisma
+
+    assert inspect.iscoroutinefunction(Prisma._execute)
+    assert inspect.iscoroutinefunction(Batch.commit)
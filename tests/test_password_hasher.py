@@ -0,0 +1,127 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import bcrypt
+import project.password_hasher
+import pytest
+from project.password_hasher import PasswordHasher, PasswordHasherBusyError
+
+
+class BlockingBcrypt:
+    """
+    Stands in for bcrypt, holding every check until released.
+    """
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+
+    def checkpw(self, password, hashed_password):
+        self.release.wait()
+        return True
+
+
+def test_checks_beyond_max_pending_are_rejected(monkeypatch):
+    blocking = BlockingBcrypt()
+    monkeypatch.setattr(project.password_hasher, "bcrypt", blocking)
+    hasher = PasswordHasher(workers=1, max_pending=3, rounds=4)
+
+    async def main():
+        pending = [
+            asyncio.create_task(hasher.verify("password", "hash")) for _ in range(3)
+        ]
+        await asyncio.sleep(0.05)
+        assert (hasher.in_flight, hasher.waiting) == (1, 2)
+        with pytest.raises(PasswordHasherBusyError):
+            await hasher.verify("password", "hash")
+        blocking.release.set()
+        assert await asyncio.gather(*pending) == [True] * 3
+        assert (hasher.in_flight, hasher.waiting) == (0, 0)
+        # Capacity is back once the queue drained.
+        return await hasher.verify("password", "hash")
+
+    try:
+        assert asyncio.run(main())
+    finally:
+        hasher.shutdown()
+
+
+def test_hash_and_verify():
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=4)
+    try:
+        hashed = asyncio.run(hasher.hash("secret"))
+        assert asyncio.run(hasher.verify("secret", hashed))
+        assert not asyncio.run(hasher.verify("wrong", hashed))
+    finally:
+        hasher.shutdown()
+
+
+def test_needs_rehash():
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=5)
+    assert not hasher.needs_rehash(bcrypt.hashpw(b"x", bcrypt.gensalt(5)).decode())
+    assert hasher.needs_rehash(bcrypt.hashpw(b"x", bcrypt.gensalt(4)).decode())
+    assert hasher.needs_rehash("not a bcrypt hash")
+
+
+@pytest.fixture
+def login_service(monkeypatch):
+    pytest.importorskip(
+        "prisma.models", reason="needs the generated Prisma client (prisma generate)"
+    )
+    import project.login_service
+
+    return project.login_service
+
+
+class Users:
+    """
+    Stands in for prisma.models.User, recording updates.
+    """
+
+    def __init__(self, user) -> None:
+        self.user = user
+        self.updates = []
+
+    def prisma(self):
+        return self
+
+    async def find_unique(self, where):
+        return self.user if where["email"] == self.user.email else None
+
+    async def update(self, where, data):
+        self.updates.append(data)
+
+
+def test_login_rehashes_passwords_with_another_cost(login_service, monkeypatch):
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=5)
+    stored = bcrypt.hashpw(b"secret", bcrypt.gensalt(4)).decode()
+    users = Users(
+        SimpleNamespace(
+            id="u", email="a@b.c", role="GENERALUSER", hashedPassword=stored
+        )
+    )
+    monkeypatch.setattr(login_service, "password_hasher", hasher)
+    monkeypatch.setattr(login_service.prisma.models, "User", users, raising=False)
+    try:
+        asyncio.run(login_service.login("a@b.c", "secret"))
+        assert len(users.updates) == 1
+        rehashed = users.updates[0]["hashedPassword"]
+        assert not hasher.needs_rehash(rehashed)
+        assert bcrypt.checkpw(b"secret", rehashed.encode())
+        users.user.hashedPassword = rehashed
+        asyncio.run(login_service.login("a@b.c", "secret"))
+        assert len(users.updates) == 1
+    finally:
+        hasher.shutdown()
+
+
+def test_busy_hasher_answers_login_with_503(login_service, monkeypatch):
+    import project.server
+
+    async def login(email, password):
+        raise PasswordHasherBusyError("Too many concurrent logins, try again later.")
+
+    monkeypatch.setattr(login_service, "login", login)
+    response = asyncio.run(project.server.api_post_login("a@b.c", "secret"))
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
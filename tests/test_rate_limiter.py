@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip(
+    "prisma.models", reason="needs the generated Prisma client (prisma generate)"
+)
+
+import project.rate_limiter  # noqa: E402
+import project.token_cache  # noqa: E402
+from project.rate_limiter import (  # noqa: E402
+    LocalRateLimitBackend,
+    RateLimit,
+    RateLimitMiddleware,
+)
+from project.token_cache import TokenCache  # noqa: E402
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(project.rate_limiter.time, "monotonic", clock)
+    return clock
+
+
+def consume(backend, key, limit, cost=1):
+    return asyncio.run(backend.consume(key, limit, cost))
+
+
+def test_burst_then_reject(clock):
+    backend = LocalRateLimitBackend(100)
+    limit = RateLimit(rate=2, burst=5)
+    assert [consume(backend, "a", limit) for _ in range(5)] == [0] * 5
+    assert consume(backend, "a", limit) == pytest.approx(0.5)
+    # Rejected requests take nothing, so the wait does not grow.
+    assert consume(backend, "a", limit) == pytest.approx(0.5)
+
+
+def test_refills_at_rate_up_to_burst(clock):
+    backend = LocalRateLimitBackend(100)
+    limit = RateLimit(rate=2, burst=5)
+    for _ in range(5):
+        consume(backend, "a", limit)
+    clock.now += 1.0
+    assert consume(backend, "a", limit) == 0
+    assert consume(backend, "a", limit) == 0
+    assert consume(backend, "a", limit) > 0
+    clock.now += 3600
+    assert [consume(backend, "a", limit) for _ in range(5)] == [0] * 5
+    assert consume(backend, "a", limit) > 0
+
+
+def test_buckets_are_independent(clock):
+    backend = LocalRateLimitBackend(100)
+    limit = RateLimit(rate=1, burst=1)
+    assert consume(backend, "a", limit) == 0
+    assert consume(backend, "a", limit) > 0
+    assert consume(backend, "b", limit) == 0
+
+
+def test_cost_above_tokens_is_rejected(clock):
+    backend = LocalRateLimitBackend(100)
+    limit = RateLimit(rate=1, burst=3)
+    assert consume(backend, "a", limit, cost=2) == 0
+    assert consume(backend, "a", limit, cost=2) == pytest.approx(1.0)
+
+
+def test_evicts_least_recently_used_bucket(clock):
+    backend = LocalRateLimitBackend(2)
+    limit = RateLimit(rate=1, burst=1)
+    consume(backend, "a", limit)
+    consume(backend, "b", limit)
+    consume(backend, "c", limit)
+    # "a" was evicted and starts over with a full bucket.
+    assert consume(backend, "a", limit) == 0
+    assert consume(backend, "c", limit) > 0
+
+
+def request(headers=(), client=("10.0.0.1", 1234)):
+    return {
+        "type": "http",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "client": client,
+    }
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+
+
+def call(middleware, scope):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, None, send))
+    return messages[0]
+
+
+def test_middleware_rejects_with_retry_after(clock):
+    middleware = RateLimitMiddleware(
+        ok_app,
+        LocalRateLimitBackend(100),
+        {"ANONYMOUS": RateLimit(rate=0.5, burst=2)},
+        trusted_proxies=0,
+    )
+    starts = [call(middleware, request()) for _ in range(3)]
+    assert [start["status"] for start in starts] == [200, 200, 429]
+    assert (b"retry-after", b"2") in starts[2]["headers"]
+
+
+def test_unknown_api_keys_are_limited_before_lookup(clock, monkeypatch):
+    lookups = []
+
+    async def authenticate(token):
+        lookups.append(token)
+        return None
+
+    monkeypatch.setattr(project.rate_limiter, "authenticate", authenticate)
+    middleware = RateLimitMiddleware(
+        ok_app,
+        LocalRateLimitBackend(100),
+        {
+            "ANONYMOUS": RateLimit(rate=1, burst=100),
+            "AUTHENTICATION": RateLimit(rate=1, burst=2),
+        },
+        trusted_proxies=0,
+    )
+    statuses = [
+        call(middleware, request([("authorization", f"Bearer key-{n}")]))["status"]
+        for n in range(4)
+    ]
+    assert statuses == [200, 200, 429, 429]
+    assert lookups == ["key-0", "key-1"]
+    # Other addresses have their own allowance.
+    other = request([("authorization", "Bearer key-9")], client=("10.0.0.2", 1))
+    assert call(middleware, other)["status"] == 200
+
+
+@pytest.mark.parametrize(
+    "trusted_proxies, forwarded_for, expected",
+    [
+        (0, "1.1.1.1", "10.0.0.1"),
+        (1, "1.1.1.1", "1.1.1.1"),
+        (1, "6.6.6.6, 1.1.1.1", "1.1.1.1"),
+        (2, "6.6.6.6, 1.1.1.1, 2.2.2.2", "1.1.1.1"),
+        (2, "1.1.1.1", "10.0.0.1"),
+        (1, None, "10.0.0.1"),
+    ],
+)
+def test_client_address(trusted_proxies, forwarded_for, expected):
+    middleware = RateLimitMiddleware(None, trusted_proxies=trusted_proxies)
+    headers = [] if forwarded_for is None else [("x-forwarded-for", forwarded_for)]
+    assert middleware.client_address(request(headers)) == expected
+
+
+def test_token_cache_remembers_invalid_tokens(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(project.token_cache.time, "monotonic", clock)
+    cache = TokenCache(ttl=60, max_entries=2, invalid_ttl=10)
+    cache.put_invalid("bad")
+    assert cache.is_invalid("bad")
+    assert cache.is_cached("bad")
+    assert cache.get("bad") is None
+    clock.now += 10
+    assert not cache.is_invalid("bad")
+    assert not cache.is_cached("bad")
+
+
+def test_invalid_tokens_do_not_evict_valid_ones():
+    cache = TokenCache(ttl=60, max_entries=2, invalid_ttl=10)
+    identity = object()
+    cache.put("good", identity, cache.generation())
+    for n in range(10):
+        cache.put_invalid(f"bad-{n}")
+    assert cache.get("good") is identity
+    assert not cache.is_invalid("bad-0")
+    assert cache.is_invalid("bad-9")
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from project.render_cache import RenderCache, RenderedQRCode, RenderInfo, render_key
+from project.storage import LocalStorageBackend
+
+INFO = RenderInfo(version=1, mask_pattern=0)
+
+
+def rendered(size: int, fill: bytes = b"x") -> RenderedQRCode:
+    return RenderedQRCode(fill * size, INFO)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorageBackend(str(tmp_path))
+
+
+def test_memory_tier_is_bounded_by_bytes(storage):
+    cache = RenderCache(100, storage)
+    for n in range(5):
+        asyncio.run(cache.put(f"{n}.png", rendered(30), disk=False))
+    stats = cache.stats()
+    assert stats.entries == 3
+    assert stats.current_bytes == 90
+    assert stats.evictions == 2
+    # The oldest entries went first.
+    assert asyncio.run(cache.get("0.png")) is None
+    assert asyncio.run(cache.get("4.png")) is not None
+
+
+def test_hits_refresh_recency(storage):
+    cache = RenderCache(100, storage)
+    for key in ("a.png", "b.png", "c.png"):
+        asyncio.run(cache.put(key, rendered(30), disk=False))
+    assert asyncio.run(cache.get("a.png")) is not None
+    asyncio.run(cache.put("d.png", rendered(30), disk=False))
+    assert asyncio.run(cache.get("a.png")) is not None
+    assert asyncio.run(cache.get("b.png")) is None
+
+
+def test_entries_larger_than_the_budget_stay_out_of_memory(storage):
+    cache = RenderCache(100, storage)
+    asyncio.run(cache.put("small.png", rendered(50), disk=False))
+    asyncio.run(cache.put("large.png", rendered(101), disk=False))
+    assert cache.stats().entries == 1
+    assert asyncio.run(cache.get("small.png")) is not None
+
+
+def test_replacing_an_entry_keeps_the_byte_count(storage):
+    cache = RenderCache(100, storage)
+    asyncio.run(cache.put("a.png", rendered(60), disk=False))
+    asyncio.run(cache.put("a.png", rendered(40), disk=False))
+    assert cache.stats().current_bytes == 40
+
+
+def test_disk_tier_serves_and_promotes_evicted_entries(storage):
+    cache = RenderCache(50, storage)
+    first = rendered(40, b"1")
+    asyncio.run(cache.put("first.png", first))
+    asyncio.run(cache.put("second.png", rendered(40, b"2")))
+    assert asyncio.run(cache.get("first.png")) == first
+    stats = cache.stats()
+    assert (stats.memory_hits, stats.disk_hits, stats.misses) == (0, 1, 0)
+    assert asyncio.run(cache.get("first.png")) == first
+    assert cache.stats().memory_hits == 1
+
+
+def test_background_renders_skip_memory(storage):
+    cache = RenderCache(100, storage)
+    stored = asyncio.run(cache.put("a.png", rendered(10), memory=False))
+    assert cache.stats().entries == 0
+    assert asyncio.run(cache.stored("a.png")) == stored
+    assert asyncio.run(cache.stored("missing.png")) is None
+
+
+def test_identical_images_are_stored_once(storage):
+    cache = RenderCache(100, storage)
+    black = asyncio.run(cache.put("black.png", rendered(10)))
+    hex_black = asyncio.run(cache.put("000000.png", rendered(10)))
+    assert black.image == hex_black.image
+    assert cache.stats().deduplicated == 1
+
+
+def test_render_key_normalizes_parameters():
+    assert render_key(data="x", color="#ABCDEF") == render_key(
+        data="x", color=" #abcdef"
+    )
+    assert render_key(data="x", color="#abcdef") != render_key(
+        data="y", color="#abcdef"
+    )
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from project.render_executor import RenderExecutor, RenderQueueFullError
+
+
+@pytest.fixture
+def executor():
+    executor = RenderExecutor("thread", 1, 2, prewarm=False)
+    yield executor
+    executor.shutdown()
+
+
+def test_interactive_jobs_fail_fast_when_every_slot_is_taken(executor):
+    release = threading.Event()
+
+    async def main():
+        blocked = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert executor.in_flight == 2
+        with pytest.raises(RenderQueueFullError):
+            await executor.run(pow, 2, 3)
+        release.set()
+        await asyncio.gather(*blocked)
+        assert executor.in_flight == 0
+        return await executor.run(pow, 2, 3)
+
+    assert asyncio.run(main()) == 8
+
+
+def test_background_jobs_wait_for_a_slot(executor):
+    release = threading.Event()
+
+    async def main():
+        blocked = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        waiting = asyncio.create_task(executor.run(pow, 2, 3, wait=True))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        release.set()
+        await asyncio.gather(*blocked)
+        return await waiting
+
+    assert asyncio.run(main()) == 8
+
+
+def test_broken_process_pool_is_replaced():
+    executor = RenderExecutor("process", 1, 1, prewarm=False)
+
+    async def main():
+        with pytest.raises(BrokenProcessPool):
+            await executor.run(os._exit, 1)
+        assert executor.in_flight == 0
+        return await executor.run(pow, 2, 3)
+
+    try:
+        assert asyncio.run(main()) == 8
+    finally:
+        executor.shutdown()
@@ -0,0 +1,145 @@
+import asyncio
+import os
+from io import BytesIO
+
+import pytest
+from project.render_cache import (
+    RenderCache,
+    RenderedQRCode,
+    RenderInfo,
+    image_name,
+    manifest_name,
+)
+from project.storage import (
+    LocalStorageBackend,
+    S3StorageBackend,
+    create_backend,
+    sharded_name,
+)
+from project.zip_stream import StoredZipStream, ZipEntry
+
+
+class NoSuchKey(Exception):
+    response = {"Error": {"Code": "NoSuchKey"}}
+
+
+class FakeS3Client:
+    """
+    Stand-in for a boto3 S3 client, holding objects in a dict.
+    """
+
+    def __init__(self) -> None:
+        self.objects = {}
+        self.content_types = {}
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[(Bucket, Key)] = bytes(Body)
+        self.content_types[(Bucket, Key)] = ContentType
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise NoSuchKey(Key)
+        return {"Body": BytesIO(self.objects[(Bucket, Key)])}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise NoSuchKey(Key)
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+
+@pytest.fixture(params=["local", "s3"])
+def backend(request, tmp_path):
+    if request.param == "local":
+        return LocalStorageBackend(str(tmp_path))
+    return S3StorageBackend("bucket", "/qrcodes/", client=FakeS3Client())
+
+
+def test_sharded_name():
+    digest = "abcdef0123"
+    assert sharded_name(digest, ".png") == "ab/cd/abcdef0123.png"
+    assert sharded_name(digest) == "ab/cd/abcdef0123"
+
+
+def test_write_read_and_size(backend):
+    name = sharded_name("0123456789", ".png")
+    assert asyncio.run(backend.read(name)) is None
+    assert asyncio.run(backend.size(name)) is None
+    asyncio.run(backend.write(name, b"first"))
+    asyncio.run(backend.write(name, b"second"))
+    assert asyncio.run(backend.read(name)) == b"second"
+    assert asyncio.run(backend.size(name)) == 6
+    with backend.open(name) as f:
+        assert f.read() == b"second"
+
+
+def test_open_missing_file_raises(backend):
+    with pytest.raises(FileNotFoundError):
+        backend.open("no/such/file.png")
+
+
+def test_local_files_are_sharded(tmp_path):
+    backend = LocalStorageBackend(str(tmp_path))
+    name = sharded_name("0123456789", ".png")
+    asyncio.run(backend.write(name, b"image"))
+    assert (tmp_path / "01" / "23" / "0123456789.png").read_bytes() == b"image"
+    assert backend.location(name) == f"{tmp_path}/01/23/0123456789.png"
+
+
+def test_local_failed_write_leaves_nothing_behind(tmp_path, monkeypatch):
+    backend = LocalStorageBackend(str(tmp_path))
+    name = sharded_name("0123456789", ".png")
+
+    def replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", replace)
+    with pytest.raises(OSError):
+        asyncio.run(backend.write(name, b"image"))
+    assert os.listdir(tmp_path / "01" / "23") == []
+
+
+def test_s3_keys_are_prefixed():
+    client = FakeS3Client()
+    backend = S3StorageBackend("bucket", "/qrcodes/", client=client)
+    name = sharded_name("0123456789", ".png")
+    asyncio.run(backend.write(name, b"image"))
+    assert backend.location(name) == "qrcodes/01/23/0123456789.png"
+    assert client.content_types[("bucket", "qrcodes/01/23/0123456789.png")] == (
+        "image/png"
+    )
+
+
+def test_manifest_round_trip(backend):
+    rendered = RenderedQRCode(b"png bytes", RenderInfo(version=3, mask_pattern=5))
+    stored = asyncio.run(RenderCache(1024, backend).put("key.png", rendered))
+    assert stored.image == image_name(b"png bytes", ".png")
+    assert asyncio.run(backend.read(manifest_name("key.png"))) is not None
+    # A fresh cache, like another process, finds the render through the manifest.
+    cache = RenderCache(1024, backend)
+    assert asyncio.run(cache.stored("key.png")) == stored
+    assert asyncio.run(cache.get("key.png")) == rendered
+
+
+def test_archive_ranges_read_from_storage(backend):
+    contents = [bytes([n]) * (n * 1000 + 1) for n in range(5)]
+    entries = []
+    for n, content in enumerate(contents):
+        name = sharded_name(f"{n:04d}beef", ".png")
+        asyncio.run(backend.write(name, content))
+        entries.append(ZipEntry(f"{n}.png", name, len(content)))
+    archive = StoredZipStream(entries, backend.open)
+    body = b"".join(archive.iter_range())
+    assert len(body) == archive.total_size
+    for start, end in [(0, 99), (1500, 4200), (archive.total_size - 10, None)]:
+        expected = body[start:] if end is None else body[start : end + 1]
+        ranged = StoredZipStream(entries, backend.open)
+        assert b"".join(ranged.iter_range(start, end)) == expected
+
+
+def test_create_backend(tmp_path, monkeypatch):
+    assert isinstance(create_backend("local", str(tmp_path)), LocalStorageBackend)
+    monkeypatch.setattr("project.storage.STORAGE_S3_BUCKET", None)
+    with pytest.raises(ValueError):
+        create_backend("s3", str(tmp_path))
+    with pytest.raises(ValueError):
+        create_backend("ftp", str(tmp_path))
@@ -0,0 +1,102 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip(
+    "prisma.models", reason="needs the generated Prisma client (prisma generate)"
+)
+
+import project.token_revocation  # noqa: E402
+from project.token_revocation import BloomFilter, RevocationList  # noqa: E402
+
+
+def token_ids(count: int):
+    return [uuid.UUID(int=n).hex for n in range(count)]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1 << 16, 7)
+    members = token_ids(5000)
+    for jti in members:
+        bloom.add(jti)
+    assert all(jti in bloom for jti in members)
+
+
+def test_bloom_filter_false_positive_rate():
+    # 5000 items in 64 Ki bits with 7 hashes: about 0.2% expected.
+    bloom = BloomFilter(1 << 16, 7)
+    for jti in token_ids(5000):
+        bloom.add(jti)
+    others = [uuid.UUID(int=(1 << 64) + n).hex for n in range(20000)]
+    false_positives = sum(jti in bloom for jti in others)
+    assert false_positives / len(others) < 0.01
+
+
+def test_empty_bloom_filter_contains_nothing():
+    bloom = BloomFilter(1024, 3)
+    assert not any(jti in bloom for jti in token_ids(100))
+
+
+class RevokedTokens:
+    """
+    Stands in for prisma.models.RevokedToken, counting lookups.
+    """
+
+    def __init__(self, jtis):
+        expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+        self.rows = {
+            jti: SimpleNamespace(jti=jti, expiresAt=expires_at) for jti in jtis
+        }
+        self.lookups = 0
+
+    def prisma(self):
+        return self
+
+    async def delete_many(self, where):
+        return 0
+
+    async def find_many(self, where):
+        return list(self.rows.values())
+
+    async def find_unique(self, where):
+        self.lookups += 1
+        return self.rows.get(where["jti"])
+
+    async def upsert(self, where, data):
+        self.rows[where["jti"]] = SimpleNamespace(**data["create"])
+
+
+@pytest.fixture
+def revoked(monkeypatch):
+    table = RevokedTokens(token_ids(50))
+    monkeypatch.setattr(
+        project.token_revocation.prisma.models, "RevokedToken", table, raising=False
+    )
+    return table
+
+
+def test_revocation_list_only_queries_on_filter_hits(revoked):
+    revocations = RevocationList(30, 1 << 16, 7)
+    asyncio.run(revocations.refresh())
+    valid = [uuid.uuid4().hex for _ in range(1000)]
+    assert not any(asyncio.run(revocations.is_revoked(jti)) for jti in valid)
+    assert revoked.lookups < 10
+    revoked.lookups = 0
+    assert all(asyncio.run(revocations.is_revoked(jti)) for jti in token_ids(50))
+    assert revoked.lookups == 50
+    # Confirmed revocations are remembered until the next refresh.
+    assert asyncio.run(revocations.is_revoked(token_ids(1)[0]))
+    assert revoked.lookups == 50
+
+
+def test_revoke_applies_immediately_and_survives_refresh(revoked):
+    revocations = RevocationList(30, 1 << 16, 7)
+    jti = uuid.uuid4().hex
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+    asyncio.run(revocations.revoke(jti, expires_at))
+    assert asyncio.run(revocations.is_revoked(jti))
+    asyncio.run(revocations.refresh())
+    assert asyncio.run(revocations.is_revoked(jti))
@@ -0,0 +1,154 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip(
+    "prisma.models", reason="needs the generated Prisma client (prisma generate)"
+)
+
+import project.update_user_preferences_service  # noqa: E402
+import project.user_preferences  # noqa: E402
+from project.update_user_preferences_service import (  # noqa: E402
+    update_user_preferences,
+)
+from project.user_preferences import (  # noqa: E402
+    DEFAULT_QR_SIZE,
+    MAX_QR_SIZE,
+    MIN_QR_SIZE,
+    InvalidOptionError,
+    InvalidSizeError,
+    PreferenceCache,
+    load_user_preferences,
+    resolve_generation_options,
+    validate_size,
+)
+
+
+@pytest.mark.parametrize("size", [MIN_QR_SIZE, DEFAULT_QR_SIZE, MAX_QR_SIZE])
+def test_sizes_within_bounds_are_accepted(size):
+    assert validate_size(size) == size
+
+
+@pytest.mark.parametrize("size", [-5, 0, MIN_QR_SIZE - 1, MAX_QR_SIZE + 1, 100000])
+def test_sizes_out_of_bounds_are_rejected(size):
+    with pytest.raises(InvalidSizeError):
+        validate_size(size)
+
+
+def test_requested_size_is_validated():
+    with pytest.raises(InvalidOptionError):
+        asyncio.run(resolve_generation_options(None, 100000, None, None))
+
+
+def test_preferred_size_out_of_bounds_falls_back_to_default(monkeypatch):
+    async def load_user_preferences(user_id):
+        return {"size": str(MAX_QR_SIZE + 1)}
+
+    monkeypatch.setattr(
+        project.user_preferences, "load_user_preferences", load_user_preferences
+    )
+    options = asyncio.run(resolve_generation_options("user", None, None, None))
+    assert options.size == DEFAULT_QR_SIZE
+
+
+class UserPreferences:
+    """
+    Stands in for prisma.models.UserPreference, counting lookups.
+    """
+
+    def __init__(self, rows) -> None:
+        self.rows = rows
+        self.lookups = 0
+        self.during_lookup = None
+
+    def prisma(self):
+        return self
+
+    async def find_many(self, where):
+        self.lookups += 1
+        rows = [
+            SimpleNamespace(preferenceKey=key, preferenceValue=value)
+            for key, value in self.rows.get(where["userId"], {}).items()
+        ]
+        if self.during_lookup is not None:
+            await self.during_lookup()
+        return rows
+
+
+class Client:
+    """
+    Stands in for the Prisma client, applying preference upserts to the table.
+    """
+
+    def __init__(self, table: UserPreferences) -> None:
+        self.table = table
+
+    async def execute_raw(self, query, user_id, *pairs):
+        preferences = self.table.rows.setdefault(user_id, {})
+        preferences.update(zip(pairs[::2], pairs[1::2]))
+        return len(pairs) // 2
+
+
+@pytest.fixture
+def preferences(monkeypatch):
+    table = UserPreferences({"user": {"color": "#112233", "size": "200"}})
+    cache = PreferenceCache(ttl=60, max_entries=100)
+    monkeypatch.setattr(
+        project.user_preferences.prisma.models, "UserPreference", table, raising=False
+    )
+    monkeypatch.setattr(project.user_preferences, "preference_cache", cache)
+    monkeypatch.setattr(
+        project.update_user_preferences_service, "preference_cache", cache
+    )
+    monkeypatch.setattr(
+        project.update_user_preferences_service.prisma,
+        "get_client",
+        lambda: Client(table),
+        raising=False,
+    )
+    return table
+
+
+def update(color="#445566", size=250):
+    return asyncio.run(update_user_preferences(color, size, "H", 4, False, "user"))
+
+
+def test_preferences_are_loaded_once(preferences):
+    assert asyncio.run(load_user_preferences("user"))["color"] == "#112233"
+    assert asyncio.run(load_user_preferences("user"))["color"] == "#112233"
+    assert preferences.lookups == 1
+
+
+def test_updates_write_through_to_the_cache(preferences):
+    asyncio.run(load_user_preferences("user"))
+    assert update().success
+    options = asyncio.run(resolve_generation_options("user", None, None, None))
+    assert options == (250, "#445566", "HIGH")
+    assert preferences.lookups == 1
+
+
+def test_load_racing_with_an_update_is_not_cached(preferences):
+    async def update_during_lookup():
+        preferences.during_lookup = None
+        assert (
+            await update_user_preferences("#445566", 250, "H", 4, False, "user")
+        ).success
+
+    preferences.during_lookup = update_during_lookup
+    # The load read the old values before the update committed ...
+    stale = asyncio.run(load_user_preferences("user"))
+    assert stale["color"] == "#112233"
+    # ... and must not cache them over the update.
+    assert asyncio.run(load_user_preferences("user"))["color"] == "#445566"
+    assert preferences.lookups == 2
+
+
+def test_cached_preferences_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(project.user_preferences.time, "monotonic", lambda: now[0])
+    cache = PreferenceCache(ttl=60, max_entries=100)
+    cache.put("user", {"color": "#112233"}, cache.generation())
+    assert cache.get("user") == {"color": "#112233"}
+    now[0] += 60
+    assert cache.get("user") is None
@@ -0,0 +1,87 @@
+import io
+import random
+import zipfile
+
+import pytest
+from project.zip_stream import READ_CHUNK_SIZE, StoredZipStream, ZipEntry, parse_range
+
+SIZES = [0, 1, 1000, READ_CHUNK_SIZE - 1, READ_CHUNK_SIZE + 17, 3 * READ_CHUNK_SIZE]
+
+
+@pytest.fixture
+def entries(tmp_path):
+    rng = random.Random(5)
+    entries = []
+    for index, size in enumerate(SIZES):
+        path = tmp_path / f"{index}.bin"
+        path.write_bytes(rng.randbytes(size))
+        entries.append(ZipEntry(f"item-{index}-é.png", str(path), size))
+    return entries
+
+
+def read(stream, start=0, end=None) -> bytes:
+    return b"".join(stream.iter_range(start, end))
+
+
+def test_archive_is_valid(entries):
+    stream = StoredZipStream(entries)
+    body = read(stream)
+    assert len(body) == stream.total_size
+    with zipfile.ZipFile(io.BytesIO(body)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == [entry.name for entry in entries]
+        for entry in entries:
+            with open(entry.path, "rb") as f:
+                assert archive.read(entry.name) == f.read()
+
+
+def test_archive_is_deterministic(entries):
+    assert read(StoredZipStream(entries)) == read(StoredZipStream(entries))
+
+
+def test_random_ranges_match_full_body(entries):
+    body = read(StoredZipStream(entries))
+    rng = random.Random(11)
+    for _ in range(200):
+        start = rng.randrange(len(body))
+        end = rng.randrange(start, len(body))
+        # A fresh stream has to compute the CRCs of descriptors in the range itself.
+        assert read(StoredZipStream(entries), start, end) == body[start : end + 1]
+
+
+def test_empty_archive():
+    stream = StoredZipStream([])
+    with zipfile.ZipFile(io.BytesIO(read(stream))) as archive:
+        assert archive.namelist() == []
+
+
+def test_truncated_file_is_detected(entries):
+    entry = entries[2]
+    stream = StoredZipStream([entry])
+    with open(entry.path, "r+b") as f:
+        f.truncate(entry.size // 2)
+    with pytest.raises(ValueError):
+        read(stream)
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 999)),
+        ("bytes=-200", (800, 999)),
+        ("bytes=900-5000", (900, 999)),
+        ("bytes=-5000", (0, 999)),
+        ("bytes=0-1,5-6", None),
+        ("items=0-1", None),
+        ("bytes=a-b", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+def test_parse_range_not_satisfiable():
+    with pytest.raises(ValueError):
+        parse_range("bytes=1000-", 1000)